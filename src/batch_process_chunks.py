@@ -24,6 +24,12 @@ from pipeline.cleaning_v1 import clean_text
 from pipeline.text_utils import ensure_single_context, normalize_source
 # Note: Import run_full_pipeline inside functions to avoid circular import
 
+# Optional fast JSON backend (pip install orjson); stdlib json otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,6 +39,19 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _pretty_json(obj: Any) -> bytes:
+    """
+    Serialize *obj* as 2-space indented UTF-8 JSON (non-ASCII kept as is).
+    
+    Equivalent JSON to json.dump(obj, f, ensure_ascii=False, indent=2), not
+    necessarily the same bytes: orjson may format floats and escape some
+    characters differently.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
 def calculate_optimal_chunk_pages(total_pages: int, target_pages_per_chunk: int = 6) -> int:
     """
     Tính số trang tối ưu cho mỗi chunk.
@@ -244,8 +263,7 @@ def process_pdf_chunks_internal(
             "content": clean_text(node.get("content", ""))
         }
 
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(standard_obj, f, ensure_ascii=False, indent=2)
+        filepath.write_bytes(_pretty_json(standard_obj))
 
     logger.info(f"  ✓ Exported {len(final_nodes)} standard JSON files to {output_dir}")
     logger.info("")
@@ -268,13 +286,11 @@ def process_pdf_chunks_internal(
         minimal_records.append(record)
         chunk_id = node.get("id", f"chunk_{i:04d}")
         cf_path = cleaned_final_dir / f"{chunk_id}.json"
-        with open(cf_path, "w", encoding="utf-8") as f:
-            json.dump(record, f, ensure_ascii=False, indent=2)
+        cf_path.write_bytes(_pretty_json(record))
 
     base_name = normalized_source.replace('.pdf', '')
     final_json_path = cleaned_final_dir / f"{base_name}_final.json"
-    with open(final_json_path, "w", encoding="utf-8") as f:
-        json.dump(minimal_records, f, ensure_ascii=False, indent=2)
+    final_json_path.write_bytes(_pretty_json(minimal_records))
     logger.info(f"  ✓ {len(minimal_records)} cleaned_final records → {cleaned_final_dir}")
 
     # Summary
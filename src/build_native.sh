@@ -0,0 +1,22 @@
+#!/bin/bash
+# Build Native Exporters - mypyc AOT compilation
+# ===============================================
+# Compiles export_text.py to a C extension with mypyc (needs: pip install mypy).
+# `import export_text` picks up the compiled export_text.*.so automatically;
+# remove it (bash build_native.sh --clean) to fall back to the pure-Python module.
+#
+# Sử dụng: bash build_native.sh [--clean]
+
+set -e
+cd "$(dirname "$0")"
+
+if [ "$1" == "--clean" ]; then
+    rm -rf build export_text.*.so
+    echo "✅ Removed compiled exporters (pure-Python export_text.py in use)"
+    exit 0
+fi
+
+echo "🔧 Compiling export_text.py with mypyc..."
+python -m mypyc export_text.py
+
+echo "✅ Built: $(ls export_text.*.so)"
@@ -8,26 +8,54 @@ for reviewing content quality before AI training.
 
 Output formats:
 1. Plain text - Just the content
-2. Markdown - Nicely formatted for review
-3. JSONL - JSON Lines format for ML pipelines
+2. Detailed text - Content with all metadata
+3. Training text - <TEXT> blocks for fine-tuning data
+4. Markdown - Nicely formatted for review
+5. JSONL - JSON Lines format for ML pipelines
 
 Usage:
     python export_text.py <json_file>
     python export_text.py <json_file> --format markdown
     python export_text.py <json_file> --format jsonl
+    python export_text.py <json_file> --formats plain,markdown  # Parse once, export both
     python export_text.py --all  # Export all JSON files in processed/
 
 Author: Research Assistant
 Date: January 2026
 """
 
+import io
 import os
 import sys
 import json
 import argparse
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from datetime import datetime
-from typing import Any
+from typing import Any, BinaryIO, Callable, Iterable, NamedTuple
+
+# Optional fast JSON backend: orjson parses/serializes several times faster
+# than the stdlib json module. Fall back to json when it is not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+def _json_loads(raw: bytes) -> Any:
+    """Parse JSON from raw UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_line(obj: Any) -> bytes:
+    """Serialize *obj* as one UTF-8 JSON line (newline-terminated)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
 
 
 # Directory configuration
@@ -35,6 +63,23 @@ BASE_DIR = Path(__file__).parent
 PROCESSED_DIR = BASE_DIR / "data" / "processed"
 EXPORT_DIR = BASE_DIR / "data" / "exported"
 
+# Buffer size for output files (1 MiB) - keeps write() syscalls rare
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Flush threshold for batched output serialization (64 KiB)
+FLUSH_BATCH_SIZE = 1 << 16
+
+# Precomputed rules/borders (built once instead of per node)
+_RULE80 = "=" * 80 + "\n"
+_RULE40 = "-" * 40 + "\n"
+_HR78 = "─" * 78
+_BOX_TOP = f"┌{_HR78}┐\n"
+_BOX_MID = f"├{_HR78}┤\n"
+_BOX_BOT = f"└{_HR78}┘\n"
+
+# Below this many files export_all stays serial (process startup dominates)
+PARALLEL_MIN_FILES = 4
+
 
 def ensure_directories() -> None:
     """Ensure export directory exists."""
@@ -43,119 +88,182 @@ def ensure_directories() -> None:
 
 def load_json(json_path: Path) -> dict[str, Any]:
     """Load JSON file."""
-    with open(json_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(json_path, "rb") as f:
+        data: dict[str, Any] = _json_loads(f.read())
+    return data
+
 
+def _flush_text(buf: io.StringIO, f: BinaryIO) -> None:
+    """Encode the pending text in *buf* to UTF-8 in one go and write it to *f*."""
+    f.write(buf.getvalue().encode("utf-8"))
+    buf.seek(0)
+    buf.truncate()
 
-def export_plain_text(data: dict[str, Any], output_path: Path) -> None:
+
+def _doc_header(data: dict[str, Any]) -> tuple[str, list[dict[str, Any]], str, str, dict[str, Any]]:
+    """
+    Look up the document-level header fields once.
+    
+    Returns:
+        (doc_id, nodes, source_file, processed_at, tagging_stats)
+    """
+    get = data.get
+    # `or {}` also covers keys present with a null value
+    pi_get = (get("processing_info") or {}).get
+    return (
+        get("doc_id", "unknown"),
+        get("nodes", []),
+        pi_get("source_file", "N/A"),
+        pi_get("processed_at", "N/A"),
+        pi_get("tagging_stats") or {},
+    )
+
+
+class _NodeView(NamedTuple):
+    """Per-node fields used by the exporters, looked up once per node."""
+    id: Any
+    content: str
+    section: str
+    domain: str
+    tags: list[str]
+    tokens: int
+
+
+def _view(node: dict[str, Any]) -> _NodeView:
+    """Pull the exported fields out of a node dict (id is None if missing)."""
+    node_get = node.get
+    md_get = node_get("metadata", {}).get
+    return _NodeView(
+        node_get("id"),
+        node_get("content", ""),
+        node_get("section", ""),
+        md_get("domain", ""),
+        md_get("tags", []),
+        md_get("token_estimate", 0),
+    )
+
+
+def _views(nodes: list[dict[str, Any]],
+           views: Iterable[_NodeView] | None) -> Iterable[_NodeView]:
+    """Return precomputed *views* if given, else build them from *nodes*."""
+    if views is not None:
+        return views
+    return map(_view, nodes)
+
+
+def export_plain_text(data: dict[str, Any], output_path: Path,
+                      views: Iterable[_NodeView] | None = None) -> str:
     """
     Export to plain text format - just the content.
     
     Good for: Quick review, simple text analysis
     """
-    lines = []
     doc_id = data.get("doc_id", "unknown")
     nodes = data.get("nodes", [])
     
-    lines.append(f"# Document: {doc_id}")
-    lines.append(f"# Nodes: {len(nodes)}")
-    lines.append("=" * 80)
-    lines.append("")
+    # Plain output is small (content only): assemble it in memory, encode it
+    # once and hand it to the OS in a single write_bytes() call
+    buf = io.StringIO()
+    w = buf.write
+    w(f"# Document: {doc_id}\n")
+    w(f"# Nodes: {len(nodes)}\n")
+    w(_RULE80)
     
-    for i, node in enumerate(nodes, 1):
-        content = node.get("content", "")
-        section = node.get("section", "")
+    for v in _views(nodes, views):
+        section = v.section
         
+        # Blank line separating this node from the previous block
+        w("\n")
         if section:
-            lines.append(f"[{section}]")
-            lines.append("")
-        
-        lines.append(content)
-        lines.append("")
-        lines.append("-" * 40)
-        lines.append("")
+            w(f"[{section}]\n\n")
+        w(v.content)
+        w("\n\n")
+        w(_RULE40)
     
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    output_path.write_bytes(buf.getvalue().encode("utf-8"))
     
-    print(f"✓ Exported plain text: {output_path}")
+    return f"✓ Exported plain text: {output_path}"
 
 
-def export_detailed_text(data: dict[str, Any], output_path: Path) -> None:
+def export_detailed_text(data: dict[str, Any], output_path: Path,
+                         views: Iterable[_NodeView] | None = None) -> str:
     """
     Export to detailed text format - content with all metadata.
     
     Good for: Detailed review, checking tags and domain classification
     """
-    lines = []
-    doc_id = data.get("doc_id", "unknown")
-    nodes = data.get("nodes", [])
-    processing_info = data.get("processing_info", {})
-    
-    # Header
-    lines.append("=" * 80)
-    lines.append(f"DOCUMENT EXPORT - DETAILED VIEW")
-    lines.append("=" * 80)
-    lines.append("")
-    lines.append(f"Document ID    : {doc_id}")
-    lines.append(f"Source File    : {processing_info.get('source_file', 'N/A')}")
-    lines.append(f"Processed At   : {processing_info.get('processed_at', 'N/A')}")
-    lines.append(f"Total Nodes    : {len(nodes)}")
-    
-    # Tagging stats
-    tagging_stats = processing_info.get("tagging_stats", {})
-    if tagging_stats:
-        lines.append(f"Unique Tags    : {tagging_stats.get('total_unique_tags', 0)}")
-        domains = tagging_stats.get("detected_domains", [])
-        if domains:
-            lines.append(f"Domains        : {', '.join(domains)}")
+    doc_id, nodes, source_file, processed_at, tagging_stats = _doc_header(data)
     
-    lines.append("")
-    lines.append("=" * 80)
-    lines.append("")
-    
-    # Nodes
-    for i, node in enumerate(nodes, 1):
-        node_id = node.get("id", f"node_{i}")
-        content = node.get("content", "")
-        section = node.get("section", "")
-        metadata = node.get("metadata", {})
+    # Text is staged in a StringIO and encoded once per batch, instead of
+    # going through the incremental encoder on every write()
+    buf = io.StringIO()
+    with open(output_path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        w = buf.write
         
-        tags = metadata.get("tags", [])
-        domain = metadata.get("domain", "")
-        token_estimate = metadata.get("token_estimate", 0)
+        # Header
+        w(_RULE80)
+        w("DOCUMENT EXPORT - DETAILED VIEW\n")
+        w(_RULE80)
+        w("\n")
+        w(f"Document ID    : {doc_id}\n")
+        w(f"Source File    : {source_file}\n")
+        w(f"Processed At   : {processed_at}\n")
+        w(f"Total Nodes    : {len(nodes)}\n")
         
-        lines.append(f"┌{'─' * 78}┐")
-        lines.append(f"│ NODE {i}: {node_id}")
-        lines.append(f"├{'─' * 78}┤")
+        # Tagging stats
+        ts_get = tagging_stats.get
+        if tagging_stats:
+            w(f"Unique Tags    : {ts_get('total_unique_tags', 0)}\n")
+            domains = ts_get("detected_domains", [])
+            if domains:
+                w(f"Domains        : {', '.join(domains)}\n")
         
-        if section:
-            lines.append(f"│ Section : {section}")
-        if domain:
-            lines.append(f"│ Domain  : {domain}")
-        if tags:
-            lines.append(f"│ Tags    : {', '.join(tags)}")
-        lines.append(f"│ Tokens  : ~{token_estimate}")
-        
-        lines.append(f"├{'─' * 78}┤")
-        lines.append(f"│ CONTENT:")
-        lines.append(f"│")
+        w("\n")
+        w(_RULE80)
         
-        # Wrap content
-        for line in content.split('\n'):
-            wrapped = line[:76] if len(line) > 76 else line
-            lines.append(f"│ {wrapped}")
+        # Nodes
+        for i, (node_id, content, section, domain, tags, token_estimate) in enumerate(
+                _views(nodes, views), 1):
+            if node_id is None:
+                node_id = f"node_{i}"
+            
+            # Blank line separating this node from the previous block
+            w("\n")
+            w(_BOX_TOP)
+            w(f"│ NODE {i}: {node_id}\n")
+            w(_BOX_MID)
+            
+            if section:
+                w(f"│ Section : {section}\n")
+            if domain:
+                w(f"│ Domain  : {domain}\n")
+            if tags:
+                w(f"│ Tags    : {', '.join(tags)}\n")
+            w(f"│ Tokens  : ~{token_estimate}\n")
+            
+            w(_BOX_MID)
+            w("│ CONTENT:\n")
+            w("│\n")
+            
+            # Wrap content (long lines are wrapped, not truncated)
+            for line in content.split('\n'):
+                for wrapped in textwrap.wrap(
+                    line, 76, replace_whitespace=False, drop_whitespace=False
+                ) or [""]:
+                    w(f"│ {wrapped}\n")
+            
+            w(_BOX_BOT)
+            
+            if buf.tell() >= FLUSH_BATCH_SIZE:
+                _flush_text(buf, f)
         
-        lines.append(f"└{'─' * 78}┘")
-        lines.append("")
-    
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+        _flush_text(buf, f)
     
-    print(f"✓ Exported detailed text: {output_path}")
+    return f"✓ Exported detailed text: {output_path}"
 
 
-def export_training_format(data: dict[str, Any], output_path: Path) -> None:
+def export_training_format(data: dict[str, Any], output_path: Path,
+                           views: Iterable[_NodeView] | None = None) -> str:
     """
     Export to training format - optimized for AI training.
     
@@ -167,30 +275,21 @@ def export_training_format(data: dict[str, Any], output_path: Path) -> None:
     Good for: AI training datasets, fine-tuning data
     """
     lines = []
-    doc_id = data.get("doc_id", "unknown")
-    nodes = data.get("nodes", [])
-    processing_info = data.get("processing_info", {})
+    doc_id, nodes, source_file, _, _ = _doc_header(data)
     
     # Header comment
     lines.append(f"# Training Data Export")
     lines.append(f"# Document: {doc_id}")
-    lines.append(f"# Source: {processing_info.get('source_file', 'N/A')}")
+    lines.append(f"# Source: {source_file}")
     lines.append(f"# Nodes: {len(nodes)}")
     lines.append(f"# Export Date: {datetime.now().isoformat()}")
     lines.append("#")
     lines.append("# Format: Each <TEXT> block is a training sample")
     lines.append("#" + "=" * 77)
-    lines.append("")
     
-    for i, node in enumerate(nodes, 1):
-        content = node.get("content", "")
-        section = node.get("section", "")
-        metadata = node.get("metadata", {})
-        
-        tags = metadata.get("tags", [])
-        domain = metadata.get("domain", "")
-        
-        # Metadata comment
+    for i, (_, content, section, domain, tags, _) in enumerate(_views(nodes, views), 1):
+        # Metadata comment (preceded by a blank separator line)
+        lines.append("")
         lines.append(f"# --- Sample {i} ---")
         if domain:
             lines.append(f"# Domain: {domain}")
@@ -203,158 +302,226 @@ def export_training_format(data: dict[str, Any], output_path: Path) -> None:
         lines.append("<TEXT>")
         lines.append(content.strip())
         lines.append("</TEXT>")
-        lines.append("")
     
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    # One encode and one write_bytes() call, no text-layer encoder in between
+    lines.append("")
+    output_path.write_bytes("\n".join(lines).encode("utf-8"))
     
-    print(f"✓ Exported training format: {output_path}")
+    return f"✓ Exported training format: {output_path}"
 
 
-def export_markdown(data: dict[str, Any], output_path: Path) -> None:
+def export_markdown(data: dict[str, Any], output_path: Path,
+                    views: Iterable[_NodeView] | None = None) -> str:
     """
     Export to Markdown format - nicely formatted for reading.
     
     Good for: Documentation, sharing, presentation
     """
-    lines = []
-    doc_id = data.get("doc_id", "unknown")
-    nodes = data.get("nodes", [])
-    processing_info = data.get("processing_info", {})
-    
-    # Title
-    lines.append(f"# {doc_id}")
-    lines.append("")
-    
-    # Metadata table
-    lines.append("## 📋 Document Info")
-    lines.append("")
-    lines.append("| Property | Value |")
-    lines.append("|----------|-------|")
-    lines.append(f"| Source File | `{processing_info.get('source_file', 'N/A')}` |")
-    lines.append(f"| Total Nodes | {len(nodes)} |")
-    lines.append(f"| Processed At | {processing_info.get('processed_at', 'N/A')} |")
-    
-    tagging_stats = processing_info.get("tagging_stats", {})
-    if tagging_stats:
-        domains = tagging_stats.get("detected_domains", [])
-        if domains:
-            lines.append(f"| Domains | {', '.join(domains)} |")
-        lines.append(f"| Unique Tags | {tagging_stats.get('total_unique_tags', 0)} |")
-    
-    lines.append("")
-    
-    # Tags overview
-    if tagging_stats.get("unique_tags"):
-        lines.append("## 🏷️ Tags")
-        lines.append("")
-        for tag in tagging_stats["unique_tags"]:
-            lines.append(f"- {tag}")
-        lines.append("")
-    
-    # Content
-    lines.append("## 📄 Content")
-    lines.append("")
+    doc_id, nodes, source_file, processed_at, tagging_stats = _doc_header(data)
     
-    current_section = None
-    for i, node in enumerate(nodes, 1):
-        content = node.get("content", "")
-        section = node.get("section", "")
-        metadata = node.get("metadata", {})
+    # Text is staged in a StringIO and encoded once per batch, instead of
+    # going through the incremental encoder on every write()
+    buf = io.StringIO()
+    with open(output_path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        w = buf.write
         
-        tags = metadata.get("tags", [])
-        domain = metadata.get("domain", "")
+        # Title
+        w(f"# {doc_id}\n")
+        w("\n")
         
-        # Section header
-        if section and section != current_section:
-            lines.append(f"### {section}")
-            lines.append("")
-            current_section = section
+        # Metadata table
+        w("## 📋 Document Info\n")
+        w("\n")
+        w("| Property | Value |\n")
+        w("|----------|-------|\n")
+        w(f"| Source File | `{source_file}` |\n")
+        w(f"| Total Nodes | {len(nodes)} |\n")
+        w(f"| Processed At | {processed_at} |\n")
         
-        # Node info
-        lines.append(f"**Node {i}**")
-        if domain:
-            lines.append(f"- Domain: `{domain}`")
-        if tags:
-            lines.append(f"- Tags: {', '.join([f'`{t}`' for t in tags])}")
-        lines.append("")
+        ts_get = tagging_stats.get
+        if tagging_stats:
+            domains = ts_get("detected_domains", [])
+            if domains:
+                w(f"| Domains | {', '.join(domains)} |\n")
+            w(f"| Unique Tags | {ts_get('total_unique_tags', 0)} |\n")
         
-        # Content (as blockquote)
-        lines.append("> " + content.replace("\n", "\n> "))
-        lines.append("")
-        lines.append("---")
-        lines.append("")
-    
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+        w("\n")
+        
+        # Tags overview
+        unique_tags = ts_get("unique_tags")
+        if unique_tags:
+            w("## 🏷️ Tags\n")
+            w("\n")
+            for tag in unique_tags:
+                w(f"- {tag}\n")
+            w("\n")
+        
+        # Content
+        w("## 📄 Content\n")
+        
+        current_section = None
+        for i, (_, content, section, domain, tags, _) in enumerate(
+                _views(nodes, views), 1):
+            # Blank line separating this node from the previous block
+            w("\n")
+            
+            # Section header
+            if section and section != current_section:
+                w(f"### {section}\n")
+                w("\n")
+                current_section = section
+            
+            # Node info
+            w(f"**Node {i}**\n")
+            if domain:
+                w(f"- Domain: `{domain}`\n")
+            if tags:
+                w("- Tags: `")
+                w("`, `".join(tags))
+                w("`\n")
+            w("\n")
+            
+            # Content (as blockquote)
+            w("> ")
+            w(content.replace("\n", "\n> "))
+            w("\n")
+            w("\n")
+            w("---\n")
+            
+            if buf.tell() >= FLUSH_BATCH_SIZE:
+                _flush_text(buf, f)
+        
+        _flush_text(buf, f)
     
-    print(f"✓ Exported markdown: {output_path}")
+    return f"✓ Exported markdown: {output_path}"
 
 
-def export_jsonl(data: dict[str, Any], output_path: Path) -> None:
+def export_jsonl(data: dict[str, Any], output_path: Path,
+                 views: Iterable[_NodeView] | None = None) -> str:
     """
     Export to JSONL format - one JSON object per line.
     
     Good for: AI training, streaming data processing
     """
-    nodes = data.get("nodes", [])
-    doc_id = data.get("doc_id", "unknown")
-    source_file = data.get("processing_info", {}).get("source_file", "")
-    
-    with open(output_path, "w", encoding="utf-8") as f:
-        for node in nodes:
-            metadata = node.get("metadata", {})
-            
+    get = data.get
+    nodes = get("nodes", [])
+    doc_id = get("doc_id", "unknown")
+    source_file = (get("processing_info") or {}).get("source_file", "")
+    
+    # Serialized lines are accumulated in a bytearray and flushed in ~64 KiB
+    # batches, so the file sees a handful of large writes instead of one per node
+    buf = bytearray()
+    with open(output_path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        for v in _views(nodes, views):
             # Create training sample
             sample = {
-                "id": node.get("id", ""),
-                "text": node.get("content", ""),
-                "section": node.get("section", ""),
-                "domain": metadata.get("domain", ""),
-                "tags": metadata.get("tags", []),
+                "id": "" if v.id is None else v.id,
+                "text": v.content,
+                "section": v.section,
+                "domain": v.domain,
+                "tags": v.tags,
                 "source": source_file,
                 "doc_id": doc_id
             }
             
-            f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+            buf += _json_line(sample)
+            if len(buf) >= FLUSH_BATCH_SIZE:
+                f.write(buf)
+                buf.clear()
+        
+        if buf:
+            f.write(buf)
     
-    print(f"✓ Exported JSONL: {output_path}")
+    return f"✓ Exported JSONL: {output_path}"
+
+
+# Output filename suffix and exporter for each format
+# (every exporter also takes an optional precomputed list of _NodeView and
+# returns a one-line status message instead of printing it)
+FORMAT_EXPORTERS: dict[str, tuple[str, Callable[..., str]]] = {
+    "plain": ("_plain.txt", export_plain_text),
+    "detailed": ("_detailed.txt", export_detailed_text),
+    "training": ("_training.txt", export_training_format),
+    "markdown": ("_review.md", export_markdown),
+    "jsonl": ("_training.jsonl", export_jsonl),
+}
+
 
+def _up_to_date(output_path: Path, src_mtime_ns: int) -> bool:
+    """True if *output_path* exists and is not older than the source JSON."""
+    try:
+        return output_path.stat().st_mtime_ns >= src_mtime_ns
+    except FileNotFoundError:
+        return False
 
-def export_file(json_path: Path, format_type: str = "plain") -> None:
-    """Export a single JSON file."""
+
+def export_file(json_path: Path, format_type: str = "plain",
+                force: bool = False) -> str:
+    """
+    Export a single JSON file.
+    
+    *format_type* may be a comma-separated list (e.g. "plain,markdown");
+    the JSON is then parsed once and shared by every requested format, and
+    the per-node fields are extracted once (as _NodeView) for all of them.
+    
+    Outputs that are already newer than *json_path* are skipped unless
+    *force* is set.
+    
+    Returns:
+        Status lines for this file (one per format), for the caller to print
+    """
     ensure_directories()
     
+    formats = [fmt.strip() for fmt in format_type.split(",")]
+    src_mtime_ns = json_path.stat().st_mtime_ns
+    
+    # Output names come from the doc_id inside the JSON, so it is parsed
+    # even when every export turns out to be up to date
     data = load_json(json_path)
     doc_id = data.get("doc_id", json_path.stem)
     
-    # Determine output filename
-    format_suffix = {
-        "plain": "_plain.txt",
-        "markdown": "_review.md",
-        "jsonl": "_training.jsonl"
-    }
-    
-    suffix = format_suffix.get(format_type, "_plain.txt")
-    output_path = EXPORT_DIR / f"{doc_id}{suffix}"
-    
-    # Export based on format
-    if format_type == "plain":
-        export_plain_text(data, output_path)
-    elif format_type == "markdown":
-        export_markdown(data, output_path)
-    elif format_type == "jsonl":
-        export_jsonl(data, output_path)
-    else:
-        print(f"Unknown format: {format_type}")
-        return
+    status: list[str] = []
+    pending: list[tuple[int, Callable[..., str], Path]] = []
+    for fmt in formats:
+        if fmt not in FORMAT_EXPORTERS:
+            status.append(f"Unknown format: {fmt}")
+            continue
+        
+        suffix, exporter = FORMAT_EXPORTERS[fmt]
+        output_path = EXPORT_DIR / f"{doc_id}{suffix}"
+        if not force and _up_to_date(output_path, src_mtime_ns):
+            status.append(f"- Up to date, skipped: {output_path}")
+            continue
+        pending.append((len(status), exporter, output_path))
+        status.append("")
+    
+    # One pass over the nodes feeds every format that actually gets written
+    views = None
+    if len(pending) > 1:
+        views = [_view(node) for node in data.get("nodes", [])]
+    
+    for slot, exporter, output_path in pending:
+        status[slot] = exporter(data, output_path, views)
+    
+    return "\n".join(status)
+
 
+def _list_processed() -> list[Path]:
+    """List *_lightrag.json files in PROCESSED_DIR (suffix check, no glob)."""
+    if not PROCESSED_DIR.is_dir():
+        return []
+    with os.scandir(PROCESSED_DIR) as it:
+        return sorted(
+            Path(entry.path) for entry in it
+            if entry.name.endswith("_lightrag.json") and entry.is_file()
+        )
 
-def export_all(format_type: str = "plain") -> None:
-    """Export all JSON files in processed directory."""
+
+def export_all(format_type: str = "plain", force: bool = False) -> None:
+    """Export all JSON files in processed directory (unchanged ones are skipped unless *force*)."""
     ensure_directories()
     
-    json_files = list(PROCESSED_DIR.glob("*_lightrag.json"))
+    json_files = _list_processed()
     
     if not json_files:
         print("No processed JSON files found.")
@@ -363,14 +530,22 @@ def export_all(format_type: str = "plain") -> None:
     print(f"Found {len(json_files)} files to export...")
     print("")
     
-    for json_path in json_files:
-        export_file(json_path, format_type)
+    export_one = partial(export_file, format_type=format_type, force=force)
+    if len(json_files) < PARALLEL_MIN_FILES:
+        results = [export_one(json_path) for json_path in json_files]
+    else:
+        # Each file is exported independently - fan out across processes
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(export_one, json_files, chunksize=4))
+    
+    # Workers return their status lines; report them with one write
+    sys.stdout.write("\n".join(results) + "\n")
     
     print("")
     print(f"✓ All files exported to: {EXPORT_DIR}")
 
 
-def main():
+def main() -> None:
     """Main entry point."""
     parser = argparse.ArgumentParser(
         description="Export processed JSON to readable text formats",
@@ -382,9 +557,13 @@ Examples:
   python export_text.py test_simple_2_lightrag.json --format jsonl
   python export_text.py --all
   python export_text.py --all --format markdown
+  python export_text.py --all --formats plain,detailed,markdown
+  python export_text.py --all --force
 
 Formats:
   plain     - Simple text, just content (default)
+  detailed  - Content with all metadata in boxed blocks
+  training  - <TEXT> blocks with metadata comments
   markdown  - Nicely formatted Markdown for review
   jsonl     - JSON Lines format for ML pipelines
         """
@@ -398,21 +577,34 @@ Formats:
     
     parser.add_argument(
         "--format", "-f",
-        choices=["plain", "markdown", "jsonl"],
+        choices=list(FORMAT_EXPORTERS),
         default="plain",
         help="Output format (default: plain)"
     )
     
+    parser.add_argument(
+        "--formats",
+        help="Comma-separated list of formats to export in one pass "
+             "(e.g. plain,detailed,markdown); overrides --format"
+    )
+    
     parser.add_argument(
         "--all", "-a",
         action="store_true",
         help="Export all JSON files in processed directory"
     )
     
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-export even if the output is newer than the JSON file"
+    )
+    
     args = parser.parse_args()
+    format_type = args.formats or args.format
     
     if args.all:
-        export_all(args.format)
+        export_all(format_type, args.force)
     elif args.json_file:
         # Find the JSON file
         json_path = PROCESSED_DIR / args.json_file
@@ -428,7 +620,7 @@ Formats:
                 print(f"  - {f.name}")
             sys.exit(1)
         
-        export_file(json_path, args.format)
+        print(export_file(json_path, format_type, args.force))
     else:
         parser.print_help()
 
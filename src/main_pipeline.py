@@ -24,50 +24,186 @@ Author: Research Assistant
 Date: January 2026
 """
 
+import os
 import sys
+import glob
 import json
+import hashlib
 import argparse
 import logging
+import logging.handlers
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable
+
+# Resolved once; also the root of the directory configuration below
+BASE_DIR = Path(__file__).parent
 
 # Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent))
-
-from marker import run_marker_conversion_to_json
-from pipeline.cleaning_v1 import clean_marker_output, clean_text
-from pipeline.final_cleaning import final_clean_content
-from pipeline.chunking import chunk_to_nodes, reorder_nodes_by_position
-from pipeline.audit_nodes import audit_and_merge_nodes
-from pipeline.auto_tagging import add_tags_to_nodes
-from pipeline.export_standard import (
-    export_standard_json_files, get_pdf_page_count,
-)
-from pipeline.page_utils import (
-    extract_per_page_text, assign_pages_to_nodes,
-)
-from pipeline.text_utils import ensure_single_context, normalize_source
-from export_text import export_plain_text, EXPORT_DIR
-from tools.clean_and_repair_nodes import CleaningPipeline
-from tools.rechunk_by_structure import RechunkPipeline
+sys.path.insert(0, str(BASE_DIR))
+
+# The step modules (marker, pipeline.*, tools.*) are imported inside the
+# functions that use them, so --list / --help do not pay for loading them
+from export_text import EXPORT_DIR
+
+# Optional fast JSON backend for intermediate files; stdlib json otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
 
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+# Configure logging: records are buffered and written to stderr in batches
+# (at step boundaries, every 64 records, or at once for warnings/errors)
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter(
+    '%(asctime)s - %(levelname)s - %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
+))
+_log_buffer = logging.handlers.MemoryHandler(
+    capacity=64, flushLevel=logging.WARNING, target=_log_stream
 )
+logging.basicConfig(level=logging.INFO, handlers=[_log_buffer])
 logger = logging.getLogger(__name__)
 
 
+def flush_log() -> None:
+    """Write out buffered log records (call before long-running work)."""
+    _log_buffer.flush()
+
+
 # Directory configuration
-BASE_DIR = Path(__file__).parent
 RAW_DIR = BASE_DIR / "data" / "raw"
 PROCESSED_DIR = BASE_DIR / "data" / "processed"
 STANDARD_DIR = PROCESSED_DIR / "standard"
 TEMP_DIR = BASE_DIR / "temp_pipeline"
+# Whole-pipeline result cache (Marker keeps its own in data/processed/.marker_cache)
+PIPELINE_CACHE_DIR = PROCESSED_DIR / "pipeline_cache"
+CLEANED_FINAL_DIR = BASE_DIR / "cleaned_final"
+
+# Recorded in every output. Part of the result cache key together with a
+# digest of the pipeline sources (see _pipeline_source_digest), so code
+# edits invalidate cached results without a manual bump
+PIPELINE_VERSION = "1.1.0"
+
+# Sources whose code shapes the cached output (relative to BASE_DIR); the
+# exports (steps 9-11) are rerun on a cache hit and are not part of the key
+CACHE_SOURCE_GLOBS = ("main_pipeline.py", "marker.py", "pipeline/*.py", "tools/*.py")
+
+# Below this many chars of cleaned text (e.g. scanned, image-only PDFs) the
+# remaining steps are skipped and an output with no nodes is returned
+MIN_USEFUL_CHARS = 200
+
+# Default cap on parallel PDFs in batch mode (each worker runs its own Marker)
+BATCH_MAX_WORKERS = 4
+
+
+def _dump_json(obj: Any, pretty: bool = False) -> bytes:
+    """
+    Serialize *obj* to UTF-8 JSON bytes (non-ASCII kept as is).
+    
+    Args:
+        obj: JSON-serializable object
+        pretty: Indent with 2 spaces (for human-readable output);
+            otherwise the output is compact
+        
+    Returns:
+        Encoded JSON, terminated by a newline
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return (text + "\n").encode("utf-8")
+
+
+def _json_item(obj: Any) -> bytes:
+    """Compact JSON bytes for *obj*, without the trailing newline."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _write_json_value(write: Callable[[bytes], Any], value: Any) -> None:
+    """Write *value*; a list is encoded one item at a time."""
+    if isinstance(value, list):
+        write(b"[")
+        for i, item in enumerate(value):
+            if i:
+                write(b",")
+            write(_json_item(item))
+        write(b"]")
+    else:
+        write(_json_item(value))
+
+
+def _write_json(path: Path, obj: Any) -> None:
+    """
+    Write *obj* to *path* as compact JSON (same bytes as _dump_json(obj)).
+    
+    Lists at the top level or directly under a top-level key (e.g. "nodes")
+    are streamed item by item, so the whole document never exists as one
+    bytes object in memory. Top-level keys must be strings.
+    """
+    with open(path, "wb", buffering=1 << 20) as f:
+        write = f.write
+        if isinstance(obj, dict):
+            write(b"{")
+            for i, (key, value) in enumerate(obj.items()):
+                if i:
+                    write(b",")
+                write(_json_item(key))
+                write(b":")
+                _write_json_value(write, value)
+            write(b"}")
+        else:
+            _write_json_value(write, obj)
+        write(b"\n")
+
+
+def _load_json(raw: bytes) -> Any:
+    """Parse JSON bytes (orjson if available)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+@lru_cache(maxsize=1)
+def _pipeline_source_digest() -> str:
+    """BLAKE2b digest of the CACHE_SOURCE_GLOBS files (tests excluded)."""
+    h = hashlib.blake2b(digest_size=8)
+    for pattern in CACHE_SOURCE_GLOBS:
+        for path in sorted(BASE_DIR.glob(pattern)):
+            if path.name.startswith("test_"):
+                continue
+            h.update(f"{path.relative_to(BASE_DIR).as_posix()}\0".encode("utf-8"))
+            h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def pipeline_cache_key(pdf_path: Path, config: tuple[Any, ...]) -> str:
+    """
+    Content-addressed cache key for a pipeline run.
+    
+    Args:
+        pdf_path: Input PDF
+        config: Every setting that affects the output
+        
+    Returns:
+        16-hex-digit BLAKE2b digest of the PDF bytes, config, PIPELINE_VERSION
+        and pipeline sources
+    """
+    from marker import pdf_digest
+    
+    settings = repr((PIPELINE_VERSION, _pipeline_source_digest(), config))
+    return pdf_digest(pdf_path, settings.encode("utf-8"), digest_size=8)
 
 
 def ensure_directories() -> None:
@@ -97,15 +233,20 @@ def find_pdf_file(pdf_name: str) -> Path | None:
     if pdf_path.exists():
         return pdf_path
     
-    # Try case-insensitive search
+    # Case-insensitive match
+    return _pdf_index().get(pdf_name.lower())
+
+
+def _pdf_index() -> dict[str, Path]:
+    """{lowercased name: path} for the PDF files in RAW_DIR (first match wins)."""
+    index: dict[str, Path] = {}
     for file in RAW_DIR.glob("*.pdf"):
-        if file.name.lower() == pdf_name.lower():
-            return file
-    
-    return None
+        index.setdefault(file.name.lower(), file)
+    return index
 
 
-def run_marker_step(pdf_path: Path, device: str = "cpu", timeout: int = 0, batch_size: int = 0) -> dict[str, Any]:
+def run_marker_step(pdf_path: Path, device: str = "cpu", timeout: int = 0, batch_size: int = 0,
+                    use_cache: bool = True) -> dict[str, Any]:
     """
     Run Marker conversion step.
     
@@ -114,6 +255,7 @@ def run_marker_step(pdf_path: Path, device: str = "cpu", timeout: int = 0, batch
         device: Device to use ("cpu" or "gpu")
         timeout: Timeout in seconds for conversion (default: 1800)
         batch_size: Batch size for GPU (0 = auto, 16-32 for 8GB, 64+ for 16GB+)
+        use_cache: Reuse Marker's cached conversion of the same PDF bytes
         
     Returns:
         Marker JSON output
@@ -125,62 +267,74 @@ def run_marker_step(pdf_path: Path, device: str = "cpu", timeout: int = 0, batch
     logger.info(f"  Device: {device.upper()}")
     if device == "gpu" and batch_size > 0:
         logger.info(f"  GPU Batch Size: {batch_size}")
+    flush_log()
     
-    # Output to temp directory
-    temp_json = TEMP_DIR / f"{pdf_path.stem}_marker.json"
+    from marker import run_marker_conversion
     
-    stats = run_marker_conversion_to_json(str(pdf_path), str(temp_json), device=device, timeout=timeout, batch_size=batch_size)
+    # Result is handed over in memory (saved only with --save-intermediate)
+    marker_output, stats = run_marker_conversion(str(pdf_path), device=device, timeout=timeout,
+                                                 batch_size=batch_size, use_cache=use_cache)
     
-    if not stats.get("success"):
+    if marker_output is None or not stats.get("success"):
         raise RuntimeError(f"Marker conversion failed: {stats.get('error', 'Unknown error')}")
     
-    # Load the JSON output
-    with open(temp_json, "r", encoding="utf-8") as f:
-        marker_output = json.load(f)
-    
-    logger.info(f"  ✓ Marker conversion completed in {stats['conversion_time_seconds']}s")
+    if stats.get("cache_hit"):
+        logger.info("  ✓ Marker conversion reused from cache")
+    else:
+        logger.info(f"  ✓ Marker conversion completed in {stats['conversion_time_seconds']}s")
     
     return marker_output
 
 
-def run_cleaning_v1_step(marker_output: dict[str, Any]) -> dict[str, Any]:
+def run_cleaning_v1_step(marker_output: dict[str, Any], keep_input_text: bool = True) -> dict[str, Any]:
     """
     Run initial cleaning step.
     
     Args:
         marker_output: Marker JSON output
+        keep_input_text: Keep the raw "content" field in the result
+            (False lets the raw text be freed once this step is done)
         
     Returns:
         Cleaned output with cleaned_content field
     """
     logger.info("Step 2: Running initial content cleaning (cleaning_v1)")
     
+    from pipeline.cleaning_v1 import clean_marker_output
+    
     result = clean_marker_output(marker_output)
     
     original_len = len(marker_output.get("content", ""))
     cleaned_len = len(result.get("cleaned_content", ""))
+    if not keep_input_text:
+        result.pop("content", None)
     
     logger.info(f"  ✓ Content cleaned: {original_len} → {cleaned_len} chars")
     
     return result
 
 
-def run_final_cleaning_step(data: dict[str, Any]) -> dict[str, Any]:
+def run_final_cleaning_step(data: dict[str, Any], keep_input_text: bool = True) -> dict[str, Any]:
     """
     Run final Vietnamese cleaning step.
     
     Args:
         data: Data with cleaned_content field
+        keep_input_text: Keep the "cleaned_content" field in the result
         
     Returns:
         Data with final_content field
     """
     logger.info("Step 3: Running Vietnamese text cleanup (final_cleaning)")
     
+    from pipeline.final_cleaning import final_clean_content
+    
     result = final_clean_content(data)
     
     cleaned_len = len(data.get("cleaned_content", ""))
     final_len = len(result.get("final_content", ""))
+    if not keep_input_text:
+        result.pop("cleaned_content", None)
     
     logger.info(f"  ✓ Final cleanup: {cleaned_len} → {final_len} chars")
     
@@ -190,7 +344,8 @@ def run_final_cleaning_step(data: dict[str, Any]) -> dict[str, Any]:
 def run_chunking_step(
     data: dict[str, Any],
     min_tokens: int = 150,
-    max_tokens: int = 400
+    max_tokens: int = 400,
+    keep_input_text: bool = True,
 ) -> dict[str, Any]:
     """
     Run semantic chunking step.
@@ -199,13 +354,18 @@ def run_chunking_step(
         data: Data with final_content field
         min_tokens: Minimum tokens per node
         max_tokens: Maximum tokens per node
+        keep_input_text: Keep the "final_content" field in the result
         
     Returns:
         Data with nodes list
     """
     logger.info(f"Step 4: Creating semantic nodes ({min_tokens}-{max_tokens} tokens)")
     
+    from pipeline.chunking import chunk_to_nodes
+    
     result = chunk_to_nodes(data, min_tokens=min_tokens, max_tokens=max_tokens)
+    if not keep_input_text:
+        result.pop("final_content", None)
     
     stats = result.get("chunking_stats", {})
     logger.info(f"  ✓ Created {stats.get('total_nodes', 0)} nodes (avg {stats.get('avg_tokens', 0)} tokens)")
@@ -218,12 +378,14 @@ def run_clean_and_repair_nodes_step(
     skip_admin: bool = False,
     skip_name_list: bool = False,
     skip_toc: bool = False,
+    doc_id: str = "",
 ) -> dict[str, Any]:
     """
     Run node cleaning and repair step (removes noise, fixes tables).
     
     Args:
         data: Data with nodes list
+        doc_id: Document identifier, used to keep temp dirs separate per PDF
         
     Returns:
         Data with cleaned nodes
@@ -236,7 +398,7 @@ def run_clean_and_repair_nodes_step(
         return data
     
     # Create temporary cleaned nodes directory
-    temp_clean_dir = PROCESSED_DIR / "temp_cleaned"
+    temp_clean_dir = PROCESSED_DIR / "temp_cleaned" / doc_id
     temp_clean_dir.mkdir(parents=True, exist_ok=True)
     
     # Write nodes to temp directory
@@ -248,13 +410,14 @@ def run_clean_and_repair_nodes_step(
         export_node.setdefault("chunk_id", node.get("id", f"node_{i:04d}"))
         export_node.setdefault("source", node.get("metadata", {}).get("doc_id", "unknown"))
         export_node.setdefault("tags", node.get("metadata", {}).get("tags", []))
-        with open(node_file, "w", encoding="utf-8") as f:
-            json.dump(export_node, f, ensure_ascii=False, indent=2)
+        node_file.write_bytes(_dump_json(export_node))
     
     # Run cleaning pipeline
+    from tools.clean_and_repair_nodes import CleaningPipeline
+    
     cleaning_pipeline = CleaningPipeline(
         input_dir=str(temp_clean_dir),
-        output_dir=str(PROCESSED_DIR / "temp_cleaned_output"),
+        output_dir=str(PROCESSED_DIR / "temp_cleaned_output" / doc_id),
         skip_admin=skip_admin,
         skip_name_list=skip_name_list,
         skip_toc=skip_toc
@@ -262,7 +425,7 @@ def run_clean_and_repair_nodes_step(
     cleaning_pipeline.run()
     
     # Load cleaned nodes
-    cleaned_nodes_dir = PROCESSED_DIR / "temp_cleaned_output" / "output_clean"
+    cleaned_nodes_dir = PROCESSED_DIR / "temp_cleaned_output" / doc_id / "output_clean"
     cleaned_nodes = []
     
     for node_file in sorted(cleaned_nodes_dir.glob("*.json")):
@@ -283,13 +446,15 @@ def run_clean_and_repair_nodes_step(
 
 
 def run_rechunk_by_structure_step(
-    data: dict[str, Any]
+    data: dict[str, Any],
+    doc_id: str = "",
 ) -> dict[str, Any]:
     """
     Run structure-aware rechunking step (replaces fixed page-based chunking).
     
     Args:
         data: Data with cleaned nodes
+        doc_id: Document identifier, used to keep temp dirs separate per PDF
         
     Returns:
         Data with rechunked semantic nodes
@@ -302,26 +467,27 @@ def run_rechunk_by_structure_step(
         return data
     
     # Create temporary nodes directory
-    temp_rechunk_input = PROCESSED_DIR / "temp_rechunk_input"
+    temp_rechunk_input = PROCESSED_DIR / "temp_rechunk_input" / doc_id
     temp_rechunk_input.mkdir(parents=True, exist_ok=True)
     
     # Write nodes to temp directory
     for i, node in enumerate(nodes):
         node_file = temp_rechunk_input / f"node_{i:04d}.json"
-        with open(node_file, "w", encoding="utf-8") as f:
-            json.dump(node, f, ensure_ascii=False, indent=2)
+        node_file.write_bytes(_dump_json(node))
     
     # Run rechunking pipeline
+    from tools.rechunk_by_structure import RechunkPipeline
+    
     rechunk_pipeline = RechunkPipeline(
         input_dir=str(temp_rechunk_input),
-        output_dir=str(PROCESSED_DIR / "temp_rechunked_output"),
+        output_dir=str(PROCESSED_DIR / "temp_rechunked_output" / doc_id),
         target_chars=8000,
         min_chars=2000
     )
     rechunk_pipeline.run()
     
     # Load rechunked nodes and convert to pipeline format
-    rechunked_nodes_dir = PROCESSED_DIR / "temp_rechunked_output" / "output_rechunk"
+    rechunked_nodes_dir = PROCESSED_DIR / "temp_rechunked_output" / doc_id / "output_rechunk"
     rechunked_nodes = []
     
     for node_file in sorted(rechunked_nodes_dir.glob("*.json")):
@@ -406,6 +572,8 @@ def run_audit_step(
     """
     logger.info("Step 5: Auditing and deduplicating nodes")
     
+    from pipeline.audit_nodes import audit_and_merge_nodes
+    
     result = audit_and_merge_nodes(
         data,
         duplicate_threshold=duplicate_threshold,
@@ -435,45 +603,69 @@ def run_auto_tagging_step(
         max_tags_per_node: Maximum tags per node
         
     Returns:
-        Data with tagged nodes
+        Data with tagged nodes (*data* itself, updated in place)
     """
     logger.info("Step 6: Auto-tagging nodes based on content")
     
     nodes = data.get("nodes", [])
+    if not nodes:
+        # Nothing to tag (e.g. image-only PDF)
+        data["nodes"] = []
+        data["tagging_stats"] = {
+            "total_unique_tags": 0,
+            "unique_tags": [],
+            "detected_domains": []
+        }
+        logger.info("  ✓ Tagged 0 nodes with 0 unique tags")
+        return data
+    
+    from pipeline.auto_tagging import add_tags_to_nodes
+    
     tagged_nodes = add_tags_to_nodes(nodes, source_file, max_tags_per_node)
     
     # Count unique tags and domains
     all_tags: set[str] = set()
     all_domains: set[str] = set()
     for node in tagged_nodes:
-        metadata = node.get("metadata", {})
-        tags = metadata.get("tags", [])
-        domain = metadata.get("domain", "")
-        all_tags.update(tags)
+        md_get = (node.get("metadata") or {}).get
+        all_tags.update(md_get("tags", []))
+        domain = md_get("domain", "")
         if domain:
             all_domains.add(domain)
     
-    result = data.copy()
-    result["nodes"] = tagged_nodes
-    result["tagging_stats"] = {
-        "total_unique_tags": len(all_tags),
-        "unique_tags": sorted(list(all_tags)),
-        "detected_domains": sorted(list(all_domains))
+    # Sorted once, shared by the stats and the log lines
+    sorted_tags = sorted(all_tags)
+    sorted_domains = sorted(all_domains)
+    
+    # The caller owns data: update it in place instead of copying
+    data["nodes"] = tagged_nodes
+    data["tagging_stats"] = {
+        "total_unique_tags": len(sorted_tags),
+        "unique_tags": sorted_tags,
+        "detected_domains": sorted_domains
     }
     
-    logger.info(f"  ✓ Tagged {len(tagged_nodes)} nodes with {len(all_tags)} unique tags")
-    if all_domains:
-        logger.info(f"    Domains: {', '.join(sorted(list(all_domains)))}")
-    if all_tags:
-        logger.info(f"    Tags: {', '.join(sorted(list(all_tags))[:5])}{'...' if len(all_tags) > 5 else ''}")
+    logger.info(f"  ✓ Tagged {len(tagged_nodes)} nodes with {len(sorted_tags)} unique tags")
+    if sorted_domains:
+        logger.info(f"    Domains: {', '.join(sorted_domains)}")
+    if sorted_tags:
+        logger.info(f"    Tags: {', '.join(sorted_tags[:5])}{'...' if len(sorted_tags) > 5 else ''}")
     
-    return result
+    return data
+
+
+# Node fields kept in the LightRAG output (page_start / page_end are carried
+# at top level for downstream page lookups)
+LIGHTRAG_NODE_FIELDS = frozenset({"id", "content", "section", "metadata", "page_start", "page_end"})
 
 
 def create_lightrag_output(data: dict[str, Any], doc_id: str) -> dict[str, Any]:
     """
     Create final LightRAG-compatible output format.
     
+    The nodes are projected in place (extra fields are dropped from the
+    existing dicts) instead of being copied, so *data*["nodes"] is consumed.
+    
     Args:
         data: Processed data with nodes
         doc_id: Document identifier
@@ -481,25 +673,18 @@ def create_lightrag_output(data: dict[str, Any], doc_id: str) -> dict[str, Any]:
     Returns:
         LightRAG-compatible output
     """
-    # Extract only the nodes with required fields
-    nodes: list[dict[str, Any]] = []
-    for node in data.get("nodes", []):
+    from pipeline.cleaning_v1 import clean_text
+    
+    nodes: list[dict[str, Any]] = data.get("nodes", [])
+    for node in nodes:
         # Clean content one final time before output
-        content = clean_text(node.get("content", ""))
-
-        lightrag_node: dict[str, Any] = {
-            "id": node["id"],
-            "content": content,
-            "section": node.get("section", ""),
-            "metadata": node.get("metadata", {})
-        }
-        # Carry page_start / page_end at top level for downstream
-        if "page_start" in node:
-            lightrag_node["page_start"] = node["page_start"]
-        if "page_end" in node:
-            lightrag_node["page_end"] = node["page_end"]
-
-        nodes.append(lightrag_node)
+        node["content"] = clean_text(node.get("content", ""))
+        node.setdefault("section", "")
+        node.setdefault("metadata", {})
+        
+        # Keep only the required fields
+        for key in [k for k in node if k not in LIGHTRAG_NODE_FIELDS]:
+            del node[key]
     
     output: dict[str, Any] = {
         "doc_id": doc_id,
@@ -507,7 +692,7 @@ def create_lightrag_output(data: dict[str, Any], doc_id: str) -> dict[str, Any]:
         "processing_info": {
             "source_file": data.get("source_file", ""),
             "processed_at": datetime.now().isoformat(),
-            "pipeline_version": "1.1.0",
+            "pipeline_version": PIPELINE_VERSION,
             "total_nodes": len(nodes),
             "chunking_stats": data.get("chunking_stats", {}),
             "audit_stats": data.get("audit_stats", {}),
@@ -531,6 +716,8 @@ def run_full_pipeline(
     skip_admin: bool = False,
     skip_toc: bool = False,
     skip_name_list: bool = False,
+    use_cache: bool = True,
+    pretty: bool = False,
 ) -> dict[str, Any]:
     """
     Run the complete preprocessing pipeline (with integrated tools).
@@ -555,6 +742,14 @@ def run_full_pipeline(
         timeout: Timeout in seconds for Marker conversion (default: 0 = unlimited)
         batch_size: GPU batch size (0 = auto 16, increase for faster GPU: 32, 64, 128)
         auto_chunk_pages: Auto split if PDF > this pages (0 = disable, default: 6)
+        use_cache: Reuse the stored output of an earlier run on the same PDF
+            bytes with the same settings and pipeline code
+            (data/processed/pipeline_cache/); only the export steps (9-11) are rerun
+            on a hit. It is not read when save_intermediate is set, nor for
+            auto-chunked PDFs. Also lets Marker reuse its cached conversion
+            of the PDF
+        pretty: Indent the cleaned_final/ JSON files for human reading
+            (default: compact; intermediate files are always compact)
         
     Returns:
         LightRAG-compatible output dictionary
@@ -570,6 +765,161 @@ def run_full_pipeline(
     if pdf_path is None:
         raise FileNotFoundError(f"PDF file not found: {pdf_name}")
     
+    return _run_full_pipeline(
+        pdf_path, min_tokens, max_tokens, duplicate_threshold, save_intermediate,
+        device, timeout, batch_size, auto_chunk_pages, skip_admin, skip_toc, skip_name_list,
+        pretty, use_cache,
+    )
+
+
+def _store_cached_output(cache_path: Path | None, output: dict[str, Any]) -> None:
+    """Save *output* under *cache_path* (no-op when caching is off)."""
+    if cache_path is None:
+        return
+    PIPELINE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    _write_json(cache_path, output)
+
+
+def _export_outputs(output: dict[str, Any], pdf_path: Path, doc_id: str,
+                    pretty: bool) -> tuple[Path, int]:
+    """
+    Steps 9-11: write the review text, standard JSON and cleaned_final/ files.
+    
+    Returns:
+        (standard JSON directory, number of standard JSON files written)
+    """
+    from pipeline.export_standard import (
+        export_standard_json_files, get_pdf_page_count,
+    )
+    from pipeline.text_utils import ensure_single_context, normalize_source
+    from export_text import export_plain_text
+    
+    # Step 9: Export text files for review
+    logger.info("Step 9: Exporting text file for review")
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    
+    export_plain_text(output, EXPORT_DIR / f"{doc_id}_plain.txt")
+    
+    logger.info(f"  ✓ Exported text file to {EXPORT_DIR}")
+    
+    # Step 10: Export standard JSON (One Object per File)
+    logger.info("Step 10: Exporting standard JSON files (One Object per File)")
+    
+    total_pages = get_pdf_page_count(str(pdf_path))
+    standard_output_dir = PROCESSED_DIR
+    
+    standard_files = export_standard_json_files(
+        output,
+        standard_output_dir,
+        total_pages=total_pages,
+        pdf_path=str(pdf_path)
+    )
+    
+    logger.info(f"  ✓ Exported {len(standard_files)} standard JSON files to {standard_output_dir}")
+    
+    # Step 11: Export cleaned_final/ — minimal {source, page, content}
+    logger.info("Step 11: Exporting cleaned_final/ (minimal format)")
+    cleaned_final_dir = CLEANED_FINAL_DIR
+    cleaned_final_dir.mkdir(parents=True, exist_ok=True)
+
+    # Normalize source: strip _part_XX suffix, ensure .pdf
+    source_file_name = normalize_source(pdf_path.name)
+    minimal_records: list[dict[str, Any]] = []
+    for i, node in enumerate(output["nodes"]):
+        pg = None
+        if isinstance(node.get("page_start"), int) and node["page_start"] > 0:
+            pg = node["page_start"]
+        elif isinstance(node.get("page"), int) and node["page"] > 0:
+            pg = node["page"]
+        if pg is None:
+            pg = 1
+
+        content = ensure_single_context(source_file_name, node.get("content", ""))
+        record: dict[str, Any] = {
+            "source": source_file_name,
+            "page": pg,
+            "content": content,
+        }
+        minimal_records.append(record)
+
+        chunk_id = node.get("id", f"chunk_{i:04d}")
+        cf_path = cleaned_final_dir / f"{doc_id}_{chunk_id}.json"
+        cf_path.write_bytes(_dump_json(record, pretty=pretty))
+
+    # Combined _final.json = JSON ARRAY
+    base_name = normalize_source(pdf_path.name).replace('.pdf', '')
+    final_json_path = cleaned_final_dir / f"{base_name}_final.json"
+    if pretty:
+        final_json_path.write_bytes(_dump_json(minimal_records, pretty=True))
+    else:
+        _write_json(final_json_path, minimal_records)
+
+    logger.info(f"  ✓ {len(minimal_records)} files → {cleaned_final_dir}")
+    
+    return standard_output_dir, len(standard_files)
+
+
+def _remove_stale_exports(pdf_path: Path, doc_id: str) -> None:
+    """
+    Delete the step 9-11 files of an earlier run of *doc_id* (for a run that
+    produced no nodes, so that no outdated export contradicts it).
+    """
+    from pipeline.text_utils import normalize_source
+    
+    base_name = normalize_source(pdf_path.name).replace('.pdf', '')
+    stale = [EXPORT_DIR / f"{doc_id}_plain.txt", CLEANED_FINAL_DIR / f"{base_name}_final.json"]
+    # Per-node files are named after the node ids, f"{doc_id}_node_{index:04d}"
+    for directory, prefix in ((PROCESSED_DIR, f"{doc_id}_node_"),
+                              (CLEANED_FINAL_DIR, f"{doc_id}_{doc_id}_node_")):
+        stale.extend(
+            path for path in directory.glob(f"{glob.escape(prefix)}*.json")
+            if path.name[len(prefix):-len(".json")].isdigit()
+        )
+    
+    removed = 0
+    for path in stale:
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    
+    if removed:
+        logger.info(f"  ✓ No nodes: removed {removed} export files left by an earlier run of {doc_id}")
+    else:
+        logger.info(f"  ✓ No nodes: no earlier exports of {doc_id} to remove")
+
+
+def _run_full_pipeline(
+    pdf_path: Path,
+    min_tokens: int,
+    max_tokens: int,
+    duplicate_threshold: float,
+    save_intermediate: bool,
+    device: str,
+    timeout: int,
+    batch_size: int,
+    auto_chunk_pages: int,
+    skip_admin: bool,
+    skip_toc: bool,
+    skip_name_list: bool,
+    pretty: bool,
+    use_cache: bool,
+) -> dict[str, Any]:
+    """
+    Run every pipeline step on *pdf_path* (see run_full_pipeline).
+    
+    With *use_cache*, when the result cache holds an output for this PDF and
+    these settings (and save_intermediate is off), steps 1-8 are replaced by
+    loading it; the exports still run.
+    """
+    from pipeline.export_standard import get_pdf_page_count
+    from pipeline.page_utils import (
+        extract_per_page_text, assign_pages_to_nodes,
+    )
+    
+    pdf_name = pdf_path.name
+    
     # Check if auto-chunking is enabled and PDF is large enough
     if auto_chunk_pages > 0:
         total_pages = get_pdf_page_count(str(pdf_path))
@@ -578,6 +928,7 @@ def run_full_pipeline(
             logger.info(f"PDF has {total_pages} pages > threshold ({auto_chunk_pages})")
             logger.info("Switching to AUTO-CHUNK mode")
             logger.info("=" * 60)
+            flush_log()
             
             # Import here to avoid circular dependency
             from batch_process_chunks import process_pdf_chunks_internal
@@ -595,35 +946,89 @@ def run_full_pipeline(
     # Normal processing for small PDFs
     doc_id = pdf_path.stem
     
+    # Content-addressed result cache: same PDF bytes + same settings + same
+    # pipeline code → same output. Keyed here, past the auto-chunk branch, so
+    # the PDF is only hashed when the cache is actually used
+    cache_path = None
+    if use_cache:
+        config = (min_tokens, max_tokens, duplicate_threshold, device, auto_chunk_pages,
+                  skip_admin, skip_toc, skip_name_list)
+        cache_path = PIPELINE_CACHE_DIR / f"{doc_id}_{pipeline_cache_key(pdf_path, config)}_lightrag.json"
+    
+    if cache_path is not None and not save_intermediate and cache_path.exists():
+        logger.info(f"✓ Cache hit for {pdf_name}: {cache_path.name} (use --no-cache to rerun)")
+        flush_log()
+        output: dict[str, Any] = _load_json(cache_path.read_bytes())
+        output["processing_info"]["processed_at"] = datetime.now().isoformat()
+        try:
+            if output["nodes"]:
+                _export_outputs(output, pdf_path, doc_id, pretty)
+            else:
+                _remove_stale_exports(pdf_path, doc_id)
+        finally:
+            flush_log()
+        return output
+    
     logger.info("=" * 60)
     logger.info(f"Starting LightRAG preprocessing pipeline for: {pdf_name}")
     logger.info(f"Device: {device.upper()}")
     logger.info("=" * 60)
     
+    # Intermediate files are serialized on this thread (later steps mutate
+    # the dicts) and written to disk in the background while the next step
+    # runs. Only up to step 6: audit and tagging may fork process pools,
+    # which must not happen while writer threads are alive
+    io_pool = ThreadPoolExecutor(max_workers=2)
+    pending_writes: list[Future[int]] = []
+    
     try:
         # Step 1: Marker conversion
-        marker_output = run_marker_step(pdf_path, device=device, timeout=timeout, batch_size=batch_size)
+        marker_output = run_marker_step(pdf_path, device=device, timeout=timeout, batch_size=batch_size,
+                                        use_cache=use_cache)
         
         if save_intermediate:
-            with open(TEMP_DIR / f"{doc_id}_01_marker.json", "w", encoding="utf-8") as f:
-                json.dump(marker_output, f, ensure_ascii=False, indent=2)
+            pending_writes.append(io_pool.submit(
+                (TEMP_DIR / f"{doc_id}_01_marker.json").write_bytes, _dump_json(marker_output)
+            ))
+        
+        # Each step's result is a shallow copy of its input, so the superseded
+        # full-document text is dropped along with the previous dict (it is
+        # kept only when the intermediate files are being written)
         
         # Step 2: Initial cleaning
-        cleaned_data = run_cleaning_v1_step(marker_output)
+        cleaned_data = run_cleaning_v1_step(marker_output, keep_input_text=save_intermediate)
+        del marker_output
         
         if save_intermediate:
-            with open(TEMP_DIR / f"{doc_id}_02_cleaned.json", "w", encoding="utf-8") as f:
-                json.dump(cleaned_data, f, ensure_ascii=False, indent=2)
+            pending_writes.append(io_pool.submit(
+                (TEMP_DIR / f"{doc_id}_02_cleaned.json").write_bytes, _dump_json(cleaned_data)
+            ))
+        
+        cleaned_len = len(cleaned_data.get("cleaned_content", ""))
+        if cleaned_len < MIN_USEFUL_CHARS:
+            logger.warning(
+                f"  ⚠ Only {cleaned_len} chars of text after cleaning (< {MIN_USEFUL_CHARS}); "
+                f"PDF is likely scanned/image-only - skipping remaining steps"
+            )
+            _remove_stale_exports(pdf_path, doc_id)
+            for write in pending_writes:
+                write.result()
+            output = create_lightrag_output({"nodes": [], "source_file": pdf_path.name}, doc_id)
+            _store_cached_output(cache_path, output)
+            return output
         
         # Step 3: Final Vietnamese cleaning
-        final_data = run_final_cleaning_step(cleaned_data)
+        final_data = run_final_cleaning_step(cleaned_data, keep_input_text=save_intermediate)
+        del cleaned_data
         
         if save_intermediate:
-            with open(TEMP_DIR / f"{doc_id}_03_final.json", "w", encoding="utf-8") as f:
-                json.dump(final_data, f, ensure_ascii=False, indent=2)
+            pending_writes.append(io_pool.submit(
+                (TEMP_DIR / f"{doc_id}_03_final.json").write_bytes, _dump_json(final_data)
+            ))
         
         # Step 4: Chunking (create basic nodes)
-        chunked_data = run_chunking_step(final_data, min_tokens, max_tokens)
+        chunked_data = run_chunking_step(final_data, min_tokens, max_tokens, keep_input_text=save_intermediate)
+        del final_data
 
         # Step 4a: Marker-based page assignment (OPTION A — source of truth)
         #   Extract per-page text from the *original* PDF with PyMuPDF,
@@ -649,8 +1054,9 @@ def run_full_pipeline(
         ))
         
         if save_intermediate:
-            with open(TEMP_DIR / f"{doc_id}_04_chunked.json", "w", encoding="utf-8") as f:
-                json.dump(chunked_data, f, ensure_ascii=False, indent=2)
+            pending_writes.append(io_pool.submit(
+                (TEMP_DIR / f"{doc_id}_04_chunked.json").write_bytes, _dump_json(chunked_data)
+            ))
         
         # Step 5: Clean and Repair Nodes (integrated tool - remove noise, fix tables)
         cleaned_data = run_clean_and_repair_nodes_step(
@@ -658,14 +1064,16 @@ def run_full_pipeline(
             skip_admin=skip_admin,
             skip_name_list=skip_name_list,
             skip_toc=skip_toc,
+            doc_id=doc_id,
         )
         
         if save_intermediate:
-            with open(TEMP_DIR / f"{doc_id}_05_cleaned.json", "w", encoding="utf-8") as f:
-                json.dump(cleaned_data, f, ensure_ascii=False, indent=2)
+            pending_writes.append(io_pool.submit(
+                (TEMP_DIR / f"{doc_id}_05_cleaned.json").write_bytes, _dump_json(cleaned_data)
+            ))
         
         # Step 6: Rechunk by Structure (integrated tool - replace 6-page chunking with semantic)
-        rechunked_data = run_rechunk_by_structure_step(cleaned_data)
+        rechunked_data = run_rechunk_by_structure_step(cleaned_data, doc_id=doc_id)
 
         # Step 6b: Re-assign pages to rechunked nodes via paged reference
         paged_ref = rechunked_data.get("_paged_content") or chunked_data.get("_paged_content", "")
@@ -679,90 +1087,41 @@ def run_full_pipeline(
         ))
         
         if save_intermediate:
-            with open(TEMP_DIR / f"{doc_id}_06_rechunked.json", "w", encoding="utf-8") as f:
-                json.dump(rechunked_data, f, ensure_ascii=False, indent=2)
+            pending_writes.append(io_pool.submit(
+                (TEMP_DIR / f"{doc_id}_06_rechunked.json").write_bytes, _dump_json(rechunked_data)
+            ))
+        
+        # Finish the background writes (surfacing any error) and stop the
+        # writer threads before steps 7-8 can start a ProcessPoolExecutor;
+        # their intermediate files are written synchronously
+        for write in pending_writes:
+            write.result()
+        io_pool.shutdown(wait=True)
+        # Also empty the log buffer, so forked workers do not inherit (and
+        # possibly write out again) the records in it
+        flush_log()
         
         # Step 7: Audit
         audited_data = run_audit_step(rechunked_data, duplicate_threshold, min_tokens)
         
         if save_intermediate:
-            with open(TEMP_DIR / f"{doc_id}_07_audited.json", "w", encoding="utf-8") as f:
-                json.dump(audited_data, f, ensure_ascii=False, indent=2)
+            (TEMP_DIR / f"{doc_id}_07_audited.json").write_bytes(_dump_json(audited_data))
         
         # Step 8: Auto-tagging
         tagged_data = run_auto_tagging_step(audited_data, source_file=pdf_path.name)
         
         if save_intermediate:
-            with open(TEMP_DIR / f"{doc_id}_08_tagged.json", "w", encoding="utf-8") as f:
-                json.dump(tagged_data, f, ensure_ascii=False, indent=2)
+            (TEMP_DIR / f"{doc_id}_08_tagged.json").write_bytes(_dump_json(tagged_data))
         
         # Create final output (in-memory only)
         output = create_lightrag_output(tagged_data, doc_id)
         
-        # Step 9: Export text files for review
-        logger.info("Step 9: Exporting text file for review")
-        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
-        
-        export_plain_text(output, EXPORT_DIR / f"{doc_id}_plain.txt")
-        
-        logger.info(f"  ✓ Exported text file to {EXPORT_DIR}")
-        
-        # Step 10: Export standard JSON (One Object per File)
-        logger.info("Step 10: Exporting standard JSON files (One Object per File)")
-        
-        total_pages = get_pdf_page_count(str(pdf_path))
-        standard_output_dir = PROCESSED_DIR
-        
-        standard_files = export_standard_json_files(
-            output,
-            standard_output_dir,
-            total_pages=total_pages,
-            pdf_path=str(pdf_path)
-        )
-        
-        logger.info(f"  ✓ Exported {len(standard_files)} standard JSON files to {standard_output_dir}")
-        
-        # Step 11: Export cleaned_final/ — minimal {source, page, content}
-        logger.info("Step 11: Exporting cleaned_final/ (minimal format)")
-        cleaned_final_dir = BASE_DIR / "cleaned_final"
-        cleaned_final_dir.mkdir(parents=True, exist_ok=True)
-
-        # Normalize source: strip _part_XX suffix, ensure .pdf
-        source_file_name = normalize_source(pdf_path.name)
-        minimal_records: list[dict[str, Any]] = []
-        for i, node in enumerate(output["nodes"]):
-            pg = None
-            if isinstance(node.get("page_start"), int) and node["page_start"] > 0:
-                pg = node["page_start"]
-            elif isinstance(node.get("page"), int) and node["page"] > 0:
-                pg = node["page"]
-            if pg is None:
-                pg = 1
-
-            content = ensure_single_context(source_file_name, node.get("content", ""))
-            record: dict[str, Any] = {
-                "source": source_file_name,
-                "page": pg,
-                "content": content,
-            }
-            minimal_records.append(record)
-
-            chunk_id = node.get("id", f"chunk_{i:04d}")
-            cf_path = cleaned_final_dir / f"{doc_id}_{chunk_id}.json"
-            with open(cf_path, "w", encoding="utf-8") as f:
-                json.dump(record, f, ensure_ascii=False, indent=2)
-
-        # Combined _final.json = JSON ARRAY
-        base_name = normalize_source(pdf_path.name).replace('.pdf', '')
-        final_json_path = cleaned_final_dir / f"{base_name}_final.json"
-        with open(final_json_path, "w", encoding="utf-8") as f:
-            json.dump(minimal_records, f, ensure_ascii=False, indent=2)
-
-        logger.info(f"  ✓ {len(minimal_records)} files → {cleaned_final_dir}")
+        # Steps 9-11: exports
+        standard_output_dir, standard_count = _export_outputs(output, pdf_path, doc_id, pretty)
         
         logger.info("=" * 60)
         logger.info(f"✓ Full pipeline (with integrated tools) completed successfully!")
-        logger.info(f"  Standard JSON    : {standard_output_dir}/ ({len(standard_files)} files)")
+        logger.info(f"  Standard JSON    : {standard_output_dir}/ ({standard_count} files)")
         logger.info(f"  Text Files       : {EXPORT_DIR}")
         logger.info(f"  Final Nodes      : {len(output['nodes'])}")
         logger.info(f"  ⭐ Features integrated:")
@@ -770,11 +1129,87 @@ def run_full_pipeline(
         logger.info(f"     - Rechunk by Structure: Replace 6-page chunking with semantic chunks")
         logger.info("=" * 60)
         
+        _store_cached_output(cache_path, output)
+        
         return output
         
     except Exception as e:
         logger.error(f"Pipeline failed: {e}")
         raise
+    finally:
+        io_pool.shutdown(wait=True)
+        flush_log()
+
+
+def _init_batch_worker() -> None:
+    """Batch worker initializer: import the cleaning modules before the first PDF."""
+    # Their regexes are module-level constants, compiled on import
+    from pipeline import cleaning_v1, final_cleaning
+    
+    # Log straight to stderr: records left in a worker's buffer would be
+    # lost when the process exits
+    root = logging.getLogger()
+    root.removeHandler(_log_buffer)
+    root.addHandler(_log_stream)
+
+
+def run_full_pipeline_batch(
+    pdf_names: list[str],
+    max_workers: int = 0,
+    device: str = "cpu",
+    **pipeline_kwargs: Any,
+) -> dict[str, dict[str, Any]]:
+    """
+    Run the full pipeline on several PDFs, one worker process per PDF.
+    
+    Args:
+        pdf_names: Names of PDF files in data/raw/
+        max_workers: Number of worker processes (0 = min(CPU count, 4))
+        device: Device to use ("cpu" or "gpu"); GPU runs one PDF at a time
+            so that parallel Marker runs do not compete for VRAM
+        **pipeline_kwargs: Forwarded to run_full_pipeline
+        
+    Returns:
+        Mapping of PDF name → LightRAG output, for the PDFs that succeeded
+        (failures are logged and left out)
+    """
+    ensure_directories()
+    
+    if max_workers <= 0:
+        max_workers = min(os.cpu_count() or 1, BATCH_MAX_WORKERS)
+    if device == "gpu":
+        max_workers = 1
+    max_workers = min(max_workers, len(pdf_names))
+    
+    results: dict[str, dict[str, Any]] = {}
+    
+    if max_workers <= 1:
+        for pdf_name in pdf_names:
+            try:
+                results[pdf_name] = run_full_pipeline(pdf_name, device=device, **pipeline_kwargs)
+            except Exception as e:
+                logger.error(f"✗ {pdf_name} failed: {e}")
+        return results
+    
+    logger.info(f"Batch mode: {len(pdf_names)} PDFs on {max_workers} worker processes")
+    # Forked workers get a copy of the log buffer; empty it first so that
+    # no record is written twice
+    flush_log()
+    
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_batch_worker) as executor:
+        futures = {
+            executor.submit(run_full_pipeline, pdf_name, device=device, **pipeline_kwargs): pdf_name
+            for pdf_name in pdf_names
+        }
+        for future in as_completed(futures):
+            pdf_name = futures[future]
+            try:
+                results[pdf_name] = future.result()
+            except Exception as e:
+                logger.error(f"✗ {pdf_name} failed: {e}")
+    
+    # Report in input order rather than completion order
+    return {name: results[name] for name in pdf_names if name in results}
 
 
 def list_available_pdfs() -> list[str]:
@@ -800,6 +1235,8 @@ Examples:
     python main_pipeline.py document.pdf --min-tokens 200 --max-tokens 500
     python main_pipeline.py document.pdf --save-intermediate
     python main_pipeline.py --list
+    python main_pipeline.py --batch
+    python main_pipeline.py --batch a.pdf b.pdf c.pdf --workers 3
         """
     )
     
@@ -871,6 +1308,32 @@ Examples:
         help="List available PDF files in data/raw/"
     )
     
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached results in data/processed/pipeline_cache/ and rerun every step"
+    )
+    
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Indent the cleaned_final/ JSON files (default: compact)"
+    )
+    
+    parser.add_argument(
+        "--batch",
+        nargs="*",
+        metavar="PDF",
+        help="Process several PDFs in parallel (default: every PDF in data/raw/)"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help=f"Worker processes for --batch (default: 0 = min(CPU count, {BATCH_MAX_WORKERS}); GPU always uses 1)"
+    )
+    
     parser.add_argument(
         "--skip-admin",
         action="store_true",
@@ -904,6 +1367,37 @@ Examples:
             print(f"No PDF files found in {RAW_DIR}")
         return
     
+    if args.batch is not None:
+        pdf_names = args.batch or list_available_pdfs()
+        if not pdf_names:
+            print(f"No PDF files found in {RAW_DIR}")
+            sys.exit(1)
+        
+        results = run_full_pipeline_batch(
+            pdf_names,
+            max_workers=args.workers,
+            device=args.device,
+            min_tokens=args.min_tokens,
+            max_tokens=args.max_tokens,
+            duplicate_threshold=args.duplicate_threshold,
+            save_intermediate=args.save_intermediate,
+            timeout=args.timeout,
+            batch_size=args.batch_size,
+            auto_chunk_pages=args.auto_chunk_pages,
+            skip_admin=args.skip_admin,
+            skip_toc=args.skip_toc,
+            skip_name_list=args.skip_name_list,
+            use_cache=not args.no_cache,
+            pretty=args.pretty,
+        )
+        
+        print(f"\nProcessed {len(results)}/{len(pdf_names)} PDFs")
+        for pdf_name, result in results.items():
+            print(f"  - {pdf_name}: {len(result['nodes'])} nodes")
+        if len(results) < len(pdf_names):
+            sys.exit(1)
+        return
+    
     if not args.pdf_name:
         parser.print_help()
         print("\nError: Please specify a PDF filename or use --list to see available files.")
@@ -923,6 +1417,8 @@ Examples:
             skip_admin=args.skip_admin,
             skip_toc=args.skip_toc,
             skip_name_list=args.skip_name_list,
+            use_cache=not args.no_cache,
+            pretty=args.pretty,
         )
         
         # Print summary
@@ -25,11 +25,24 @@ import sys
 import subprocess
 import time
 import json
-import glob
 import shutil
+import signal
+import hashlib
+import codecs
+import mmap
+import threading
+from collections import deque
+from functools import lru_cache, partial
+from importlib import metadata
 from pathlib import Path
 from datetime import datetime
-from typing import Any
+from typing import IO, Any, Callable
+
+# Optional fast JSON backend (pip install orjson); stdlib json otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
 
 
 # =============================================================================
@@ -152,6 +165,246 @@ def setup_gpu_optimization(env: dict) -> None:
     print("Note: GPU optimization enabled (CUDA async)")
 
 
+@lru_cache(maxsize=2)
+def _marker_env(device: str) -> dict[str, str]:
+    """
+    Build the marker_single environment for *device* once per process.
+    
+    Marker runs as a separate CLI process, so its models cannot be kept
+    loaded here; what can be reused between conversions is the per-device
+    environment (and the resolved executable, see _marker_executable).
+    The cached dict must not be modified by callers.
+    """
+    env = os.environ.copy()
+    if device == "cpu":
+        # Force CPU mode
+        env["CUDA_VISIBLE_DEVICES"] = ""
+    else:  # device == "gpu"
+        # Enable GPU with optimizations
+        env.pop("CUDA_VISIBLE_DEVICES", None)
+        setup_gpu_optimization(env)
+    return env
+
+
+@lru_cache(maxsize=2)
+def _marker_executable(name: str = "marker_single") -> str:
+    """Resolve a Marker CLI (marker_single / marker) on PATH once (falls back to the bare name)."""
+    return shutil.which(name) or name
+
+
+def _gpu_batch_args(batch_size: int) -> list[str]:
+    """Map the generic GPU batch size to the supported marker options."""
+    effective_batch = str(batch_size if batch_size > 0 else 16)
+    return [
+        "--equation_batch_size", effective_batch,
+        "--layout_batch_size", effective_batch,
+        "--table_rec_batch_size", effective_batch,
+    ]
+
+
+# Output of a Marker run is read in chunks of this size; only the last
+# MARKER_TAIL_CHUNKS chunks of each stream are kept (for error messages)
+MARKER_READ_CHUNK = 8192
+MARKER_TAIL_CHUNKS = 64
+
+# After the Marker process has exited, wait at most this many seconds for
+# its output pipes to reach EOF (a leftover worker can keep them open)
+MARKER_DRAIN_TIMEOUT = 10
+
+
+def _mirror_writer(stream: Any) -> Callable[[bytes], None]:
+    """Write raw child output to *stream* as it arrives (binary if possible)."""
+    buffer = getattr(stream, "buffer", None)
+    if buffer is not None:
+        def write_bytes(chunk: bytes) -> None:
+            buffer.write(chunk)
+            buffer.flush()
+        return write_bytes
+    
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    
+    def write_text(chunk: bytes) -> None:
+        stream.write(decoder.decode(chunk))
+        stream.flush()
+    return write_text
+
+
+def _pump(pipe: IO[bytes], mirror: Callable[[bytes], None] | None, tail: deque[bytes]) -> None:
+    """Drain a child pipe: keep its last chunks in *tail*, mirror them unless quiet."""
+    with pipe:
+        for chunk in iter(partial(pipe.read1, MARKER_READ_CHUNK), b""):  # type: ignore[attr-defined]
+            tail.append(chunk)
+            if mirror is not None:
+                mirror(chunk)
+
+
+def _kill_process_group(process: subprocess.Popen[bytes]) -> None:
+    """Kill *process* and, on POSIX, every worker it started (same session)."""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:
+        process.kill()
+    process.wait()
+
+
+def _join_readers(readers: list[threading.Thread], timeout: float) -> bool:
+    """Join *readers* within *timeout* seconds in total; True if all finished."""
+    deadline = time.monotonic() + timeout
+    for reader in readers:
+        reader.join(max(0.0, deadline - time.monotonic()))
+    return not any(reader.is_alive() for reader in readers)
+
+
+def _run_marker_process(cmd: list[str], env: dict[str, str], timeout: int) -> tuple[int, str, str]:
+    """
+    Run a Marker CLI with stdout/stderr piped through bounded tail buffers.
+    
+    Output is still shown live (set QUIET=1 to suppress that for headless
+    runs), but memory stays bounded however verbose Marker is, and the tail
+    of stderr is available for the error message.
+    
+    Returns:
+        (return code, stdout tail, stderr tail)
+        
+    Raises:
+        subprocess.TimeoutExpired: The process ran longer than *timeout*
+            seconds (0 = unlimited); it has been killed together with its
+            worker processes
+        FileNotFoundError: The executable does not exist
+    """
+    quiet = bool(os.environ.get("QUIET"))
+    # Our own pending output goes first, the child's is written below it
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # Own session (POSIX), so that a timeout can kill Marker's worker
+    # processes too: they inherit the pipes and would otherwise keep them open
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+                               start_new_session=True)
+    tails: tuple[deque[bytes], deque[bytes]] = (
+        deque(maxlen=MARKER_TAIL_CHUNKS), deque(maxlen=MARKER_TAIL_CHUNKS)
+    )
+    readers = [
+        threading.Thread(
+            target=_pump,
+            args=(pipe, None if quiet else _mirror_writer(stream), tail),
+            daemon=True,
+        )
+        for pipe, stream, tail in (
+            (process.stdout, sys.stdout, tails[0]),
+            (process.stderr, sys.stderr, tails[1]),
+        )
+    ]
+    for reader in readers:
+        reader.start()
+    
+    try:
+        returncode = process.wait(timeout=timeout if timeout > 0 else None)
+    except subprocess.TimeoutExpired:
+        _kill_process_group(process)
+        raise
+    finally:
+        if not _join_readers(readers, MARKER_DRAIN_TIMEOUT):
+            # A leftover worker still holds the pipes open: stop it so the
+            # readers see EOF (they are daemon threads if even that fails)
+            _kill_process_group(process)
+            _join_readers(readers, MARKER_DRAIN_TIMEOUT)
+    
+    stdout_tail, stderr_tail = (b"".join(tail).decode("utf-8", errors="replace") for tail in tails)
+    return returncode, stdout_tail, stderr_tail
+
+
+def _marker_json(input_pdf: str, markdown_content: str) -> dict[str, Any]:
+    """Build the JSON-ready conversion output for one PDF."""
+    return {
+        "source_file": os.path.basename(input_pdf),
+        "conversion_tool": "marker-pdf",
+        "conversion_time": datetime.now().isoformat(),
+        "content_type": "markdown",
+        "content": markdown_content
+    }
+
+
+def _dump_json(obj: Any, pretty: bool = False) -> bytes:
+    """
+    Serialize *obj* to UTF-8 JSON bytes (non-ASCII kept as is, no trailing newline).
+    
+    Args:
+        obj: JSON-serializable object
+        pretty: Indent with 2 spaces; otherwise the output is compact
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return text.encode("utf-8")
+
+
+# Buffer size for Marker output files (markdown, JSON, cache entries)
+MARKER_IO_BUFFER = 1 << 20
+
+
+def _load_json(path: str) -> Any:
+    """Read and parse a JSON file (orjson if available)."""
+    with open(path, "rb", buffering=MARKER_IO_BUFFER) as f:
+        raw = f.read()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# Data paths are anchored to this file (src/), not the working directory
+BASE_DIR = Path(__file__).resolve().parent
+
+# Converted output is cached here, keyed by the PDF bytes + Marker version
+# (main_pipeline's whole-pipeline result cache is data/processed/pipeline_cache)
+MARKER_CACHE_DIR = BASE_DIR / "data" / "processed" / ".marker_cache"
+
+# Marker's raw output folder (markdown, images, meta) is kept here with
+# keep_intermediates=True, under the same fingerprint as the cache entry
+MARKER_INTERMEDIATES_DIR = BASE_DIR / "data" / "processed" / ".marker_intermediates"
+
+
+@lru_cache(maxsize=1)
+def _marker_version() -> str:
+    """Installed marker-pdf version (part of the cache key)."""
+    try:
+        return metadata.version("marker-pdf")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def pdf_digest(pdf_path: str | os.PathLike[str], *extra: bytes, digest_size: int = 16) -> str:
+    """
+    BLAKE2b hex digest of *extra* followed by the PDF bytes. Shared by the
+    Marker cache and main_pipeline's result cache.
+    
+    The PDF is memory-mapped and hashed straight from the page cache,
+    without copying it into Python buffers.
+    """
+    h = hashlib.blake2b(digest_size=digest_size)
+    for data in extra:
+        h.update(data)
+    with open(pdf_path, "rb") as f:
+        # mmap() rejects empty files
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+    return h.hexdigest()
+
+
+def _pdf_fingerprint(pdf_path: str) -> str:
+    """Marker cache key: pdf_digest of the PDF bytes and the Marker version."""
+    return pdf_digest(pdf_path, f"marker-pdf {_marker_version()}\0".encode("utf-8"))
+
+
 def extract_per_page_text(pdf_path: str) -> str:
     """
     Extract per-page text from a PDF using PyMuPDF and return a single
@@ -173,67 +426,88 @@ def extract_per_page_text(pdf_path: str) -> str:
     return _extract(pdf_path)
 
 
-def run_marker_conversion_to_json(
+def run_marker_conversion(
     input_pdf: str,
-    output_json: str,
     device: str = "cpu",
     timeout: int = 0,
-    batch_size: int = 0
-) -> dict[str, Any]:
+    batch_size: int = 0,
+    use_cache: bool = True,
+    keep_intermediates: bool = False
+) -> tuple[dict[str, Any] | None, dict[str, Any]]:
     """
-    Run Marker conversion and save result as JSON with text content.
+    Run Marker conversion and return the result in memory.
+    
+    Successful conversions are cached in MARKER_CACHE_DIR by content
+    fingerprint; converting the same PDF bytes again returns the cached
+    output without running Marker (stats["cache_hit"] is then True).
     
     Args:
         input_pdf: Path to the input PDF file
-        output_json: Path to save the JSON output
         device: Device to use for processing ("cpu" or "gpu"). Default: "cpu"
         timeout: Timeout in seconds for conversion (default: 0 = unlimited)
         batch_size: Batch size for GPU processing (0 = auto). Increase for faster GPU processing
                    but requires more VRAM. Typical: 16-32 for 8GB GPU, 64+ for 16GB+.
+        use_cache: Look up / store the result in the conversion cache
+        keep_intermediates: Move Marker's output folder (with the extracted
+                   images) to MARKER_INTERMEDIATES_DIR/<fingerprint>/ instead of
+                   deleting it; the path is returned in stats["intermediates_dir"]
         
     Returns:
-        Dictionary containing conversion statistics
+        (marker_output, stats) - marker_output is the JSON-ready dict with the
+        markdown content, or None if the conversion failed
     """
+    json_output = None
     stats = {
         "input_file": input_pdf,
-        "output_json": output_json,
         "success": False,
         "conversion_time_seconds": 0,
         "device": device,
+        "cache_hit": False,
         "error": None
     }
     
     # Validate device
     if device not in ["cpu", "gpu"]:
         stats["error"] = f"Invalid device: {device}. Must be 'cpu' or 'gpu'"
-        return stats
+        return json_output, stats
     
     # Check if input file exists
     if not os.path.exists(input_pdf):
         stats["error"] = f"Input file not found: {input_pdf}"
-        return stats
+        return json_output, stats
     
-    # Create temp output directory for marker
-    temp_output_dir = "temp_marker_output"
-    os.makedirs(temp_output_dir, exist_ok=True)
+    fingerprint = _pdf_fingerprint(input_pdf) if use_cache or keep_intermediates else None
+    cache_file = None
+    if use_cache:
+        cache_file = os.path.join(MARKER_CACHE_DIR, f"{fingerprint}.json")
+        if os.path.exists(cache_file):
+            json_output = _load_json(cache_file)
+            # Same bytes may come under another file name
+            json_output["source_file"] = os.path.basename(input_pdf)
+            stats["success"] = True
+            stats["cache_hit"] = True
+            keep_dir = os.path.join(MARKER_INTERMEDIATES_DIR, str(fingerprint))
+            if keep_intermediates and os.path.isdir(keep_dir):
+                stats["intermediates_dir"] = keep_dir
+            print(f"Using cached Marker output: {cache_file}")
+            return json_output, stats
     
-    # Create processed directory if not exists
-    os.makedirs(os.path.dirname(output_json), exist_ok=True)
+    # Create temp output directory for marker (one per PDF, so several
+    # conversions can run side by side without deleting each other's output)
+    pdf_name = Path(input_pdf).stem
+    temp_output_dir = os.path.join("temp_marker_output", pdf_name)
+    os.makedirs(temp_output_dir, exist_ok=True)
     
     # Build the command with GPU optimization
     cmd = [
-        "marker_single",
+        _marker_executable(),
         input_pdf,
         "--output_dir", temp_output_dir
     ]
     
     # GPU-specific optimizations
     if device == "gpu":
-        # Map generic batch size to supported marker options
-        effective_batch = batch_size if batch_size > 0 else 16
-        cmd.extend(["--equation_batch_size", str(effective_batch)])
-        cmd.extend(["--layout_batch_size", str(effective_batch)])
-        cmd.extend(["--table_rec_batch_size", str(effective_batch)])
+        cmd.extend(_gpu_batch_args(batch_size))
     
     print(f"Running command: {' '.join(cmd)}")
     print("-" * 50)
@@ -242,71 +516,61 @@ def run_marker_conversion_to_json(
     start_time = time.time()
     
     try:
-        # Set environment based on device
-        env = os.environ.copy()
+        # Set environment based on device (built once per device)
+        env = _marker_env(device)
         
         if device == "cpu":
-            # Force CPU mode
-            env["CUDA_VISIBLE_DEVICES"] = ""
             print("Note: Running on CPU (CUDA disabled)")
         else:  # device == "gpu"
-            # Enable GPU with optimizations
-            if "CUDA_VISIBLE_DEVICES" in env:
-                del env["CUDA_VISIBLE_DEVICES"]
-            setup_gpu_optimization(env)
             print("Optimizations: Async CUDA, GPU batch processing")
         
         print("-" * 50)
         
-        # Run the Marker command
-        result = subprocess.run(
-            cmd,
-            stdout=sys.stdout,    # stream trực tiếp
-            stderr=sys.stderr,
-            text=True,
-            timeout=timeout if timeout > 0 else None,  # 0 = unlimited
-            env=env
-        )
+        # Run the Marker command (output streamed live, tail kept for errors)
+        returncode, stdout_tail, stderr_tail = _run_marker_process(cmd, env, timeout)
         
         # End timing
         stats["conversion_time_seconds"] = round(time.time() - start_time, 3)
         
-        if result.returncode == 0:
-            # Try to read the markdown output and save as JSON
-            pdf_name = Path(input_pdf).stem
+        if returncode == 0:
+            # Try to read the markdown output
             md_file = Path(temp_output_dir) / pdf_name / f"{pdf_name}.md"
             
             if md_file.exists():
-                with open(md_file, "r", encoding="utf-8") as f:
+                with open(md_file, "r", encoding="utf-8", buffering=MARKER_IO_BUFFER) as f:
                     markdown_content = f.read()
                 
                 # Create JSON output
-                json_output = {
-                    "source_file": os.path.basename(input_pdf),
-                    "conversion_tool": "marker-pdf",
-                    "conversion_time": datetime.now().isoformat(),
-                    "content_type": "markdown",
-                    "content": markdown_content
-                }
-                
-                # Save to JSON file
-                with open(output_json, "w", encoding="utf-8") as f:
-                    json.dump(json_output, f, ensure_ascii=False, indent=2)
+                json_output = _marker_json(input_pdf, markdown_content)
                 
                 stats["success"] = True
                 print("Conversion completed successfully!")
-                print(f"Output saved to: {output_json}")
+                
+                if cache_file is not None:
+                    # Write then rename, so a reader never sees a partial file
+                    os.makedirs(MARKER_CACHE_DIR, exist_ok=True)
+                    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+                    with open(tmp_file, "wb", buffering=MARKER_IO_BUFFER) as f:
+                        f.write(_dump_json(json_output))
+                    os.replace(tmp_file, cache_file)
+                
+                if keep_intermediates:
+                    # Same filesystem in the usual layout, so this is a rename
+                    keep_dir = os.path.join(MARKER_INTERMEDIATES_DIR, str(fingerprint))
+                    if os.path.exists(keep_dir):
+                        shutil.rmtree(keep_dir)
+                    os.makedirs(MARKER_INTERMEDIATES_DIR, exist_ok=True)
+                    os.replace(md_file.parent, keep_dir)
+                    stats["intermediates_dir"] = keep_dir
             else:
                 stats["error"] = f"Markdown file not found: {md_file}"
                 print(stats["error"])
         else:
-            # Capture both stdout and stderr for debugging
-            error_msg = result.stderr or result.stdout or "Unknown error (no output)"
+            # The tail of stderr (or stdout) explains the failure
+            error_msg = stderr_tail or stdout_tail or "Unknown error (no output)"
             stats["error"] = error_msg
             print(f"Conversion failed!")
-            print(f"STDOUT: {result.stdout}")
-            print(f"STDERR: {result.stderr}")
-            print(f"Return code: {result.returncode}")
+            print(f"Return code: {returncode}")
             
     except subprocess.TimeoutExpired:
         stats["error"] = f"Conversion timed out after {timeout} seconds"
@@ -325,6 +589,207 @@ def run_marker_conversion_to_json(
     except:
         pass
     
+    return json_output, stats
+
+
+def run_marker_conversion_to_json(
+    input_pdf: str,
+    output_json: str,
+    device: str = "cpu",
+    timeout: int = 0,
+    batch_size: int = 0,
+    use_cache: bool = True,
+    keep_intermediates: bool = False
+) -> dict[str, Any]:
+    """
+    Run Marker conversion and save result as JSON with text content.
+    
+    Args:
+        input_pdf: Path to the input PDF file
+        output_json: Path to save the JSON output
+        device: Device to use for processing ("cpu" or "gpu"). Default: "cpu"
+        timeout: Timeout in seconds for conversion (default: 0 = unlimited)
+        batch_size: Batch size for GPU processing (0 = auto). See run_marker_conversion.
+        use_cache: Reuse a cached conversion of the same PDF bytes. See run_marker_conversion.
+        keep_intermediates: Keep Marker's output folder. See run_marker_conversion.
+        
+    Returns:
+        Dictionary containing conversion statistics (with content_length and
+        content_type of the saved output on success)
+    """
+    json_output, stats = run_marker_conversion(input_pdf, device=device, timeout=timeout,
+                                               batch_size=batch_size, use_cache=use_cache,
+                                               keep_intermediates=keep_intermediates)
+    stats["output_json"] = output_json
+    
+    if json_output is not None:
+        # For the summary, so callers need not read the JSON back
+        stats["content_length"] = len(json_output.get("content", ""))
+        stats["content_type"] = json_output.get("content_type", "unknown")
+        
+        # Create processed directory if not exists
+        os.makedirs(os.path.dirname(output_json) or ".", exist_ok=True)
+        
+        # Save to JSON file
+        with open(output_json, "wb", buffering=MARKER_IO_BUFFER) as f:
+            f.write(_dump_json(json_output, pretty=True))
+        
+        print(f"Output saved to: {output_json}")
+    
+    return stats
+
+
+def run_marker_batch_conversion(
+    input_pdfs: list[str],
+    device: str = "cpu",
+    timeout: int = 0,
+    batch_size: int = 0,
+    workers: int = 0
+) -> tuple[dict[str, dict[str, Any] | None], dict[str, Any]]:
+    """
+    Convert several PDFs with one `marker` batch run (nothing is saved).
+    
+    marker_single loads the Marker models on every call; the `marker`
+    folder CLI loads them once per worker and then converts its share of
+    the files, so the start-up cost is paid *workers* times instead of once
+    per PDF.
+    
+    Args:
+        input_pdfs: Paths to the input PDF files (file names must be unique)
+        device: Device to use for processing ("cpu" or "gpu"). Default: "cpu"
+        timeout: Timeout in seconds for the whole batch (default: 0 = unlimited)
+        batch_size: Batch size for GPU processing (0 = auto). See run_marker_conversion.
+        workers: Marker worker processes (0 = min(CPU count, 4); GPU default: 1)
+        
+    Returns:
+        (outputs, stats) - outputs maps each input path to its JSON-ready dict
+        (None if that PDF failed); stats lists the successful/failed inputs
+        and the success_rate
+    """
+    outputs: dict[str, dict[str, Any] | None] = {pdf: None for pdf in input_pdfs}
+    stats: dict[str, Any] = {
+        "input_files": list(input_pdfs),
+        "success": False,
+        "conversion_time_seconds": 0,
+        "device": device,
+        "workers": workers,
+        "successful": [],
+        "failed": [],
+        "success_rate": 0.0,
+        "error": None
+    }
+    
+    if device not in ["cpu", "gpu"]:
+        stats["error"] = f"Invalid device: {device}. Must be 'cpu' or 'gpu'"
+        stats["failed"] = list(input_pdfs)
+        return outputs, stats
+    
+    if workers <= 0:
+        workers = 1 if device == "gpu" else min(os.cpu_count() or 1, 4)
+    stats["workers"] = workers
+    
+    # marker converts a folder: link the inputs into a private one
+    batch_dir = os.path.join("temp_marker_output", f"_batch_{os.getpid()}")
+    input_dir = os.path.join(batch_dir, "input")
+    output_dir = os.path.join(batch_dir, "output")
+    os.makedirs(input_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    staged: dict[str, str] = {}
+    for pdf in input_pdfs:
+        name = os.path.basename(pdf)
+        link = os.path.join(input_dir, name)
+        if not os.path.exists(pdf) or os.path.lexists(link):
+            stats["failed"].append(pdf)
+            continue
+        try:
+            os.symlink(os.path.abspath(pdf), link)
+        except OSError:
+            shutil.copy2(pdf, link)
+        staged[pdf] = Path(name).stem
+    
+    cmd = [
+        _marker_executable("marker"),
+        input_dir,
+        "--output_dir", output_dir,
+        "--workers", str(workers)
+    ]
+    if device == "gpu":
+        cmd.extend(_gpu_batch_args(batch_size))
+    
+    print(f"Running command: {' '.join(cmd)}")
+    print("-" * 50)
+    
+    start_time = time.time()
+    
+    try:
+        if staged:
+            returncode, _, stderr_tail = _run_marker_process(cmd, _marker_env(device), timeout)
+            if returncode != 0:
+                stats["error"] = stderr_tail or f"marker exited with return code {returncode}"
+        
+        # Collect whatever was converted (a failed run may still have
+        # finished some of the files)
+        for pdf, stem in staged.items():
+            md_file = Path(output_dir) / stem / f"{stem}.md"
+            if md_file.exists():
+                outputs[pdf] = _marker_json(pdf, md_file.read_text(encoding="utf-8"))
+                stats["successful"].append(pdf)
+            else:
+                stats["failed"].append(pdf)
+                
+    except subprocess.TimeoutExpired:
+        stats["error"] = f"Batch conversion timed out after {timeout} seconds"
+        stats["failed"].extend(pdf for pdf in staged if pdf not in stats["successful"])
+    except FileNotFoundError:
+        stats["error"] = "Marker not installed. Run: pip install marker-pdf"
+        stats["failed"].extend(staged)
+    except Exception as e:
+        stats["error"] = str(e)
+        stats["failed"].extend(pdf for pdf in staged if pdf not in stats["successful"])
+    
+    stats["conversion_time_seconds"] = round(time.time() - start_time, 3)
+    if input_pdfs:
+        stats["success_rate"] = round(len(stats["successful"]) / len(input_pdfs), 3)
+    stats["success"] = bool(input_pdfs) and len(stats["successful"]) == len(input_pdfs)
+    
+    if stats["error"]:
+        print(stats["error"])
+    print(f"Batch conversion: {len(stats['successful'])}/{len(input_pdfs)} succeeded")
+    
+    # Cleanup temp directory
+    try:
+        shutil.rmtree(batch_dir)
+    except OSError:
+        pass
+    
+    return outputs, stats
+
+
+def run_marker_batch_to_json(pdf_files: list[str], processed_dir: str,
+                             device: str = "cpu") -> dict[str, Any]:
+    """
+    Convert *pdf_files* in one Marker batch and save <name>.json for each.
+    
+    Returns:
+        Batch statistics (also saved as _batch_stats.json in *processed_dir*)
+    """
+    outputs, stats = run_marker_batch_conversion(pdf_files, device=device)
+    os.makedirs(processed_dir, exist_ok=True)
+    
+    for pdf, json_output in outputs.items():
+        if json_output is None:
+            continue
+        output_json = os.path.join(processed_dir, f"{Path(pdf).stem}.json")
+        with open(output_json, "wb", buffering=MARKER_IO_BUFFER) as f:
+            f.write(_dump_json(json_output, pretty=True))
+        print(f"Output saved to: {output_json}")
+    
+    stats_file = os.path.join(processed_dir, "_batch_stats.json")
+    with open(stats_file, "wb") as f:
+        f.write(_dump_json(stats, pretty=True))
+    print(f"Statistics saved to: {stats_file}")
+    
     return stats
 
 
@@ -336,12 +801,21 @@ def get_available_pdf_files(raw_dir: str = "data/raw") -> list:
         raw_dir: Path to the raw data directory
         
     Returns:
-        List of PDF file paths
+        List of PDF file paths (extension matched case-insensitively)
     """
-    pdf_files = []
-    if os.path.exists(raw_dir):
-        pdf_files = glob.glob(os.path.join(raw_dir, "*.pdf"))
-    return sorted(pdf_files)
+    # One directory pass, no fnmatch; hidden files are skipped as glob did
+    try:
+        with os.scandir(raw_dir) as it:
+            pdf_files = [
+                entry.path for entry in it
+                if entry.name.lower().endswith(".pdf")
+                and not entry.name.startswith(".")
+                and entry.is_file()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    pdf_files.sort()
+    return pdf_files
 
 
 def select_pdf_file(pdf_files: list, filename: str = None) -> str:
@@ -417,10 +891,17 @@ def analyze_marker_output(output_dir: str, pdf_name: str) -> dict:
         analysis["markdown_file"] = str(md_file)
         analysis["markdown_size"] = md_file.stat().st_size
         
-        with open(md_file, "r", encoding="utf-8") as f:
-            content = f.read()
-            analysis["markdown_chars"] = len(content)
-            analysis["markdown_lines"] = len(content.splitlines())
+        # One streaming pass with running counters (the file is never held
+        # in memory as a whole); per-line splitlines() keeps the count equal
+        # to str.splitlines(), which also breaks on \f, \u2028, etc.
+        chars = 0
+        lines = 0
+        with open(md_file, "r", encoding="utf-8", buffering=MARKER_IO_BUFFER) as f:
+            for line in f:
+                chars += len(line)
+                lines += len(line.splitlines())
+        analysis["markdown_chars"] = chars
+        analysis["markdown_lines"] = lines
     
     # Count images
     images_dir = base_path / "images"
@@ -453,11 +934,8 @@ def save_marker_output_as_txt(output_dir: str, pdf_name: str, output_txt: str) -
         return False
     
     try:
-        with open(md_file, "r", encoding="utf-8") as f:
-            content = f.read()
-        
-        with open(output_txt, "w", encoding="utf-8") as f:
-            f.write(content)
+        # Byte copy (sendfile on Linux), no decode/encode round trip
+        shutil.copyfile(md_file, output_txt)
         
         print(f"Saved Marker output to: {output_txt}")
         return True
@@ -509,7 +987,12 @@ def main():
     print(f"Found {len(pdf_files)} PDF file(s) in {RAW_DIR}")
     
     # Allow user to specify filename or select interactively
-    filename_input = input("\nEnter filename (or press Enter to see all files): ").strip()
+    filename_input = input("\nEnter filename, 'all' for one batch run over every file "
+                           "(or press Enter to see all files): ").strip()
+    
+    if filename_input.lower() == "all":
+        run_marker_batch_to_json(pdf_files, PROCESSED_DIR)
+        return
     
     if filename_input:
         selected_pdf = select_pdf_file(pdf_files, filename_input)
@@ -547,14 +1030,8 @@ def main():
             print(f"{'JSON Size:':<20} {file_size:,} bytes")
             
             # Show content preview
-            try:
-                with open(output_json, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                content_length = len(data.get('content', ''))
-                print(f"{'Content Length:':<20} {content_length:,} characters")
-                print(f"{'Content Type:':<20} {data.get('content_type', 'unknown')}")
-            except:
-                pass
+            print(f"{'Content Length:':<20} {stats['content_length']:,} characters")
+            print(f"{'Content Type:':<20} {stats['content_type']}")
     else:
         print(f"{'Error:':<20} {stats['error']}")
     
@@ -562,8 +1039,8 @@ def main():
     
     # Save stats
     stats_file = os.path.join(PROCESSED_DIR, f"{pdf_name}_stats.json")
-    with open(stats_file, "w", encoding="utf-8") as f:
-        json.dump(stats, f, ensure_ascii=False, indent=2)
+    with open(stats_file, "wb") as f:
+        f.write(_dump_json(stats, pretty=True))
     print(f"Statistics saved to: {stats_file}")
 
 
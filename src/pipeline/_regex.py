@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Regex engine switch shared by the modules with module-level patterns.
+
+Set the module's environment variable (e.g. CHUNKER_REGEX_ENGINE=regex) to
+A/B the third-party ``regex`` module; falls back to the stdlib ``re`` when
+it is not installed.
+"""
+
+import os
+import re
+import importlib
+from types import ModuleType
+from typing import Any
+
+# A compiled pattern of whichever engine engine() returned: re.Pattern[str]
+# or regex.Pattern[str]. ``regex`` ships no stubs, so this stays Any.
+Pattern = Any
+
+
+def engine(env_name: str) -> ModuleType:
+    """Return the regex module selected by *env_name* ("re" or "regex")."""
+    if os.environ.get(env_name, "re").lower() == "regex":
+        try:
+            return importlib.import_module("regex")
+        except ImportError:
+            pass
+    return re
@@ -16,40 +16,71 @@ Author: Research Assistant
 Date: January 2026
 """
 
+import os
 import re
 import json
-from typing import Any, cast
-from collections import defaultdict
+import math
+import logging
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, cast
+from collections import Counter, defaultdict
+from functools import lru_cache
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 # High-risk table keywords (medical dosage tables)
 HIGH_RISK_KEYWORDS = [
     'liều', 'mg', 'kg', 'oseltamivir', 'zanamivir', 'baloxavir',
     'dự phòng', 'điều trị', 'phác đồ', 'thuốc', 'tiêm', 'uống',
     'g/ngày', 'mg/ngày', 'viên', 'ống', 'ml', 'đơn vị'
 ]
+# (keyword, lowercased keyword), lowercased once for the substring tests
+_HIGH_RISK_KEYWORD_PAIRS = [(keyword, keyword.lower()) for keyword in HIGH_RISK_KEYWORDS]
 
 # Patterns for noise detection
 IMAGE_LINK_PATTERN = re.compile(r'!\[[^\]]*\]\([^)]+\)', re.IGNORECASE)
 FOOTER_PATTERN = re.compile(r'kcb[_.][^\n]+\d{1,2}\s*[:/]\s*\d{1,2}', re.IGNORECASE)
 TABLE_BLOCK_PATTERN = re.compile(r'^\|[^|]+\|', re.MULTILINE)
 TABLE_PLACEHOLDER_PATTERN = re.compile(r'\[TABLE_REMOVED:\s*([^\]]+)\]')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
 
 
 NodeDict = dict[str, Any]
 
-
+# Token counting used for the merge thresholds: chars / 4 by default. Set
+# AUDIT_TOKENIZER to a tiktoken encoding name (e.g. cl100k_base) to count
+# real BPE tokens instead; falls back to chars / 4 if tiktoken is missing or
+# does not know the encoding.
+AUDIT_TOKENIZER = os.environ.get("AUDIT_TOKENIZER", "")
+_bpe_encode: Callable[[str], list[int]] | None = None
+if AUDIT_TOKENIZER:
+    try:
+        _bpe_encode = importlib.import_module("tiktoken").get_encoding(AUDIT_TOKENIZER).encode_ordinary
+    except (ImportError, ValueError, KeyError) as e:
+        logger.warning(f"AUDIT_TOKENIZER={AUDIT_TOKENIZER!r} unavailable ({e}); estimating tokens as chars / 4")
+        AUDIT_TOKENIZER = ""
+
+
+# Node contents are immutable strings that get compared many times (dedup,
+# the duplicate report, calculate_similarity), so both steps are memoized
+@lru_cache(maxsize=4096)
 def normalize_for_comparison(text: str) -> str:
-    text = text.lower()
-    text = ' '.join(text.split())
-    text = re.sub(r'[^\w\s]', '', text)
-    return text
+    return PUNCTUATION_PATTERN.sub('', ' '.join(text.lower().split()))
 
 
-def calculate_similarity(text1: str, text2: str) -> float:
-    words1 = set(normalize_for_comparison(text1).split())
-    words2 = set(normalize_for_comparison(text2).split())
+@lru_cache(maxsize=4096)
+def word_set(text: str) -> frozenset[str]:
+    return frozenset(normalize_for_comparison(text).split())
 
+
+def jaccard(words1: frozenset[str], words2: frozenset[str]) -> float:
+    # word_set() is memoized on the content string, so byte-identical
+    # contents (repeated headers/footers) share one frozenset: no set ops
+    if words1 is words2:
+        return 1.0
     if not words1 and not words2:
         return 1.0
     if not words1 or not words2:
@@ -58,30 +89,132 @@ def calculate_similarity(text1: str, text2: str) -> float:
     return len(words1 & words2) / len(words1 | words2)
 
 
+def could_reach(words1: frozenset[str], words2: frozenset[str], threshold: float) -> bool:
+    """
+    Cheap upper bound: Jaccard can never exceed min(|A|,|B|) / max(|A|,|B|),
+    so pairs whose word counts are too far apart are skipped without
+    building the intersection / union.
+    """
+    n1, n2 = len(words1), len(words2)
+    if n1 > n2:
+        n1, n2 = n2, n1
+    return n2 == 0 or n1 / n2 >= threshold
+
+
+def calculate_similarity(text1: str, text2: str) -> float:
+    return jaccard(word_set(text1), word_set(text2))
+
+
 def is_near_duplicate(node1: NodeDict, node2: NodeDict, threshold: float = 0.85) -> bool:
     return calculate_similarity(node1["content"], node2["content"]) >= threshold
 
 
-def remove_duplicates(nodes: list[NodeDict], threshold: float = 0.85) -> list[NodeDict]:
-    unique: list[NodeDict] = []
+def prefix_length(size: int, threshold: float) -> int:
+    """
+    Prefix filter: if Jaccard(A, B) >= threshold, A and B share at least one
+    word among the first size - ceil(threshold * size) + 1 words of each set
+    (all sets sorted by the same global word order). Rounded to the safe side.
+    """
+    return size - math.ceil(threshold * size - 1e-9) + 1
+
+
+def remove_exact_duplicates(nodes: list[NodeDict], threshold: float = 0.85) -> list[NodeDict]:
+    # Exact-match bucket ahead of the pairwise pass: nodes with the same
+    # word_set (Jaccard 1.0) collapse in one O(N) dict pass, under the same
+    # rule as remove_duplicates (a longer duplicate replaces the kept node
+    # and moves to the end). A threshold above 1.0 disables dedup entirely.
+    if threshold > 1:
+        return nodes
+    kept: dict[frozenset[str], NodeDict] = {}
     for node in nodes:
-        duplicate = False
-        for kept in unique:
-            if is_near_duplicate(node, kept, threshold):
-                duplicate = True
-                if len(node["content"]) > len(kept["content"]):
-                    unique.remove(kept)
-                    unique.append(node)
+        words = word_set(node["content"])
+        current = kept.get(words)
+        if current is not None:
+            if len(node["content"]) <= len(current["content"]):
+                continue
+            del kept[words]
+        kept[words] = node
+    return list(kept.values())
+
+
+def remove_duplicates(nodes: list[NodeDict], threshold: float = 0.85) -> list[NodeDict]:
+    # Each node is compared against the kept nodes in order and matches the
+    # first one with Jaccard >= threshold; a longer duplicate replaces the
+    # kept node and moves to the end of the kept order.
+    #
+    # Exact candidate generation instead of a scan over every kept node:
+    # words are ordered rarest first and only each set's prefix (see
+    # prefix_length) goes into an inverted index, so only kept nodes that
+    # share a prefix word are ever compared.
+    nodes = remove_exact_duplicates(nodes, threshold)
+    word_sets = [word_set(node["content"]) for node in nodes]
+    doc_freq = Counter(word for words in word_sets for word in words)
+    
+    def prefix(words: frozenset[str]) -> list[str]:
+        ordered = sorted(words, key=lambda word: (doc_freq[word], word))
+        return ordered[:prefix_length(len(ordered), threshold)]
+    
+    # slot -> [order, node, words, prefix]; order is the position in the
+    # kept sequence (a replaced node gets a new, larger one). Deleting and
+    # re-inserting a slot also moves it to the end of the dict, so iteration
+    # order already matches the kept order.
+    kept: dict[int, list[Any]] = {}
+    index: defaultdict[str, set[int]] = defaultdict(set)
+    empty_slots: set[int] = set()
+    next_order = 0
+    
+    for slot, (node, words) in enumerate(zip(nodes, word_sets)):
+        if threshold <= 0:
+            candidates: set[int] = set(kept)
+        elif words:
+            candidates = set()
+            for word in prefix(words):
+                candidates.update(index.get(word, ()))
+        else:
+            # Two empty sets count as identical (Jaccard 1.0)
+            candidates = set(empty_slots)
+        
+        match = None
+        for k in sorted(candidates, key=lambda k: kept[k][0]):
+            kept_words = kept[k][2]
+            if could_reach(words, kept_words, threshold) and jaccard(words, kept_words) >= threshold:
+                match = k
                 break
-        if not duplicate:
-            unique.append(node)
-    return unique
+        
+        if match is not None:
+            if len(node["content"]) <= len(kept[match][1]["content"]):
+                continue
+            # Longer duplicate replaces the kept node
+            for word in kept[match][3]:
+                index[word].discard(match)
+            empty_slots.discard(match)
+            del kept[match]
+        
+        node_prefix = prefix(words) if words else []
+        kept[slot] = [next_order, node, words, node_prefix]
+        next_order += 1
+        for word in node_prefix:
+            index[word].add(slot)
+        if not words:
+            empty_slots.add(slot)
+    
+    return [entry[1] for entry in kept.values()]
 
 
 def estimate_tokens(text: str) -> int:
+    if _bpe_encode is not None:
+        return count_bpe_tokens(text)
     return max(1, len(text) // 4)
 
 
+# The merge loops re-check the same (growing) contents, so BPE counts are
+# memoized per string
+@lru_cache(maxsize=4096)
+def count_bpe_tokens(text: str) -> int:
+    assert _bpe_encode is not None
+    return max(1, len(_bpe_encode(text)))
+
+
 def merge_nodes(node1: NodeDict, node2: NodeDict, doc_id: str) -> NodeDict:
     merged = node1["content"] + "\n\n" + node2["content"]
     return {
@@ -96,6 +229,129 @@ def merge_nodes(node1: NodeDict, node2: NodeDict, doc_id: str) -> NodeDict:
     }
 
 
+def _strip_parts(parts: list[str], size: int) -> int:
+    """Turn *parts* in place into the parts of "\n\n".join(parts).strip()
+    (only the ends can change) and return the new joined length."""
+    while parts:
+        last = parts[-1].rstrip()
+        if last:
+            size -= len(parts[-1]) - len(last)
+            parts[-1] = last
+            break
+        size -= len(parts.pop()) + (2 if parts else 0)
+    while parts:
+        first = parts[0].lstrip()
+        if first:
+            size -= len(parts[0]) - len(first)
+            parts[0] = first
+            break
+        size -= len(parts.pop(0)) + (2 if parts else 0)
+    return size
+
+
+def merge_short_runs(nodes: Iterable[NodeDict], min_tokens: int, doc_id: str) -> Iterator[NodeDict]:
+    """Merge each short node with the following nodes of the same section
+    until it reaches *min_tokens* (lazily, one output node at a time).
+    
+    Same result as folding merge_nodes over the run, but the contents are
+    collected as parts and joined once, and the length (hence the chars / 4
+    token estimate) is tracked instead of recounted on every step."""
+    first: NodeDict | None = None
+    last: NodeDict | None = None
+    section: Any = None
+    parts: list[str] = []
+    size = 0
+    
+    def run_node() -> NodeDict:
+        assert first is not None
+        if last is None:
+            return first
+        content = "\n\n".join(parts)
+        return {
+            "id": first["id"],
+            "content": content,
+            "section": section,
+            "metadata": {
+                "doc_id": doc_id,
+                "merged_from": [first["id"], last["id"]],
+                "token_estimate": estimate_tokens(content),
+            },
+        }
+    
+    for node in nodes:
+        if first is not None and section == node.get("section"):
+            if _bpe_encode is None:
+                tokens = max(1, size // 4)
+            else:
+                tokens = estimate_tokens("\n\n".join(parts))
+            if tokens < min_tokens:
+                # merge_nodes strips the joined text after every step
+                parts.append(node["content"])
+                size = _strip_parts(parts, size + len(node["content"]) + (2 if len(parts) > 1 else 0))
+                section = first.get("section", "")
+                last = node
+                continue
+        if first is not None:
+            yield run_node()
+        first, last, section = node, None, node.get("section")
+        parts = [node["content"]]
+        size = len(node["content"])
+    if first is not None:
+        yield run_node()
+
+
+def merge_short_pairs(nodes: Iterable[NodeDict], min_tokens: int, doc_id: str) -> Iterator[NodeDict]:
+    """Merge any node still shorter than *min_tokens* forward with its next
+    neighbour (one merge per pair, lazily)."""
+    pending: NodeDict | None = None
+    for node in nodes:
+        if pending is None:
+            pending = node
+        elif estimate_tokens(pending["content"]) < min_tokens:
+            yield merge_nodes(pending, node, doc_id)
+            pending = None
+        else:
+            yield pending
+            pending = node
+    if pending is not None:
+        yield pending
+
+
+def reindexed_node(node: NodeDict, index: int, doc_id: str) -> NodeDict:
+    """Final output shape of a node: fresh id/index, token estimate, and the
+    page / position / quality fields carried over from upstream."""
+    final_node: NodeDict = {
+        "id": f"{doc_id}_node_{index:04d}",
+        "content": node["content"],
+        "section": node.get("section", ""),
+        "metadata": {
+            "doc_id": doc_id,
+            "node_index": index,
+            "token_estimate": estimate_tokens(node["content"]),
+        },
+    }
+
+    # Preserve page_start / page_end / source_char_pos from upstream
+    for key in ("page_start", "page_end"):
+        if key in node:
+            final_node[key] = node[key]
+        elif key in node.get("metadata", {}):
+            final_node[key] = node["metadata"][key]
+    old_md = node.get("metadata", {})
+    if "source_char_pos" in old_md:
+        final_node["metadata"]["source_char_pos"] = old_md["source_char_pos"]
+    if "page_start" in old_md:
+        final_node["metadata"]["page_start"] = old_md["page_start"]
+    if "page_end" in old_md:
+        final_node["metadata"]["page_end"] = old_md["page_end"]
+    
+    # Preserve quality_flags if present
+    if "quality_flags" in node:
+        final_node["quality_flags"] = node["quality_flags"]
+    
+    return final_node
+
+
 def detect_noise_in_content(content: str) -> dict[str, Any]:
     """
     Detect remaining noise patterns in content.
@@ -159,8 +415,8 @@ def detect_table_issues(content: str, metadata: dict[str, Any]) -> dict[str, Any
     
     for caption in placeholders:
         caption_lower = caption.lower()
-        for keyword in HIGH_RISK_KEYWORDS:
-            if keyword.lower() in caption_lower:
+        for keyword, keyword_lower in _HIGH_RISK_KEYWORD_PAIRS:
+            if keyword_lower in caption_lower:
                 high_risk_tables.append({
                     "caption": caption,
                     "keyword": keyword
@@ -179,8 +435,8 @@ def detect_table_issues(content: str, metadata: dict[str, Any]) -> dict[str, Any
             raw_md = table_info.get("raw_markdown", "")
             combined = f"{caption} {raw_md}".lower()
             
-            for keyword in HIGH_RISK_KEYWORDS:
-                if keyword.lower() in combined:
+            for keyword, keyword_lower in _HIGH_RISK_KEYWORD_PAIRS:
+                if keyword_lower in combined:
                     if "high_risk_table_removed" not in issues:
                         issues["high_risk_table_removed"] = True
                         issues["high_risk_tables"] = []
@@ -195,23 +451,86 @@ def detect_table_issues(content: str, metadata: dict[str, Any]) -> dict[str, Any
     return issues
 
 
-def find_duplicates_between_nodes(nodes: list[NodeDict], threshold: float = 0.8) -> list[dict[str, Any]]:
+# The all-pairs duplicate scan is spread over worker processes from this
+# many nodes on (below it, starting the pool costs more than it saves)
+DUPLICATE_SCAN_PARALLEL_MIN_NODES = 2000
+DUPLICATE_SCAN_MAX_WORKERS = 4
+DUPLICATE_SCAN_ROWS_PER_TASK = 32
+
+# Word sets of the nodes being scanned, set once per worker process
+_scan_word_sets: list[frozenset[str]] = []
+_scan_threshold = 0.0
+
+
+def _init_duplicate_scan(word_sets: list[frozenset[str]], threshold: float) -> None:
+    global _scan_word_sets, _scan_threshold
+    _scan_word_sets = word_sets
+    _scan_threshold = threshold
+
+
+def _duplicate_rows(start: int, stop: int) -> list[tuple[int, int, float]]:
+    """(i, j, similarity) for every pair i < j with i in [start, stop) and
+    Jaccard >= threshold, in scan order."""
+    word_sets = _scan_word_sets
+    threshold = _scan_threshold
+    pairs: list[tuple[int, int, float]] = []
+    for i in range(start, stop):
+        words1 = word_sets[i]
+        for j in range(i + 1, len(word_sets)):
+            words2 = word_sets[j]
+            if not could_reach(words1, words2, threshold):
+                continue
+            similarity = jaccard(words1, words2)
+            if similarity >= threshold:
+                pairs.append((i, j, similarity))
+    return pairs
+
+
+def find_duplicates_between_nodes(
+    nodes: list[NodeDict],
+    threshold: float = 0.8,
+    workers: int = 0,
+) -> list[dict[str, Any]]:
     """
     Find duplicate or near-duplicate nodes.
+    
+    workers: processes for the pair scan (0 = auto: up to
+    DUPLICATE_SCAN_MAX_WORKERS for DUPLICATE_SCAN_PARALLEL_MIN_NODES+ nodes,
+    serial inside a worker process such as a batch run). The result is the
+    same either way.
     """
-    duplicates: list[dict[str, Any]] = []
+    word_sets = [word_set(node["content"]) for node in nodes]
     
-    for i, node1 in enumerate(nodes):
-        for j, node2 in enumerate(nodes[i+1:], start=i+1):
-            similarity = calculate_similarity(node1["content"], node2["content"])
-            if similarity >= threshold:
-                duplicates.append({
-                    "node1_id": node1.get("id", f"node_{i}"),
-                    "node2_id": node2.get("id", f"node_{j}"),
-                    "similarity": round(similarity, 3)
-                })
+    if workers <= 0:
+        in_worker = multiprocessing.parent_process() is not None
+        if len(nodes) < DUPLICATE_SCAN_PARALLEL_MIN_NODES or in_worker:
+            workers = 1
+        else:
+            workers = min(os.cpu_count() or 1, DUPLICATE_SCAN_MAX_WORKERS)
     
-    return duplicates
+    if workers == 1:
+        _init_duplicate_scan(word_sets, threshold)
+        try:
+            pairs = _duplicate_rows(0, len(nodes))
+        finally:
+            _init_duplicate_scan([], 0.0)
+    else:
+        # Small row blocks keep the workers balanced (row i has n - i - 1
+        # pairs); map() returns the blocks in order
+        starts = range(0, len(nodes), DUPLICATE_SCAN_ROWS_PER_TASK)
+        stops = [min(start + DUPLICATE_SCAN_ROWS_PER_TASK, len(nodes)) for start in starts]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_duplicate_scan,
+                                 initargs=(word_sets, threshold)) as executor:
+            pairs = [pair for block in executor.map(_duplicate_rows, starts, stops) for pair in block]
+    
+    return [
+        {
+            "node1_id": nodes[i].get("id", f"node_{i}"),
+            "node2_id": nodes[j].get("id", f"node_{j}"),
+            "similarity": round(similarity, 3)
+        }
+        for i, j, similarity in pairs
+    ]
 
 
 def audit_and_merge_nodes(
@@ -242,8 +561,7 @@ def audit_and_merge_nodes(
     doc_id = data.get("source_file", "unknown").replace(".pdf", "")
 
     # ---- ADAPTIVE TOKEN THRESHOLD ----
-    token_counts = [estimate_tokens(n["content"]) for n in nodes]
-    avg_tokens = sum(token_counts) / len(token_counts)
+    avg_tokens = sum(estimate_tokens(n["content"]) for n in nodes) / original_count
 
     effective_min_tokens = min(min_tokens, int(avg_tokens * 0.5))
     effective_min_tokens = max(effective_min_tokens, 10)
@@ -287,81 +605,33 @@ def audit_and_merge_nodes(
     nodes = remove_duplicates(nodes, duplicate_threshold)
     after_dedup = len(nodes)
 
-    # ---- STEP 2: MERGE SHORT ADJACENT ----
-    merged_nodes: list[NodeDict] = []
-    i = 0
-    while i < len(nodes):
-        current = nodes[i]
-        while (
-            i + 1 < len(nodes)
-            and current.get("section") == nodes[i + 1].get("section")
-            and estimate_tokens(current["content"]) < effective_min_tokens
-        ):
-            current = merge_nodes(current, nodes[i + 1], doc_id)
-            i += 1
-        merged_nodes.append(current)
-        i += 1
-    nodes = merged_nodes
-    after_merge = len(nodes)
-
-    # ---- STEP 3: VALIDATE (keep all non-empty; merge remaining shorts with neighbors) ----
-    valid_nodes: list[NodeDict] = []
+    # ---- STEPS 2-4: MERGE, VALIDATE, REINDEX ----
+    # One streaming pass: each stage is a generator feeding the next, so no
+    # intermediate node lists are built
+    after_merge = 0
     removed_invalid = 0
-    for node in nodes:
-        text = node.get("content", "").strip()
-        if not text:
-            removed_invalid += 1
-            continue
-        valid_nodes.append(node)
-
-    # Second merge pass: merge any remaining short nodes with their neighbor
-    final_merged: list[NodeDict] = []
-    i = 0
-    while i < len(valid_nodes):
-        current = valid_nodes[i]
-        # If current is short and there is a next node, merge forward
-        if (estimate_tokens(current["content"]) < effective_min_tokens
-                and i + 1 < len(valid_nodes)):
-            current = merge_nodes(current, valid_nodes[i + 1], doc_id)
-            i += 2
-        else:
-            i += 1
-        final_merged.append(current)
-    nodes = final_merged
-
-    # ---- STEP 4: REINDEX ----
-    final_nodes: list[NodeDict] = []
-    for i, node in enumerate(nodes):
-        final_node: NodeDict = {
-            "id": f"{doc_id}_node_{i:04d}",
-            "content": node["content"],
-            "section": node.get("section", ""),
-            "metadata": {
-                "doc_id": doc_id,
-                "node_index": i,
-                "token_estimate": estimate_tokens(node["content"]),
-            },
-        }
 
-        # Preserve page_start / page_end / source_char_pos from upstream
-        for key in ("page_start", "page_end"):
-            if key in node:
-                final_node[key] = node[key]
-            elif key in node.get("metadata", {}):
-                final_node[key] = node["metadata"][key]
-        old_md = node.get("metadata", {})
-        if "source_char_pos" in old_md:
-            final_node["metadata"]["source_char_pos"] = old_md["source_char_pos"]
-        if "page_start" in old_md:
-            final_node["metadata"]["page_start"] = old_md["page_start"]
-        if "page_end" in old_md:
-            final_node["metadata"]["page_end"] = old_md["page_end"]
-        
-        # Preserve quality_flags if present
-        if "quality_flags" in node:
-            final_node["quality_flags"] = node["quality_flags"]
-        
-        final_nodes.append(final_node)
+    def non_empty(merged: Iterable[NodeDict]) -> Iterator[NodeDict]:
+        # Validate: keep all non-empty (whitespace-only test without building
+        # a stripped copy of the text)
+        nonlocal after_merge, removed_invalid
+        for node in merged:
+            after_merge += 1
+            text = node.get("content", "")
+            if not text or text.isspace():
+                removed_invalid += 1
+                continue
+            yield node
+
+    # Merge short adjacent nodes of a section, drop empty ones, then merge
+    # any remaining short node with its neighbour
+    final_nodes = [
+        reindexed_node(node, i, doc_id)
+        for i, node in enumerate(merge_short_pairs(
+            non_empty(merge_short_runs(nodes, effective_min_tokens, doc_id)),
+            effective_min_tokens, doc_id,
+        ))
+    ]
 
     result = data.copy()
     result["nodes"] = final_nodes
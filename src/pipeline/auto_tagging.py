@@ -23,8 +23,22 @@ Author: Research Assistant
 Date: January 2026
 """
 
-import re
-from typing import Any
+import os
+import heapq
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from operator import itemgetter
+from typing import Any, Iterator
+
+# Optional C multi-pattern matcher (pip install pyahocorasick); KeywordTrie
+# below is the pure-Python equivalent used without it
+try:
+    import ahocorasick  # type: ignore[import-not-found]
+except ImportError:
+    ahocorasick = None
 
 
 # =============================================================================
@@ -529,36 +543,208 @@ def normalize_text(text: str) -> str:
     return text
 
 
-def extract_tags_from_content(content: str, min_keyword_matches: int = 1) -> list[str]:
+def _is_word_char(char: str) -> bool:
+    """Same test as \\w in a str pattern."""
+    return char.isalnum() or char == "_"
+
+
+class KeywordTrie:
+    """
+    Aho-Corasick automaton in pure Python, with the subset of the
+    ahocorasick.Automaton interface used here (add_word, make_automaton, iter).
+    
+    States are numbered; _goto[state] maps a character to the next state,
+    _fail[state] is the longest proper suffix state and _outputs[state] the
+    values of every keyword ending there (own and inherited via _fail).
+    """
+    
+    def __init__(self) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._outputs: list[list[Any]] = [[]]
+    
+    def add_word(self, key: str, value: Any) -> None:
+        state = 0
+        for char in key:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append(value)
+    
+    def make_automaton(self) -> None:
+        # Breadth-first, so a state's fail target is complete before its children
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, child in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target
+                self._outputs[child] = self._outputs[child] + self._outputs[target]
+                queue.append(child)
+    
+    def iter(self, text: str) -> Iterator[tuple[int, Any]]:
+        """(end index, value) for every keyword occurrence, overlapping ones included."""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for value in outputs[state]:
+                yield end, value
+
+
+# ids of the definitions dicts -> automaton, built on first use
+_KEYWORD_AUTOMATA: dict[tuple[int, ...], Any] = {}
+
+
+def _keyword_automaton(*definitions: dict[str, list[str]]) -> Any:
+    """Aho-Corasick automaton over the lowercased keywords of all *definitions*;
+    each keyword maps to (keyword, categories listing it in the first
+    definitions, in the second, ...)."""
+    key = tuple(map(id, definitions))
+    automaton = _KEYWORD_AUTOMATA.get(key)
+    if automaton is not None:
+        return automaton
+    
+    categories_by_keyword: dict[str, tuple[list[str], ...]] = {}
+    for n, table in enumerate(definitions):
+        for category, keywords in table.items():
+            for keyword in keywords:
+                entry = categories_by_keyword.setdefault(
+                    keyword.lower(), tuple([] for _ in definitions))
+                entry[n].append(category)
+    
+    automaton = ahocorasick.Automaton() if ahocorasick is not None else KeywordTrie()
+    for keyword, categories in categories_by_keyword.items():
+        automaton.add_word(keyword, (keyword, *categories))
+    automaton.make_automaton()
+    _KEYWORD_AUTOMATA[key] = automaton
+    return automaton
+
+
+def _whole_word_hits(automaton: Any, text: str) -> Iterator[tuple[int, Any]]:
+    """(end index, value) of the automaton hits that re.findall with
+    \\b<keyword>\\b would report: whole words, non-overlapping per keyword."""
+    text_len = len(text)
+    last_end: dict[str, int] = {}
+    for end, value in automaton.iter(text):
+        keyword = value[0]
+        start = end - len(keyword) + 1
+        if start < last_end.get(keyword, 0):
+            continue
+        before = start > 0 and _is_word_char(text[start - 1])
+        after = end + 1 < text_len and _is_word_char(text[end + 1])
+        if before == _is_word_char(keyword[0]) or after == _is_word_char(keyword[-1]):
+            continue
+        last_end[keyword] = end + 1
+        yield end, value
+
+
+def count_keyword_matches(definitions: dict[str, list[str]], normalized_content: str) -> dict[str, int]:
+    """
+    Count whole-word keyword matches per category.
+    
+    For every keyword this is len(re.findall(r'\\b<keyword>\\b', text))
+    (non-overlapping, left to right), summed per category.
+    
+    Args:
+        definitions: TAG_DEFINITIONS or DOMAIN_DEFINITIONS
+        normalized_content: Text already passed through normalize_text
+        
+    Returns:
+        Match count for every category, in definition order
+    """
+    scores = dict.fromkeys(definitions, 0)
+    
+    # One pass over the text for all keywords
+    for _, (_, categories) in _whole_word_hits(_keyword_automaton(definitions), normalized_content):
+        for category in categories:
+            scores[category] += 1
+    return scores
+
+
+def count_tag_and_domain_matches(
+    normalized_content: str,
+    normalized_source_file: str = ""
+) -> tuple[dict[str, int], dict[str, int]]:
+    """
+    Tag and domain keyword counts of a node from a single pass.
+    
+    Same as count_keyword_matches(TAG_DEFINITIONS, normalized_content) and
+    count_keyword_matches(DOMAIN_DEFINITIONS, <content + " " + source file>):
+    a whole-word hit ending inside the content is seen identically in both
+    texts, since the joining space is a word boundary like the end of text.
+    
+    Args:
+        normalized_content: Node content passed through normalize_text
+        normalized_source_file: Source filename passed through normalize_text
+        
+    Returns:
+        (tag scores, domain scores), each in definition order
+    """
+    tag_scores = dict.fromkeys(TAG_DEFINITIONS, 0)
+    domain_scores = dict.fromkeys(DOMAIN_DEFINITIONS, 0)
+    
+    content_len = len(normalized_content)
+    text = " ".join(part for part in (normalized_content, normalized_source_file) if part)
+    automaton = _keyword_automaton(TAG_DEFINITIONS, DOMAIN_DEFINITIONS)
+    for end, (_, tags, domains) in _whole_word_hits(automaton, text):
+        if end < content_len:
+            for tag in tags:
+                tag_scores[tag] += 1
+        for domain in domains:
+            domain_scores[domain] += 1
+    return tag_scores, domain_scores
+
+
+def _ranked_tags(tag_scores: dict[str, int], min_keyword_matches: int) -> list[str]:
+    """Tags with at least *min_keyword_matches* hits, most hits first."""
+    matched = [(tag, count) for tag, count in tag_scores.items() if count >= min_keyword_matches]
+    return [tag for tag, _ in sorted(matched, key=lambda x: x[1], reverse=True)]
+
+
+def _ranked_domains(domain_scores: dict[str, int]) -> list[tuple[str, int]]:
+    """(domain, score) for every domain with a hit, highest score first."""
+    matched = [(domain, count) for domain, count in domain_scores.items() if count > 0]
+    return sorted(matched, key=lambda x: x[1], reverse=True)
+
+
+def extract_tags_from_content(
+    content: str,
+    min_keyword_matches: int = 1,
+    normalized_content: str | None = None
+) -> list[str]:
     """
     Extract relevant tags from content based on keyword matching.
     
     Args:
         content: Text content to analyze
         min_keyword_matches: Minimum keyword matches required to assign a tag
+        normalized_content: normalize_text(content), if the caller already has it
         
     Returns:
         List of matched tags sorted by relevance
     """
-    normalized_content = normalize_text(content)
-    tag_scores: dict[str, int] = {}
-    
-    for tag, keywords in TAG_DEFINITIONS.items():
-        match_count = 0
-        for keyword in keywords:
-            # Use word boundary matching for more accurate results
-            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-            matches = len(re.findall(pattern, normalized_content))
-            match_count += matches
-        
-        if match_count >= min_keyword_matches:
-            tag_scores[tag] = match_count
+    if normalized_content is None:
+        normalized_content = normalize_text(content)
     
-    # Sort by match count (most relevant first)
-    sorted_tags = sorted(tag_scores.items(), key=lambda x: x[1], reverse=True)
-    
-    # Return only tag names
-    return [tag for tag, _ in sorted_tags]
+    # Word boundary matching, most relevant first
+    return _ranked_tags(count_keyword_matches(TAG_DEFINITIONS, normalized_content), min_keyword_matches)
+
+
+# Every node of a section (and of a file) carries the same heading and file
+# name, so their tags are computed once per distinct string
+@lru_cache(maxsize=1024)
+def _repeated_text_tags(text: str) -> tuple[str, ...]:
+    return tuple(extract_tags_from_content(text, min_keyword_matches=1))
 
 
 def extract_tags_from_section(section_heading: str) -> list[str]:
@@ -576,50 +762,95 @@ def extract_tags_from_section(section_heading: str) -> list[str]:
     if not section_heading:
         return []
     
-    return extract_tags_from_content(section_heading, min_keyword_matches=1)
+    return list(_repeated_text_tags(section_heading))
+
+
+@lru_cache(maxsize=64)
+def _normalized_source_file(source_file: str) -> str:
+    return normalize_text(source_file)
+
+
+# Approximate domain detection stops scanning once, at a check made every
+# DOMAIN_EARLY_EXIT_HITS hits past the first DOMAIN_EARLY_EXIT_MIN_CHARS
+# characters, the leading domain has more than DOMAIN_EARLY_EXIT_RATIO times
+# the hits of the runner-up
+DOMAIN_EARLY_EXIT_HITS = 200
+DOMAIN_EARLY_EXIT_MIN_CHARS = 512
+DOMAIN_EARLY_EXIT_RATIO = 3
 
 
-def detect_domain(content: str, source_file: str = "") -> list[tuple[str, int]]:
+def _domain_scores_until_clear(normalized_text: str) -> dict[str, int]:
+    """Domain keyword counts, possibly of a prefix of the text only (see
+    DOMAIN_EARLY_EXIT_HITS)."""
+    scores = dict.fromkeys(DOMAIN_DEFINITIONS, 0)
+    hits = 0
+    for end, (_, domains) in _whole_word_hits(_keyword_automaton(DOMAIN_DEFINITIONS), normalized_text):
+        for domain in domains:
+            scores[domain] += 1
+        hits += 1
+        if hits % DOMAIN_EARLY_EXIT_HITS == 0 and end >= DOMAIN_EARLY_EXIT_MIN_CHARS:
+            leader, runner_up = heapq.nlargest(2, scores.values())
+            if leader > DOMAIN_EARLY_EXIT_RATIO * runner_up:
+                break
+    return scores
+
+
+def detect_domain(
+    content: str,
+    source_file: str = "",
+    normalized_content: str | None = None,
+    approximate: bool = False
+) -> list[tuple[str, int]]:
     """
     Detect the primary domain/field of the content.
     
     Args:
         content: Text content to analyze
         source_file: Source filename for additional context
+        normalized_content: normalize_text(content), if the caller already has it
+        approximate: Stop counting once one domain clearly leads (see
+                     DOMAIN_EARLY_EXIT_HITS); the leader is then usually the
+                     exact one, but the scores are partial
         
     Returns:
         List of (domain, score) tuples sorted by relevance
     """
-    normalized_content = normalize_text(content + " " + source_file)
-    domain_scores: dict[str, int] = {}
-    
-    for domain, keywords in DOMAIN_DEFINITIONS.items():
-        match_count = 0
-        for keyword in keywords:
-            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-            matches = len(re.findall(pattern, normalized_content))
-            match_count += matches
-        
-        if match_count > 0:
-            domain_scores[domain] = match_count
-    
-    # Sort by score
-    sorted_domains = sorted(domain_scores.items(), key=lambda x: x[1], reverse=True)
-    return sorted_domains
+    if normalized_content is None:
+        normalized_content = normalize_text(content + " " + source_file)
+    else:
+        # Same as normalizing content + " " + source_file in one go
+        normalized_content = " ".join(
+            part for part in (normalized_content, _normalized_source_file(source_file)) if part
+        )
+    
+    if approximate:
+        scores = _domain_scores_until_clear(normalized_content)
+    else:
+        scores = count_keyword_matches(DOMAIN_DEFINITIONS, normalized_content)
+    
+    # Sorted by score
+    return _ranked_domains(scores)
 
 
-def get_primary_domain(content: str, source_file: str = "") -> str:
+def get_primary_domain(
+    content: str,
+    source_file: str = "",
+    normalized_content: str | None = None,
+    approximate: bool = False
+) -> str:
     """
     Get the primary domain of the content.
     
     Args:
         content: Text content
         source_file: Source filename
+        normalized_content: normalize_text(content), if the caller already has it
+        approximate: Allow stopping early on a clear leader (see detect_domain)
         
     Returns:
         Primary domain name or "Khác" if not detected
     """
-    domains = detect_domain(content, source_file)
+    domains = detect_domain(content, source_file, normalized_content, approximate)
     if domains:
         return domains[0][0]
     return "Khác"
@@ -629,7 +860,8 @@ def auto_tag_content(
     content: str,
     section: str = "",
     source_file: str = "",
-    max_tags: int = 10
+    max_tags: int = 10,
+    normalized_content: str | None = None
 ) -> list[str]:
     """
     Automatically generate tags for content.
@@ -644,42 +876,47 @@ def auto_tag_content(
         section: Section heading (optional)
         source_file: Source filename (optional)
         max_tags: Maximum number of tags to return
+        normalized_content: normalize_text(content), if the caller already has it
         
     Returns:
         List of relevant tags
     """
-    all_tags: dict[str, int] = {}
-    
     # Extract from main content (most important)
-    content_tags = extract_tags_from_content(content, min_keyword_matches=2)
-    for i, tag in enumerate(content_tags):
-        # Give higher weight to earlier matches
-        all_tags[tag] = all_tags.get(tag, 0) + (10 - min(i, 9))
+    content_tags = extract_tags_from_content(content, min_keyword_matches=2,
+                                             normalized_content=normalized_content)
+    return _combined_tags(content_tags, section, source_file, max_tags)
+
+
+def _combined_tags(content_tags: list[str], section: str, source_file: str, max_tags: int) -> list[str]:
+    """Weigh the content tags with the section heading and filename tags
+    (see auto_tag_content)."""
+    # Give higher weight to earlier matches (tags are unique in each list)
+    all_tags = Counter({tag: 10 - min(i, 9) for i, tag in enumerate(content_tags)})
     
     # Extract from section heading (high importance)
-    section_tags = extract_tags_from_section(section)
-    for tag in section_tags:
-        all_tags[tag] = all_tags.get(tag, 0) + 5
+    if section:
+        all_tags.update(dict.fromkeys(_repeated_text_tags(section), 5))
     
     # Extract from source filename
     if source_file:
-        filename_tags = extract_tags_from_content(source_file, min_keyword_matches=1)
-        for tag in filename_tags:
-            all_tags[tag] = all_tags.get(tag, 0) + 3
-    
-    # Sort by score and return top tags
-    sorted_tags = sorted(all_tags.items(), key=lambda x: x[1], reverse=True)
+        all_tags.update(dict.fromkeys(_repeated_text_tags(source_file), 3))
     
-    return [tag for tag, _ in sorted_tags[:max_tags]]
+    # Top tags by score (nlargest keeps sorted()'s order, ties included)
+    return [tag for tag, _ in heapq.nlargest(max_tags, all_tags.items(), key=itemgetter(1))]
 
 
-def auto_tag_node(node: dict[str, Any], source_file: str = "") -> list[str]:
+def auto_tag_node(
+    node: dict[str, Any],
+    source_file: str = "",
+    normalized_content: str | None = None
+) -> list[str]:
     """
     Automatically generate tags for a node.
     
     Args:
         node: Node dictionary with 'content' and optionally 'section'
         source_file: Source filename
+        normalized_content: normalize_text of the node content, if the caller already has it
         
     Returns:
         List of relevant tags
@@ -687,13 +924,46 @@ def auto_tag_node(node: dict[str, Any], source_file: str = "") -> list[str]:
     content = node.get("content", "")
     section = node.get("section", "")
     
-    return auto_tag_content(content, section, source_file)
+    return auto_tag_content(content, section, source_file, normalized_content=normalized_content)
+
+
+# Nodes are tagged in worker processes from this many nodes on (below it,
+# starting the pool costs more than it saves)
+TAGGING_PARALLEL_MIN_NODES = 2000
+TAGGING_MAX_WORKERS = 4
+
+
+def _tag_columns(
+    contents: list[str],
+    sections: list[str],
+    source_file: str,
+    max_tags_per_node: int
+) -> tuple[list[list[str]], list[str]]:
+    """Tags and primary domain of every (content, section) pair."""
+    normalized_source_file = _normalized_source_file(source_file)
+    all_tags: list[list[str]] = []
+    all_domains: list[str] = []
+    for content, section in zip(contents, sections):
+        # Tag and domain keywords counted in one pass (same result as
+        # auto_tag_node + get_primary_domain)
+        tag_scores, domain_scores = count_tag_and_domain_matches(
+            normalize_text(content), normalized_source_file)
+        
+        # Generate tags
+        content_tags = _ranked_tags(tag_scores, min_keyword_matches=2)
+        all_tags.append(_combined_tags(content_tags, section, source_file, 10)[:max_tags_per_node])
+        
+        # Detect domain (first of the highest scores, as in _ranked_domains)
+        domain, score = max(domain_scores.items(), key=itemgetter(1))
+        all_domains.append(domain if score > 0 else "Khác")
+    return all_tags, all_domains
 
 
 def add_tags_to_nodes(
     nodes: list[dict[str, Any]],
     source_file: str = "",
-    max_tags_per_node: int = 10
+    max_tags_per_node: int = 10,
+    workers: int = 0
 ) -> list[dict[str, Any]]:
     """
     Add auto-generated tags and domain to a list of nodes.
@@ -702,33 +972,45 @@ def add_tags_to_nodes(
         nodes: List of node dictionaries
         source_file: Source filename for context
         max_tags_per_node: Maximum tags per node
+        workers: Processes to tag with (0 = auto: up to TAGGING_MAX_WORKERS
+                 for TAGGING_PARALLEL_MIN_NODES+ nodes, serial inside a worker
+                 process such as a batch run). The result is the same either way.
         
     Returns:
         Nodes with tags and domain added to metadata
     """
-    tagged_nodes: list[dict[str, Any]] = []
+    contents = [node.get("content", "") for node in nodes]
+    sections = [node.get("section", "") for node in nodes]
     
-    for node in nodes:
-        # Create a copy to avoid modifying original
-        tagged_node = node.copy()
-        if "metadata" not in tagged_node:
-            tagged_node["metadata"] = {}
+    if workers <= 0:
+        in_worker = multiprocessing.parent_process() is not None
+        if len(nodes) < TAGGING_PARALLEL_MIN_NODES or in_worker:
+            workers = 1
         else:
-            tagged_node["metadata"] = node["metadata"].copy()
-        
-        content = node.get("content", "")
-        
-        # Generate tags
-        tags = auto_tag_node(node, source_file)[:max_tags_per_node]
-        tagged_node["metadata"]["tags"] = tags
-        
-        # Detect domain
-        domain = get_primary_domain(content, source_file)
-        tagged_node["metadata"]["domain"] = domain
-        
-        tagged_nodes.append(tagged_node)
-    
-    return tagged_nodes
+            workers = min(os.cpu_count() or 1, TAGGING_MAX_WORKERS)
+    
+    if workers == 1 or not nodes:
+        all_tags, all_domains = _tag_columns(contents, sections, source_file, max_tags_per_node)
+    else:
+        # A few chunks per worker; map() returns them in order
+        size = -(-len(nodes) // (workers * 4))
+        starts = range(0, len(nodes), size)
+        all_tags, all_domains = [], []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for tags_chunk, domains_chunk in executor.map(
+                _tag_columns,
+                [contents[start:start + size] for start in starts],
+                [sections[start:start + size] for start in starts],
+                repeat(source_file), repeat(max_tags_per_node),
+            ):
+                all_tags.extend(tags_chunk)
+                all_domains.extend(domains_chunk)
+    
+    # Copies, so the original nodes are not modified
+    return [
+        {**node, "metadata": {**node.get("metadata", {}), "tags": tags, "domain": domain}}
+        for node, tags, domain in zip(nodes, all_tags, all_domains)
+    ]
 
 
 def get_available_tags() -> list[str]:
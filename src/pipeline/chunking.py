@@ -18,16 +18,32 @@ Author: Research Assistant
 Date: January 2026
 """
 
-import re
-from typing import Any
-from dataclasses import dataclass, field, asdict
+from functools import lru_cache
+from typing import Any, Iterator
+from dataclasses import dataclass, field
 
+from pipeline._regex import engine
+
+
+# Regex engine used for the module-level patterns below
+# (CHUNKER_REGEX_ENGINE=regex to A/B the third-party `regex` module)
+_re = engine("CHUNKER_REGEX_ENGINE")
+CHUNKER_REGEX_ENGINE = _re.__name__
 
 # Pattern for table placeholder
-TABLE_PLACEHOLDER_PATTERN = re.compile(r'\[TABLE_REMOVED:\s*[^\]]+\]')
+TABLE_PLACEHOLDER_PATTERN = _re.compile(r'\[TABLE_REMOVED:\s*[^\]]+\]')
+
+# Vietnamese sentence endings: . ! ? followed by whitespace and a new sentence
+SENTENCE_SPLIT_PATTERN = _re.compile(r'(?<=[.!?])\s+(?=[A-ZÀ-Ỹa-zà-ỹ0-9"])')
+
+# Paragraph break: blank line (possibly containing whitespace)
+PARAGRAPH_SPLIT_PATTERN = _re.compile(r'\n\s*\n')
+
+DOC_ID_UNSAFE_PATTERN = _re.compile(r'[^\w\-]')
+WHITESPACE_RUN_PATTERN = _re.compile(r'\s+')
 
 
-@dataclass
+@dataclass(slots=True)
 class Node:
     """
     Represents a semantic node for LightRAG ingestion.
@@ -44,8 +60,24 @@ class Node:
     metadata: dict[str, Any] = field(default_factory=lambda: {})
     
     def to_dict(self) -> dict[str, Any]:
-        """Convert node to dictionary for JSON serialization."""
-        return asdict(self)
+        """
+        Convert node to dictionary for JSON serialization.
+        
+        Built by hand rather than with dataclasses.asdict, which deep-copies
+        recursively. Metadata is flat (see create_node); the only mutable
+        value is the tags list, which is shared by every node of a
+        chunk_to_nodes call and is therefore copied per node.
+        """
+        metadata = dict(self.metadata)
+        tags = metadata.get("tags")
+        if tags is not None:
+            metadata["tags"] = list(tags)
+        return {
+            "id": self.id,
+            "content": self.content,
+            "section": self.section,
+            "metadata": metadata,
+        }
     
     @property
     def token_count(self) -> int:
@@ -67,10 +99,19 @@ def estimate_tokens(text: str) -> int:
         Estimated token count
     """
     # Remove extra whitespace for accurate count
-    text = ' '.join(text.split())
+    return _tokens_from_length(_normalized_length(text))
+
+
+def _normalized_length(text: str) -> int:
+    """Length of ``text`` once its whitespace runs are collapsed to one space."""
+    return len(' '.join(text.split()))
+
+
+def _tokens_from_length(length: int) -> int:
+    """Token estimate for a normalized length (see estimate_tokens)."""
     # Vietnamese: roughly 4-5 chars per token on average
     # English: roughly 4 chars per token
-    return max(1, len(text) // 4)
+    return max(1, length // 4)
 
 
 def is_table_placeholder(line: str) -> bool:
@@ -144,11 +185,7 @@ def split_into_sentences(text: str) -> list[str]:
     Returns:
         List of sentences
     """
-    # Vietnamese sentence endings: . ! ? 
-    # Also handle cases with quotes
-    sentence_pattern = r'(?<=[.!?])\s+(?=[A-ZÀ-Ỹa-zà-ỹ0-9"])'
-    
-    sentences = re.split(sentence_pattern, text)
+    sentences = SENTENCE_SPLIT_PATTERN.split(text)
     
     # Clean up sentences
     sentences = [s.strip() for s in sentences if s.strip()]
@@ -168,43 +205,45 @@ def extract_sections(content: str) -> list[dict[str, Any]]:
     """
     sections: list[dict[str, Any]] = []
     
-    # Split by headings (# ## ### etc.)
-    heading_pattern = r'^(#{1,6})\s+(.+?)$'
-    lines = content.split('\n')
-    
-    current_section: dict[str, Any] = {
-        "heading": "",
-        "level": 0,
-        "content_lines": []
-    }
-    
-    for line in lines:
-        heading_match = re.match(heading_pattern, line)
-        
-        if heading_match:
-            # Save previous section if it has content
-            if current_section["content_lines"]:
+    # Jump from one '#'-led line to the next with str.find instead of
+    # splitting into lines: only those lines can be headings (1-6 '#',
+    # whitespace, then text; the prefix scan is equivalent to
+    # ^(#{1,6})\s+(.+?)$). Section content is then a single slice of
+    # ``content`` between two heading lines, the same text the old
+    # '\n'.join of its lines produced.
+    heading = ""
+    level = 0
+    body_start = 0  # offset of the current section's first line
+    
+    start = 0 if content[:1] == '#' else content.find('\n#') + 1 or -1
+    while start >= 0:
+        end = content.find('\n', start)
+        if end < 0:
+            end = len(content)
+        line = content[start:end]
+        line_level = len(line) - len(line.lstrip('#'))
+        if line_level <= 6 and len(line) >= line_level + 2 and line[line_level].isspace():
+            # Save previous section if it has content lines
+            if start > body_start:
                 sections.append({
-                    "heading": current_section["heading"],
-                    "level": current_section["level"],
-                    "content": '\n'.join(current_section["content_lines"]).strip()
+                    "heading": heading,
+                    "level": level,
+                    "content": content[body_start:start - 1].strip()
                 })
             
             # Start new section
-            current_section = {
-                "heading": heading_match.group(2).strip(),
-                "level": len(heading_match.group(1)),
-                "content_lines": []
-            }
-        else:
-            current_section["content_lines"].append(line)
-    
-    # Don't forget the last section
-    if current_section["content_lines"]:
+            heading = line[line_level:].strip()
+            level = line_level
+            body_start = end + 1
+        start = content.find('\n#', end) + 1 or -1
+    
+    # Don't forget the last section (absent only when the text ends on a
+    # heading line with no newline after it)
+    if body_start <= len(content):
         sections.append({
-            "heading": current_section["heading"],
-            "level": current_section["level"],
-            "content": '\n'.join(current_section["content_lines"]).strip()
+            "heading": heading,
+            "level": level,
+            "content": content[body_start:].strip()
         })
     
     return sections
@@ -221,7 +260,7 @@ def split_into_paragraphs(text: str) -> list[str]:
         List of paragraphs
     """
     # Split on double newlines
-    paragraphs = re.split(r'\n\s*\n', text)
+    paragraphs = PARAGRAPH_SPLIT_PATTERN.split(text)
     
     # Clean and filter empty
     paragraphs = [p.strip() for p in paragraphs if p.strip()]
@@ -244,7 +283,14 @@ def is_paragraph_table_content(paragraph: str) -> bool:
     return table_lines >= 2
 
 
-def create_node(content: str, section: str, doc_id: str, node_index: int, tags: list[str] | None = None) -> Node:
+def create_node(
+    content: str,
+    section: str,
+    doc_id: str,
+    node_index: int,
+    tags: list[str] | None = None,
+    token_estimate: int | None = None
+) -> Node:
     """
     Create a new node with generated ID.
     
@@ -254,16 +300,21 @@ def create_node(content: str, section: str, doc_id: str, node_index: int, tags:
         doc_id: Document identifier
         node_index: Sequential node index
         tags: Optional list of tags for the node
+        token_estimate: estimate_tokens(content) if the caller already knows
+            it; computed here otherwise
         
     Returns:
         Node object
     """
     node_id = f"{doc_id}_node_{node_index:04d}"
     
+    if token_estimate is None:
+        token_estimate = estimate_tokens(content)
+    
     metadata: dict[str, Any] = {
         "doc_id": doc_id,
         "node_index": node_index,
-        "token_estimate": estimate_tokens(content)
+        "token_estimate": token_estimate
     }
     
     # Check for table content
@@ -317,9 +368,14 @@ def chunk_section(
     
     current_content: list[str] = []
     current_token_count = 0
+    # Normalized length of the joined accumulator. Paragraphs and sentences
+    # are stripped and non-empty, so joining adds exactly one separator
+    # char each; nodes get their token estimate without re-splitting.
+    current_length = 0
     
     for paragraph in paragraphs:
-        para_tokens = estimate_tokens(paragraph)
+        para_length = _normalized_length(paragraph)
+        para_tokens = _tokens_from_length(para_length)
         
         # Check if this is table content (atomic - don't split)
         is_table_para = is_paragraph_table_content(paragraph)
@@ -333,20 +389,24 @@ def chunk_section(
                     section_heading,
                     doc_id,
                     current_index,
-                    tags
+                    tags,
+                    token_estimate=_tokens_from_length(current_length)
                 )
                 nodes.append(node)
                 current_index += 1
                 current_content = []
                 current_token_count = 0
+                current_length = 0
             
             # Split large paragraph by sentences
             sentences = split_into_sentences(paragraph)
             sentence_buffer = []
             buffer_tokens = 0
+            buffer_length = 0
             
             for sentence in sentences:
-                sent_tokens = estimate_tokens(sentence)
+                sent_length = _normalized_length(sentence)
+                sent_tokens = _tokens_from_length(sent_length)
                 
                 if buffer_tokens + sent_tokens > max_tokens and sentence_buffer:
                     # Create node from buffer
@@ -355,33 +415,41 @@ def chunk_section(
                         section_heading,
                         doc_id,
                         current_index,
-                        tags
+                        tags,
+                        token_estimate=_tokens_from_length(buffer_length)
                     )
                     nodes.append(node)
                     current_index += 1
                     sentence_buffer = [sentence]
                     buffer_tokens = sent_tokens
+                    buffer_length = sent_length
                 else:
+                    if sentence_buffer:
+                        buffer_length += 1
                     sentence_buffer.append(sentence)
                     buffer_tokens += sent_tokens
+                    buffer_length += sent_length
             
             # Handle remaining sentences
             if sentence_buffer:
                 remaining = ' '.join(sentence_buffer)
-                if estimate_tokens(remaining) >= min_tokens:
+                remaining_tokens = _tokens_from_length(buffer_length)
+                if remaining_tokens >= min_tokens:
                     node = create_node(
                         remaining,
                         section_heading,
                         doc_id,
                         current_index,
-                        tags
+                        tags,
+                        token_estimate=remaining_tokens
                     )
                     nodes.append(node)
                     current_index += 1
                 else:
                     # Add to next accumulation
                     current_content = [remaining]
-                    current_token_count = estimate_tokens(remaining)
+                    current_token_count = remaining_tokens
+                    current_length = buffer_length
         
         # Table content: keep atomic even if large
         elif is_table_para:
@@ -392,12 +460,14 @@ def chunk_section(
                     section_heading,
                     doc_id,
                     current_index,
-                    tags
+                    tags,
+                    token_estimate=_tokens_from_length(current_length)
                 )
                 nodes.append(node)
                 current_index += 1
                 current_content = []
                 current_token_count = 0
+                current_length = 0
             
             # Create node for table content (atomic)
             node = create_node(
@@ -405,7 +475,8 @@ def chunk_section(
                 section_heading,
                 doc_id,
                 current_index,
-                tags
+                tags,
+                token_estimate=para_tokens
             )
             nodes.append(node)
             current_index += 1
@@ -418,30 +489,37 @@ def chunk_section(
                     section_heading,
                     doc_id,
                     current_index,
-                    tags
+                    tags,
+                    token_estimate=_tokens_from_length(current_length)
                 )
                 nodes.append(node)
                 current_index += 1
             
             current_content = [paragraph]
             current_token_count = para_tokens
+            current_length = para_length
         
         # Otherwise, accumulate
         else:
+            if current_content:
+                current_length += 1
             current_content.append(paragraph)
             current_token_count += para_tokens
+            current_length += para_length
     
     # Handle remaining content
     if current_content:
         remaining_text = '\n\n'.join(current_content)
+        remaining_tokens = _tokens_from_length(current_length)
         # Only create node if it meets minimum size
-        if estimate_tokens(remaining_text) >= min_tokens:
+        if remaining_tokens >= min_tokens:
             node = create_node(
                 remaining_text,
                 section_heading,
                 doc_id,
                 current_index,
-                tags
+                tags,
+                token_estimate=remaining_tokens
             )
             nodes.append(node)
             current_index += 1
@@ -463,7 +541,8 @@ def chunk_section(
                 section_heading,
                 doc_id,
                 current_index,
-                tags
+                tags,
+                token_estimate=remaining_tokens
             )
             nodes.append(node)
             current_index += 1
@@ -471,16 +550,35 @@ def chunk_section(
     return nodes, current_index
 
 
-def chunk_to_nodes(
+def _chunkable_sections(content: str) -> Iterator[tuple[str, str]]:
+    """(heading, content) of each section of ``content`` that has text."""
+    for section in extract_sections(content):
+        if section["content"].strip():
+            yield section["heading"], section["content"]
+
+
+# Small: only the source file names of recent inputs are kept
+@lru_cache(maxsize=64)
+def _doc_id(source_file: str) -> str:
+    """Node-id-safe document id for ``source_file``."""
+    doc_id = source_file
+    if doc_id.endswith(".pdf"):
+        doc_id = doc_id[:-4]
+    return DOC_ID_UNSAFE_PATTERN.sub('_', doc_id)
+
+
+def iter_chunks(
     data: dict[str, Any],
     min_tokens: int = 150,
     max_tokens: int = 400,
     tags: list[str] | None = None
-) -> dict[str, Any]:
+) -> Iterator[dict[str, Any]]:
     """
-    Convert final_content into semantic nodes for LightRAG.
+    Yield the nodes of ``final_content`` one serialized dict at a time.
     
-    This is the main entry point for the chunking module.
+    Same nodes, in the same order, as ``chunk_to_nodes(...)["nodes"]``, but
+    only one section's nodes are held at once, so callers can stream them
+    to disk without materializing the whole document.
     
     Args:
         data: Dictionary containing 'final_content' field
@@ -488,16 +586,11 @@ def chunk_to_nodes(
         max_tokens: Maximum tokens per node (default: 400)
         tags: Optional list of tags to apply to all nodes
         
-    Returns:
-        Dictionary with original fields plus 'nodes' list
+    Yields:
+        Node dictionaries (see Node.to_dict)
         
     Raises:
-        ValueError: If 'final_content' field is missing
-        
-    Example:
-        >>> data = {"final_content": "# Title\\n\\nContent...", "source_file": "doc.pdf"}
-        >>> result = chunk_to_nodes(data)
-        >>> print(len(result["nodes"]))
+        ValueError: If 'final_content' field is missing (on first iteration)
     """
     if "final_content" not in data:
         raise ValueError("Input must contain 'final_content' field from final_cleaning")
@@ -505,36 +598,28 @@ def chunk_to_nodes(
     content = data["final_content"]
     
     # Extract document ID from source file
-    doc_id = data.get("source_file", "unknown")
-    if doc_id.endswith(".pdf"):
-        doc_id = doc_id[:-4]
-    doc_id = re.sub(r'[^\w\-]', '_', doc_id)
-    
-    # Extract sections
-    sections = extract_sections(content)
+    doc_id = _doc_id(data.get("source_file", "unknown"))
     
     # Chunk each section
-    all_nodes: list[Node] = []
     current_index = 0
     
-    for section in sections:
-        if not section["content"].strip():
-            continue
-        
+    for heading, section_content in _chunkable_sections(content):
         section_nodes, current_index = chunk_section(
-            section["content"],
-            section["heading"],
+            section_content,
+            heading,
             doc_id,
             current_index,
             min_tokens,
             max_tokens,
             tags
         )
-        all_nodes.extend(section_nodes)
+        for node in section_nodes:
+            yield node.to_dict()
     
-    # Handle case where there are no sections (no headings)
-    if not all_nodes and content.strip():
-        all_nodes, _ = chunk_section(
+    # Handle case where there are no sections (no headings); current_index
+    # counts the nodes yielded so far
+    if current_index == 0 and content.strip():
+        section_nodes, _ = chunk_section(
             content,
             "",
             doc_id,
@@ -543,15 +628,48 @@ def chunk_to_nodes(
             max_tokens,
             tags
         )
+        for node in section_nodes:
+            yield node.to_dict()
+
+
+def chunk_to_nodes(
+    data: dict[str, Any],
+    min_tokens: int = 150,
+    max_tokens: int = 400,
+    tags: list[str] | None = None
+) -> dict[str, Any]:
+    """
+    Convert final_content into semantic nodes for LightRAG.
+    
+    This is the main entry point for the chunking module.
+    
+    Args:
+        data: Dictionary containing 'final_content' field
+        min_tokens: Minimum tokens per node (default: 150)
+        max_tokens: Maximum tokens per node (default: 400)
+        tags: Optional list of tags to apply to all nodes
+        
+    Returns:
+        Dictionary with original fields plus 'nodes' list
+        
+    Raises:
+        ValueError: If 'final_content' field is missing
+        
+    Example:
+        >>> data = {"final_content": "# Title\\n\\nContent...", "source_file": "doc.pdf"}
+        >>> result = chunk_to_nodes(data)
+        >>> print(len(result["nodes"]))
+    """
+    nodes = list(iter_chunks(data, min_tokens, max_tokens, tags))
     
-    # Convert nodes to dictionaries
     result = data.copy()
-    result["nodes"] = [node.to_dict() for node in all_nodes]
+    result["nodes"] = nodes
     result["chunking_stats"] = {
-        "total_nodes": len(all_nodes),
+        "total_nodes": len(nodes),
         "min_tokens": min_tokens,
         "max_tokens": max_tokens,
-        "avg_tokens": sum(n.token_count for n in all_nodes) // max(1, len(all_nodes))
+        # Node.token_count: len(content) // 4
+        "avg_tokens": sum(len(n["content"]) // 4 for n in nodes) // max(1, len(nodes))
     }
     
     return result
@@ -563,7 +681,7 @@ def chunk_to_nodes(
 
 def _normalize_ws(text: str) -> str:
     """Collapse all whitespace runs to a single space (for fuzzy matching)."""
-    return re.sub(r'\s+', ' ', text).strip()
+    return WHITESPACE_RUN_PATTERN.sub(' ', text).strip()
 
 
 def reorder_nodes_by_position(
@@ -42,6 +42,15 @@ _PARSED_TEXT_PAGE_RE = re.compile(
     re.IGNORECASE,
 )
 
+# The PAGE comment plus optional trailing whitespace and one newline
+_PAGE_COMMENT_LINE_RE = re.compile(
+    r'<!--\s*PAGE[^>]*?-->\s*\n?',
+    re.IGNORECASE,
+)
+
+# 3+ consecutive newlines, collapsed to one blank line by several passes
+_BLANK_LINE_RUN_RE = re.compile(r'\n{3,}')
+
 
 def remove_page_markers(text: str) -> str:
     """
@@ -54,7 +63,7 @@ def remove_page_markers(text: str) -> str:
     removal does not introduce extra blank lines.
     """
     # Remove the marker AND optional trailing whitespace + one newline
-    text = re.sub(r'<!--\s*PAGE[^>]*?-->\s*\n?', '', text, flags=re.IGNORECASE)
+    text = _PAGE_COMMENT_LINE_RE.sub('', text)
     text = _PARSED_TEXT_PAGE_RE.sub('', text)
     return text
 
@@ -95,12 +104,22 @@ def remove_invisible_chars(text: str) -> str:
     return ''.join(out)
 
 
-def detect_repeated_lines(lines: list[str], threshold: int = 2) -> set[str]:
+def _repeated_line_keys(lines: list[str]) -> list[str]:
     """
-    Detect lines that appear repeatedly (likely headers/footers).
+    Stripped, lowercased key per line ('' for lines too short to repeat).
+
+    Only lines of 50+ chars qualify, so lower() is skipped on the rest.
+    lower() only ever lengthens a line through U+0130 (İ -> i̇).
     """
-    normalized = [line.strip().lower() for line in lines if line.strip()]
-    counter = Counter(normalized)
+    return [
+        stripped.lower() if len(stripped) >= 50 or '\u0130' in stripped else ''
+        for stripped in map(str.strip, lines)
+    ]
+
+
+def _repeated_keys(keys: list[str], threshold: int) -> set[str]:
+    """Keys of 50+ chars that occur at least ``threshold`` times."""
+    counter = Counter(keys)
 
     repeated: set[str] = set()
     for line, count in counter.items():
@@ -110,15 +129,16 @@ def detect_repeated_lines(lines: list[str], threshold: int = 2) -> set[str]:
     return repeated
 
 
-def remove_footer_header_logs(text: str) -> str:
+def detect_repeated_lines(lines: list[str], threshold: int = 2) -> set[str]:
     """
-    Remove footer/header/system log lines.
-    Pattern: kcb_...dd/mm/yyyy...hh : mm : ss (with optional spaces around colons/slashes)
+    Detect lines that appear repeatedly (likely headers/footers).
     """
-    lines = text.split('\n')
-    cleaned_lines: list[str] = []
+    return _repeated_keys(_repeated_line_keys(lines), threshold)
+
 
-    footer_patterns = [
+_FOOTER_PATTERNS = [
+    re.compile(pat, re.IGNORECASE)
+    for pat in (
         # kcb_ with date (spaces allowed around separators)
         r'kcb[_.].*\d{1,2}\s*/\s*\d{1,2}\s*/\s*\d{4}',
         # kcb_ with time (spaces allowed around colons)
@@ -128,12 +148,22 @@ def remove_footer_header_logs(text: str) -> str:
         r'<PARSED TEXT',
         r'\[Page\s*\d+\]',
         r'---Page Break---',
-    ]
+    )
+]
+
+
+def remove_footer_header_logs(text: str) -> str:
+    """
+    Remove footer/header/system log lines.
+    Pattern: kcb_...dd/mm/yyyy...hh : mm : ss (with optional spaces around colons/slashes)
+    """
+    lines = text.split('\n')
+    cleaned_lines: list[str] = []
 
     for line in lines:
         is_footer = False
-        for pat in footer_patterns:
-            if re.search(pat, line, re.IGNORECASE):
+        for pat in _FOOTER_PATTERNS:
+            if pat.search(line):
                 is_footer = True
                 break
         if not is_footer:
@@ -142,18 +172,27 @@ def remove_footer_header_logs(text: str) -> str:
     return '\n'.join(cleaned_lines)
 
 
+# ![...](...) where path ends with image extension (with optional space before ext)
+_IMAGE_LINK_RE = re.compile(
+    r'!\[[^\]]*\]\([^)]*\.\s*(?:jpe?g|png|gif|bmp)\s*\)',
+    re.IGNORECASE,
+)
+
+
 def remove_image_links(text: str) -> str:
     """
     Remove local image links like ![](*.jpeg), including '![](...  . jpeg)' with space.
     """
-    # Pattern: ![...](...) where path ends with image extension (with optional space before ext)
-    pattern = r'!\[[^\]]*\]\([^)]*\.\s*(?:jpe?g|png|gif|bmp)\s*\)'
-    text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+    text = _IMAGE_LINK_RE.sub('', text)
     # Clean up leftover blank lines
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _BLANK_LINE_RUN_RE.sub('\n\n', text)
     return text
 
 
+# 50+ of dash/em-dash/underscore/equals/tilde
+_LONG_SEPARATOR_RE = re.compile(r'^[-—_=~]{50,}$')
+
+
 def remove_long_separators(text: str) -> str:
     """
     Remove separator lines of dashes/em-dashes >= 50 chars.
@@ -162,13 +201,23 @@ def remove_long_separators(text: str) -> str:
     cleaned: list[str] = []
     for line in lines:
         stripped = line.strip()
-        # Match 50+ of dash/em-dash/underscore/equals/tilde
-        if re.match(r'^[-—_=~]{50,}$', stripped):
+        if _LONG_SEPARATOR_RE.match(stripped):
             continue
         cleaned.append(line)
     return '\n'.join(cleaned)
 
 
+_VALID_CHAR_RE = re.compile(
+    r'[a-zA-ZÀ-ỹ0-9\s\.\,\;\:\!\?\-\(\)\[\]\{\}\|'
+    r'\+\=\*\/\#\@\%\&\"\'\`\~\<\>]'
+)
+
+_GIBBERISH_EXACT = [
+    re.compile(r'deo da la la companya', re.IGNORECASE),
+    re.compile(r'([^\s])\1{10,}'),  # same char repeated 10+ times
+]
+
+
 def remove_gibberish_lines(text: str) -> str:
     """
     Remove gibberish lines with extreme token/bigram repetition.
@@ -182,16 +231,6 @@ def remove_gibberish_lines(text: str) -> str:
     lines = text.split('\n')
     cleaned_lines: list[str] = []
 
-    valid_pattern = re.compile(
-        r'[a-zA-ZÀ-ỹ0-9\s\.\,\;\:\!\?\-\(\)\[\]\{\}\|'
-        r'\+\=\*\/\#\@\%\&\"\'\`\~\<\>]'
-    )
-
-    gibberish_exact = [
-        re.compile(r'deo da la la companya', re.IGNORECASE),
-        re.compile(r'([^\s])\1{10,}'),  # same char repeated 10+ times
-    ]
-
     for line in lines:
         stripped = line.strip()
         if not stripped:
@@ -227,14 +266,14 @@ def remove_gibberish_lines(text: str) -> str:
 
         # Rule 4: Low valid-char ratio on long lines
         if len(stripped) > 120:
-            valid_chars = len(valid_pattern.findall(stripped))
+            valid_chars = len(_VALID_CHAR_RE.findall(stripped))
             ratio = valid_chars / len(stripped) if stripped else 1.0
             if ratio < 0.6:
                 continue
 
             # Exact gibberish patterns
             is_gib = False
-            for pat in gibberish_exact:
+            for pat in _GIBBERISH_EXACT:
                 if pat.search(stripped):
                     is_gib = True
                     break
@@ -246,31 +285,28 @@ def remove_gibberish_lines(text: str) -> str:
     return '\n'.join(cleaned_lines)
 
 
+# Page-artifact line, matched once against each stripped line. Divider
+# lines stop at 49 chars; longer ones are handled by remove_long_separators.
+_PAGE_ARTIFACT_RE = re.compile(
+    r'^(?:[\d\-–—]+$'                       # standalone page numbers
+    r'|(?i:Page|Trang|p\.?|tr\.?)\s*\d+'    # page indicators
+    r'|[\-_=~]{3,49}$)'                     # short divider lines
+)
+
+
 def remove_page_artifacts(text: str) -> str:
     """
     Remove common page artifacts like page numbers, running headers.
     """
-    lines = text.split('\n')
-    cleaned_lines: list[str] = []
-
-    for line in lines:
-        stripped = line.strip()
-
-        # Standalone page numbers
-        if re.match(r'^[\d\-–—]+$', stripped):
-            continue
-
-        # Page indicators
-        if re.match(r'^(Page|Trang|p\.?|tr\.?)\s*\d+', stripped, re.IGNORECASE):
-            continue
+    cleaned_lines = [
+        line for line in text.split('\n')
+        if not _PAGE_ARTIFACT_RE.match(line.strip())
+    ]
 
-        # Divider lines (short ones - long ones handled by remove_long_separators)
-        if re.match(r'^[\-_=~]{3,49}$', stripped):
-            continue
+    return '\n'.join(cleaned_lines)
 
-        cleaned_lines.append(line)
 
-    return '\n'.join(cleaned_lines)
+_INLINE_SPACE_RUN_RE = re.compile(r'[ \t]{2,}')
 
 
 def normalize_whitespace(text: str) -> str:
@@ -287,19 +323,31 @@ def normalize_whitespace(text: str) -> str:
     for line in lines:
         # Trim trailing whitespace on every line
         line = line.rstrip()
-        # Collapse interior spaces only for non-table lines
-        if not line.lstrip().startswith('|'):
-            line = re.sub(r'[ \t]{2,}', ' ', line)
+        # Collapse interior spaces only for non-table lines; most lines
+        # have no run at all, so skip the regex call for them
+        if (('  ' in line or '\t' in line)
+                and not line.lstrip().startswith('|')):
+            line = _INLINE_SPACE_RUN_RE.sub(' ', line)
         cleaned.append(line)
-    text = '\n'.join(cleaned)
-    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    # rstrip() already dropped every '\r' that preceded a '\n', so only
+    # lone CRs are left to turn into line breaks
+    text = '\n'.join(cleaned).replace('\r', '\n')
     # Collapse 3+ newlines → 2 (keep max one blank line)
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    # Strip leading blank lines
-    text = text.lstrip('\n')
+    text = _BLANK_LINE_RUN_RE.sub('\n\n', text)
+    # Strip leading blank lines (and trailing whitespace)
     return text.strip()
 
 
+# Heading, bullet or numbered line; alternatives are tried in that order,
+# so one match per line replaces three sequential ones
+_MARKDOWN_LINE_RE = re.compile(
+    r'^(?:(#{1,6})\s*\*{0,2}(.+?)\*{0,2}\s*'   # heading: level, text
+    r'|(\s*)[-*•]\s+(.*)'                      # bullet: indent, text
+    r'|(\s*)(\d+)[.)]\s+(.*))$'                # numbered: indent, number, text
+)
+_BOLD_MARKS_RE = re.compile(r'\*{1,2}')
+
+
 def preserve_markdown_structure(text: str) -> str:
     """
     Ensure markdown structure (headings, lists) is preserved.
@@ -308,30 +356,25 @@ def preserve_markdown_structure(text: str) -> str:
     cleaned_lines: list[str] = []
 
     for line in lines:
+        match = _MARKDOWN_LINE_RE.match(line)
+        if match is None:
+            cleaned_lines.append(line)
+            continue
+
+        level, heading, indent, item, num_indent, num, num_item = match.groups()
+
         # Headings
-        heading_match = re.match(r'^(#{1,6})\s*\*{0,2}(.+?)\*{0,2}\s*$', line)
-        if heading_match:
-            level = heading_match.group(1)
-            content = re.sub(r'\*{1,2}', '', heading_match.group(2)).strip()
+        if level is not None:
+            content = _BOLD_MARKS_RE.sub('', heading).strip()
             cleaned_lines.append(f"{level} {content}")
-            continue
 
         # Bullet lists
-        list_match = re.match(r'^(\s*)[-*•]\s+(.*)$', line)
-        if list_match:
-            indent = list_match.group(1)
-            content = list_match.group(2)
-            cleaned_lines.append(f"{indent}- {content}")
-            continue
+        elif indent is not None:
+            cleaned_lines.append(f"{indent}- {item}")
 
         # Numbered lists
-        num_match = re.match(r'^(\s*)(\d+)[.)]\s+(.*)$', line)
-        if num_match:
-            indent, num, content = num_match.groups()
-            cleaned_lines.append(f"{indent}{num}. {content}")
-            continue
-
-        cleaned_lines.append(line)
+        else:
+            cleaned_lines.append(f"{num_indent}{num}. {num_item}")
 
     return '\n'.join(cleaned_lines)
 
@@ -341,35 +384,38 @@ def remove_repeated_headers_footers(text: str) -> str:
     Remove repeated headers/footers detected across pages.
     """
     lines = text.split('\n')
-    repeated = detect_repeated_lines(lines)
+    # Normalize each line once and reuse the keys for the filter below
+    keys = _repeated_line_keys(lines)
+    repeated = _repeated_keys(keys, 2)
 
     if not repeated:
         return text
 
-    cleaned_lines: list[str] = []
-    for line in lines:
-        norm = line.strip().lower()
-        if norm not in repeated or line.strip().startswith('#'):
-            cleaned_lines.append(line)
+    cleaned_lines = [
+        line for line, key in zip(lines, keys)
+        if key not in repeated or line.lstrip().startswith('#')
+    ]
 
     return '\n'.join(cleaned_lines)
 
 
+_OCR_REPLACEMENTS: list[tuple[re.Pattern[str], str]] = [
+    # Double spaces after punctuation
+    (re.compile(r'([.!?])\s{2,}'), r'\1 '),
+
+    # Space before punctuation (possessive: a shorter run can never be
+    # followed by the punctuation, so don't backtrack through it)
+    (re.compile(r'\s++([.!?,;:])'), r'\1'),
+]
+
+
 def clean_ocr_artifacts(text: str) -> str:
     """
     Clean common OCR artifacts from the text.
     SAFE version: no unpacking error.
     """
-    replacements: list[tuple[str, str, int]] = [
-        # Double spaces after punctuation
-        (r'([.!?])\s{2,}', r'\1 ', 0),
-
-        # Space before punctuation
-        (r'\s+([.!?,;:])', r'\1', 0),
-    ]
-
-    for pattern, replacement, flags in replacements:
-        text = re.sub(pattern, replacement, text, flags=flags)
+    for pattern, replacement in _OCR_REPLACEMENTS:
+        text = pattern.sub(replacement, text)
 
     return text
 
@@ -394,7 +440,7 @@ def clean_text_basic(text: str) -> str:
     lines = text.split('\n')
     lines = [line.rstrip() for line in lines]
     text = '\n'.join(lines)
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _BLANK_LINE_RUN_RE.sub('\n\n', text)
     text = text.lstrip('\n')
     return text.strip()
 
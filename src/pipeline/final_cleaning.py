@@ -20,11 +20,17 @@ Author: Research Assistant
 Date: January 2026
 """
 
-import re
+import string
 from typing import Any
 
+from pipeline._regex import Pattern, engine
 from pipeline.cleaning_v1 import remove_page_markers, remove_invisible_chars
 
+# Regex engine used for the module-level patterns below
+# (FINAL_CLEANING_REGEX_ENGINE=regex to A/B the third-party `regex` module)
+_re = engine("FINAL_CLEANING_REGEX_ENGINE")
+FINAL_CLEANING_REGEX_ENGINE = _re.__name__
+
 
 # Vietnamese character set for word boundary detection
 VIETNAMESE_CHARS = (
@@ -50,6 +56,25 @@ TABLE_CAPTION_KEYWORDS = [
     'Bảng', 'Table', 'Liều', 'Dự phòng', 'Hình', 'Figure', 
     'Điều trị', 'Phác đồ', 'Công thức', 'Thành phần'
 ]
+_TABLE_CAPTION_KEYWORDS_LOWER = [kw.lower() for kw in TABLE_CAPTION_KEYWORDS]
+
+_TABLE_CAPTION_RE = _re.compile(
+    r'(' + '|'.join(TABLE_CAPTION_KEYWORDS) + r')\s*[\d.:]+',
+    _re.IGNORECASE
+)
+
+# 3+ consecutive newlines, collapsed to one blank line
+_BLANK_LINE_RUN_RE = _re.compile(r'\n{3,}')
+
+_NUMBERED_ITEM_RE = _re.compile(r'^\s*\d+\.')
+
+# First-character tests for fix_vietnamese_line_breaks: WORD_CHARS and the
+# lowercase Vietnamese alphabet as sets, so a line start is one lookup
+_WORD_START_CHARS = frozenset(string.ascii_letters + VIETNAMESE_CHARS)
+_LOWERCASE_START_CHARS = frozenset(
+    string.ascii_lowercase
+    + 'àáảãạăắằẳẵặâấầẩẫậèéẻẽẹêếềểễệìíỉĩịòóỏõọôốồổỗộơờớởỡợùúủũụưứừửữựỳýỷỹỵđ'
+)
 
 
 def fix_vietnamese_line_breaks(text: str) -> str:
@@ -59,76 +84,77 @@ def fix_vietnamese_line_breaks(text: str) -> str:
     Handles patterns like "thậ-\n n" -> "thận"
     """
     lines = text.split('\n')
+    line_count = len(lines)
+    # Empty lines are dropped from the output
     fixed_lines: list[str] = []
     i = 0
     
-    while i < len(lines):
+    while i < line_count:
         current_line = lines[i]
+        stripped = current_line.strip()
+        i += 1
         
         # Skip empty lines, headings, and list items
-        if (not current_line.strip() or 
-            current_line.strip().startswith('#') or
-            current_line.strip().startswith('-') or
-            re.match(r'^\s*\d+\.', current_line)):
-            fixed_lines.append(current_line)
-            i += 1
+        if (not stripped or
+            stripped[0] in '#-' or
+            _NUMBERED_ITEM_RE.match(current_line)):
+            if current_line:
+                fixed_lines.append(current_line)
             continue
         
-        # Check if line ends with a hyphen (explicit word break)
-        if current_line.rstrip().endswith('-') and i + 1 < len(lines):
-            next_line = lines[i + 1].strip()
-            if next_line and re.match(WORD_CHARS, next_line):
-                # Remove hyphen and join with next line
-                current_line = current_line.rstrip()[:-1] + next_line
-                lines[i + 1] = ''  # Mark next line as consumed
-        
-        # Check if line ends mid-word (lowercase letter) and next line starts with lowercase
-        elif (i + 1 < len(lines) and 
-              current_line.strip() and 
-              not current_line.strip().endswith(('.', '!', '?', ':', ';', ','))):
-            next_line = lines[i + 1].strip()
-            # If next line starts with lowercase, might be continuation
-            if (next_line and 
-                re.match(r'^[a-zàáảãạăắằẳẵặâấầẩẫậèéẻẽẹêếềểễệìíỉĩịòóỏõọôốồổỗộơờớởỡợùúủũụưứừửữựỳýỷỹỵđ]', next_line) and
-                not next_line.startswith('-')):
-                # Join lines with space
-                current_line = current_line.rstrip() + ' ' + next_line
-                lines[i + 1] = ''  # Mark next line as consumed
+        if i < line_count:
+            # Check if line ends with a hyphen (explicit word break)
+            if stripped.endswith('-'):
+                next_line = lines[i].strip()
+                if next_line and next_line[0] in _WORD_START_CHARS:
+                    # Remove hyphen and join with next line
+                    current_line = current_line.rstrip()[:-1] + next_line
+                    i += 1  # Next line consumed
+            
+            # Check if line ends mid-word (lowercase letter) and next line starts with lowercase
+            elif not stripped.endswith(('.', '!', '?', ':', ';', ',')):
+                next_line = lines[i].strip()
+                # If next line starts with lowercase, might be continuation
+                if next_line and next_line[0] in _LOWERCASE_START_CHARS:
+                    # Join lines with space
+                    current_line = current_line.rstrip() + ' ' + next_line
+                    i += 1  # Next line consumed
         
         fixed_lines.append(current_line)
-        i += 1
-    
-    # Remove empty lines that were consumed
-    result_lines: list[str] = [line for line in fixed_lines if line]
     
-    return '\n'.join(result_lines)
+    return '\n'.join(fixed_lines)
+
+
+_OCR_FIXES: list[tuple[Pattern, str]] = [
+    # Zero/O confusion (only in obvious contexts)
+    (_re.compile(r'\b0(?=[a-zA-Z])'), 'O'),  # 0ption -> Option
+    (_re.compile(r'(?<=[a-zA-Z])0\b'), 'o'),  # Hell0 -> Hello
+
+    # Common spacing issues after punctuation
+    (_re.compile(r'\.(?=[A-ZÀÁẢÃẠĂẮẰẲẴẶÂẦẤẨ_ẬĐÈÉẺẼẸÊẾỀỂỄỆÌÍỈĨỊÒÓỎÕỌÔỐỒỔỖỘƠỚỜỞỠỢÙÚỦŨỤƯỨỪỬỮỰỲÝỶỸỴ])'), '. '),
+    (_re.compile(r',(?=[A-Za-zÀ-ỹ])'), ', '),
+
+    # Fix common Vietnamese word errors (non-semantic)
+    (_re.compile(r'\bVIỆT\s+NAM\b'), 'VIỆT NAM'),
+    (_re.compile(r'\bViệt\s+Nam\b'), 'Việt Nam'),
+    (_re.compile(r'\bviet\s+nam\b', _re.IGNORECASE), 'việt nam'),
+]
 
 
 def fix_vietnamese_ocr_errors(text: str) -> str:
     """
     Fix common Vietnamese OCR errors without changing meaning.
     """
-    ocr_fixes: list[tuple[str, str, int]] = [
-        # Zero/O confusion (only in obvious contexts)
-        (r'\b0(?=[a-zA-Z])', 'O', 0),  # 0ption -> Option
-        (r'(?<=[a-zA-Z])0\b', 'o', 0),  # Hell0 -> Hello
-        
-        # Common spacing issues after punctuation
-        (r'\.(?=[A-ZÀÁẢÃẠĂẮẰẲẴẶÂẦẤẨ_ẬĐÈÉẺẼẸÊẾỀỂỄỆÌÍỈĨỊÒÓỎÕỌÔỐỒỔỖỘƠỚỜỞỠỢÙÚỦŨỤƯỨỪỬỮỰỲÝỶỸỴ])', '. ', 0),
-        (r',(?=[A-Za-zÀ-ỹ])', ', ', 0),
-        
-        # Fix common Vietnamese word errors (non-semantic)
-        (r'\bVIỆT\s+NAM\b', 'VIỆT NAM', 0),
-        (r'\bViệt\s+Nam\b', 'Việt Nam', 0),
-        (r'\bviet\s+nam\b', 'việt nam', re.IGNORECASE),
-    ]
-    
-    for pattern, replacement, flags in ocr_fixes:
-        text = re.sub(pattern, replacement, text, flags=flags)
+    for pattern, replacement in _OCR_FIXES:
+        text = pattern.sub(replacement, text)
     
     return text
 
 
+_HEADING_DASH_RE = _re.compile(r'^(#{1,6})\s*-\s+(.*)$')
+_HEADING_RE = _re.compile(r'^#{1,6}\s+')
+
+
 def normalize_headings(text: str) -> str:
     """
     Normalize heading format:
@@ -143,12 +169,12 @@ def normalize_headings(text: str) -> str:
         stripped = line.strip()
 
         # Fix "## - text" and "#### - text" patterns
-        match_hdr_dash = re.match(r'^(#{1,6})\s*-\s+(.*)$', stripped)
+        match_hdr_dash = _HEADING_DASH_RE.match(stripped)
         if match_hdr_dash:
             line = f"{match_hdr_dash.group(1)} {match_hdr_dash.group(2)}"
 
         # Ensure blank line before heading (if previous line is not empty and not start of doc)
-        if re.match(r'^#{1,6}\s+', line.strip()):
+        if _HEADING_RE.match(line.strip()):
             if normalized and normalized[-1].strip():
                 normalized.append('')
 
@@ -157,6 +183,11 @@ def normalize_headings(text: str) -> str:
     return '\n'.join(normalized)
 
 
+_MIDLINE_SUB_BULLET_RE = _re.compile(r'\.\s*- \+\s*')
+_SUB_BULLET_RE = _re.compile(r'^(\s*)- \+\s*', _re.MULTILINE)
+_BARE_DASH_BULLET_RE = _re.compile(r'^(\s*)-([^\s\-])', _re.MULTILINE)
+
+
 def normalize_bullets(text: str) -> str:
     """
     Normalize bullet format:
@@ -165,14 +196,17 @@ def normalize_bullets(text: str) -> str:
     - Ensure space after bare dash bullet
     """
     # Fix '- +' mid-line: split to new line before normalizing
-    text = re.sub(r'\.\s*- \+\s*', '.\n  - ', text)
+    text = _MIDLINE_SUB_BULLET_RE.sub('.\n  - ', text)
     # Fix '- +' at start of line → sub-item "  - "
-    text = re.sub(r'^(\s*)- \+\s*', r'\1  - ', text, flags=re.MULTILINE)
+    text = _SUB_BULLET_RE.sub(r'\1  - ', text)
     # Ensure space after bare dash bullet
-    text = re.sub(r'^(\s*)-([^\s\-])', r'\1- \2', text, flags=re.MULTILINE)
+    text = _BARE_DASH_BULLET_RE.sub(r'\1- \2', text)
     return text
 
 
+_BR_TAG_RE = _re.compile(r'<br\s*/?>', _re.IGNORECASE)
+
+
 def replace_br_in_tables(text: str) -> str:
     """
     Replace <br> / <br/> with space inside table rows.
@@ -183,49 +217,56 @@ def replace_br_in_tables(text: str) -> str:
         if '<br' in line.lower():
             if '|' in line:
                 # Inside table row: replace with space
-                line = re.sub(r'<br\s*/?>', ' ', line, flags=re.IGNORECASE)
+                line = _BR_TAG_RE.sub(' ', line)
             else:
                 # Outside table: replace with newline
-                line = re.sub(r'<br\s*/?>', '\n', line, flags=re.IGNORECASE)
+                line = _BR_TAG_RE.sub('\n', line)
         result.append(line)
     return '\n'.join(result)
 
 
+_ELLIPSIS_RE = _re.compile(r'\.{3,}')
+_REPEATED_PUNCT_RE = _re.compile(r'([.!?])\1+')
+
+
 def normalize_vietnamese_punctuation(text: str) -> str:
     """
     Normalize Vietnamese punctuation marks.
     """
-    # Normalize quotes
-    text = re.sub(r'["""]', '"', text)
-    text = re.sub(r"[''']", "'", text)
-    
-    # Normalize dashes
-    text = re.sub(r'[–—]', '-', text)
+    # Normalize dashes (plain replaces: no regex entry, and far faster than
+    # str.translate on non-ASCII text)
+    text = text.replace('–', '-').replace('—', '-')
     
     # Normalize ellipsis
-    text = re.sub(r'\.{3,}', '...', text)
+    text = _ELLIPSIS_RE.sub('...', text)
     
     # Fix multiple punctuation
-    text = re.sub(r'([.!?])\1+', r'\1', text)
+    text = _REPEATED_PUNCT_RE.sub(r'\1', text)
     
     return text
 
 
+_SPACE_RUN_RE = _re.compile(r' {2,}')
+# Possessive: a shorter whitespace run can never be followed by the punctuation
+_SPACE_BEFORE_PUNCT_RE = _re.compile(r'\s++([.,!?;:])')
+_MISSING_SPACE_AFTER_PUNCT_RE = _re.compile(r'([.,!?;:])(?=[A-Za-zÀ-ỹ0-9])')
+
+
 def clean_redundant_whitespace(text: str) -> str:
     """
     Final pass to clean any remaining whitespace issues.
     """
     # Multiple spaces to single
-    text = re.sub(r' {2,}', ' ', text)
+    text = _SPACE_RUN_RE.sub(' ', text)
     
     # Space before punctuation
-    text = re.sub(r'\s+([.,!?;:])', r'\1', text)
+    text = _SPACE_BEFORE_PUNCT_RE.sub(r'\1', text)
     
     # Ensure space after punctuation (except at end of line)
-    text = re.sub(r'([.,!?;:])(?=[A-Za-zÀ-ỹ0-9])', r'\1 ', text)
+    text = _MISSING_SPACE_AFTER_PUNCT_RE.sub(r'\1 ', text)
     
     # Multiple newlines to double
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _BLANK_LINE_RUN_RE.sub('\n\n', text)
     
     return text.strip()
 
@@ -242,7 +283,7 @@ def sanitize_residual_artifacts(text: str) -> str:
     text = remove_page_markers(text)
     text = remove_invisible_chars(text)
     # Collapse any newly-created blank-line runs
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _BLANK_LINE_RUN_RE.sub('\n\n', text)
     return text.strip()
 
 
@@ -260,21 +301,17 @@ def _find_caption_near(lines: list[str], table_start: int) -> str:
     Find caption near a table (1-2 lines before table start).
     Returns caption text or empty string.
     """
-    caption_pattern = re.compile(
-        r'(' + '|'.join(TABLE_CAPTION_KEYWORDS) + r')\s*[\d.:]+',
-        re.IGNORECASE
-    )
-    
     # Check lines before table start
     for offset in range(1, min(3, table_start + 1)):
         idx = table_start - offset
         if idx >= 0:
             line = lines[idx].strip()
-            if caption_pattern.search(line):
+            if _TABLE_CAPTION_RE.search(line):
                 return line
             # Also check for lines that just contain caption keywords
-            for kw in TABLE_CAPTION_KEYWORDS:
-                if kw.lower() in line.lower() and len(line) < 100:
+            if len(line) < 100:
+                line_lower = line.lower()
+                if any(kw in line_lower for kw in _TABLE_CAPTION_KEYWORDS_LOWER):
                     return line
     
     return ""
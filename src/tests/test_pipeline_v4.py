@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pipeline v4 changes:
+    A) result cache — a cache hit still writes the exports (steps 9-11)
+    B) find_pdf_file — exact name wins over the case-insensitive index
+    C) KeywordTrie — same keyword counts as the old re.findall(r'\\b..\\b') path
+    D) remove_exact_duplicates — keep-longer rule and the threshold switch
+    E) short-text early exit — stale exports removed, cache key computed lazily
+    F) export_file — comma-separated formats, --force and the mtime skip
+    G) Marker — conversion cache hit/miss and run_marker_batch_to_json
+    H) iter_chunks — same nodes as chunking the whole document at once
+
+Run:
+    cd src && python -m pytest tests/test_pipeline_v4.py -v
+"""
+
+import os
+import re
+import sys
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# Ensure src/ is on the path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import export_text
+import main_pipeline
+import marker
+from pipeline import audit_nodes, auto_tagging
+from pipeline.chunking import chunk_section, chunk_to_nodes, extract_sections, iter_chunks
+from pipeline.audit_nodes import remove_duplicates, remove_exact_duplicates
+from pipeline.auto_tagging import (
+    DOMAIN_DEFINITIONS,
+    TAG_DEFINITIONS,
+    KeywordTrie,
+    count_keyword_matches,
+    count_tag_and_domain_matches,
+    normalize_text,
+)
+
+
+@pytest.fixture
+def pipeline_dirs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point every main_pipeline input/output directory into *tmp_path*."""
+    for name, sub in [
+        ("RAW_DIR", "raw"),
+        ("PROCESSED_DIR", "processed"),
+        ("STANDARD_DIR", "processed/standard"),
+        ("TEMP_DIR", "temp"),
+        ("PIPELINE_CACHE_DIR", "processed/pipeline_cache"),
+        ("CLEANED_FINAL_DIR", "cleaned_final"),
+        ("EXPORT_DIR", "exported"),
+    ]:
+        monkeypatch.setattr(main_pipeline, name, tmp_path / sub)
+    main_pipeline.ensure_directories()
+    return tmp_path
+
+
+# ===================== A) RESULT CACHE =====================
+
+DEFAULT_CONFIG = (150, 400, 0.85, "cpu", 0, False, False, False)
+
+
+def _store_cached_output(tmp_path: Path, doc_id: str) -> dict[str, Any]:
+    pdf_path = tmp_path / "raw" / f"{doc_id}.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 test")
+    output: dict[str, Any] = {
+        "doc_id": doc_id,
+        "nodes": [
+            {
+                "id": f"{doc_id}_node_0000",
+                "content": "Bệnh cúm mùa do virus cúm gây ra.",
+                "section": "I. ĐẠI CƯƠNG",
+                "metadata": {"tags": []},
+                "page_start": 2,
+                "page_end": 2,
+            },
+        ],
+        "processing_info": {
+            "source_file": f"{doc_id}.pdf",
+            "processed_at": "2000-01-01T00:00:00",
+            "pipeline_version": main_pipeline.PIPELINE_VERSION,
+        },
+    }
+    key = main_pipeline.pipeline_cache_key(pdf_path, DEFAULT_CONFIG)
+    cache_path = main_pipeline.PIPELINE_CACHE_DIR / f"{doc_id}_{key}_lightrag.json"
+    main_pipeline._store_cached_output(cache_path, output)
+    return output
+
+
+class TestPipelineCacheHit:
+    def test_cache_hit_writes_exports(self, pipeline_dirs: Path):
+        cached = _store_cached_output(pipeline_dirs, "doc")
+
+        result = main_pipeline.run_full_pipeline("doc.pdf", auto_chunk_pages=0)
+
+        assert result["nodes"] == cached["nodes"]
+        assert (pipeline_dirs / "exported" / "doc_plain.txt").exists()
+        assert (pipeline_dirs / "processed" / "doc_node_0000.json").exists()
+        assert (pipeline_dirs / "cleaned_final" / "doc_doc_node_0000.json").exists()
+        assert (pipeline_dirs / "cleaned_final" / "doc_final.json").exists()
+
+    def test_cache_hit_recreates_deleted_exports(self, pipeline_dirs: Path):
+        _store_cached_output(pipeline_dirs, "doc")
+        main_pipeline.run_full_pipeline("doc.pdf", auto_chunk_pages=0)
+
+        plain = pipeline_dirs / "exported" / "doc_plain.txt"
+        plain.unlink()
+        main_pipeline.run_full_pipeline("doc.pdf", auto_chunk_pages=0)
+        assert plain.exists()
+
+    def test_cache_hit_refreshes_processed_at(self, pipeline_dirs: Path):
+        _store_cached_output(pipeline_dirs, "doc")
+        result = main_pipeline.run_full_pipeline("doc.pdf", auto_chunk_pages=0)
+        assert result["processing_info"]["processed_at"] != "2000-01-01T00:00:00"
+
+    def test_cache_key_depends_on_config(self, pipeline_dirs: Path):
+        pdf_path = pipeline_dirs / "raw" / "doc.pdf"
+        pdf_path.write_bytes(b"%PDF-1.4 test")
+        other_config = (200,) + DEFAULT_CONFIG[1:]
+        assert (main_pipeline.pipeline_cache_key(pdf_path, DEFAULT_CONFIG)
+                != main_pipeline.pipeline_cache_key(pdf_path, other_config))
+
+
+# ===================== B) FIND PDF FILE =====================
+
+class TestFindPdfFile:
+    def test_exact_name_preferred(self, pipeline_dirs: Path):
+        raw = pipeline_dirs / "raw"
+        (raw / "Doc.pdf").write_bytes(b"upper")
+        (raw / "doc.pdf").write_bytes(b"lower")
+
+        assert main_pipeline.find_pdf_file("doc.pdf") == raw / "doc.pdf"
+        assert main_pipeline.find_pdf_file("Doc.pdf") == raw / "Doc.pdf"
+
+    def test_extension_added(self, pipeline_dirs: Path):
+        raw = pipeline_dirs / "raw"
+        (raw / "doc.pdf").write_bytes(b"lower")
+        assert main_pipeline.find_pdf_file("doc") == raw / "doc.pdf"
+
+    def test_case_insensitive_fallback(self, pipeline_dirs: Path):
+        raw = pipeline_dirs / "raw"
+        (raw / "Doc.pdf").write_bytes(b"upper")
+        assert main_pipeline.find_pdf_file("DOC.pdf") == raw / "Doc.pdf"
+
+    def test_missing_file(self, pipeline_dirs: Path):
+        assert main_pipeline.find_pdf_file("missing.pdf") is None
+
+    def test_new_file_found(self, pipeline_dirs: Path):
+        raw = pipeline_dirs / "raw"
+        assert main_pipeline.find_pdf_file("DOC.pdf") is None
+        (raw / "Doc.pdf").write_bytes(b"upper")
+        assert main_pipeline.find_pdf_file("DOC.pdf") == raw / "Doc.pdf"
+
+    def test_list_keeps_case_variants(self, pipeline_dirs: Path):
+        raw = pipeline_dirs / "raw"
+        (raw / "Doc.pdf").write_bytes(b"upper")
+        (raw / "doc.pdf").write_bytes(b"lower")
+        assert sorted(main_pipeline.list_available_pdfs()) == ["Doc.pdf", "doc.pdf"]
+
+
+# ===================== C) KEYWORD TRIE =====================
+
+def _findall_counts(definitions: dict[str, list[str]], text: str) -> dict[str, int]:
+    """Reference: the per-keyword re.findall loop the automaton replaced."""
+    return {
+        category: sum(
+            len(re.findall(r'\b' + re.escape(keyword.lower()) + r'\b', text))
+            for keyword in keywords
+        )
+        for category, keywords in definitions.items()
+    }
+
+
+SAMPLE_TEXTS = [
+    "Bệnh cúm mùa do virus cúm gây ra. Điều trị bằng thuốc kháng virus, "
+    "chẩn đoán dựa trên xét nghiệm và triệu chứng lâm sàng.",
+    "Phòng bệnh: tiêm vắc xin hằng năm; vệ sinh cá nhân, rửa tay thường xuyên.",
+    "Nghiên cứu phương pháp học máy (machine learning) trên dữ liệu y tế.",
+    "",
+]
+
+
+@pytest.fixture
+def pure_python_trie(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Build keyword automata with KeywordTrie even if pyahocorasick is installed."""
+    monkeypatch.setattr(auto_tagging, "ahocorasick", None)
+    monkeypatch.setattr(auto_tagging, "_KEYWORD_AUTOMATA", {})
+
+
+class TestKeywordTrie:
+    def test_overlapping_hits(self):
+        trie = KeywordTrie()
+        for word in ("he", "she", "his", "hers"):
+            trie.add_word(word, word)
+        trie.make_automaton()
+        assert sorted(trie.iter("ushers")) == [(3, "he"), (3, "she"), (5, "hers")]
+
+    @pytest.mark.usefixtures("pure_python_trie")
+    @pytest.mark.parametrize("text", SAMPLE_TEXTS)
+    def test_counts_match_findall(self, text: str):
+        normalized = normalize_text(text)
+        assert count_keyword_matches(TAG_DEFINITIONS, normalized) == _findall_counts(TAG_DEFINITIONS, normalized)
+        assert count_keyword_matches(DOMAIN_DEFINITIONS, normalized) == _findall_counts(DOMAIN_DEFINITIONS, normalized)
+
+    @pytest.mark.usefixtures("pure_python_trie")
+    def test_counts_match_findall_on_keyword_soup(self):
+        # Keywords glued together, repeated and cut mid-word stress the
+        # whole-word and non-overlap rules
+        keywords = [kw.lower() for kws in TAG_DEFINITIONS.values() for kw in kws]
+        pieces = keywords[::3] + [kw[:-1] for kw in keywords[::7]] + ["", "x", "_", "-"]
+        text = normalize_text(" ".join(a + b for a, b in zip(pieces, reversed(pieces))))
+        assert count_keyword_matches(TAG_DEFINITIONS, text) == _findall_counts(TAG_DEFINITIONS, text)
+
+    @pytest.mark.usefixtures("pure_python_trie")
+    @pytest.mark.parametrize("text", SAMPLE_TEXTS)
+    def test_tag_and_domain_single_pass(self, text: str):
+        content = normalize_text(text)
+        source = normalize_text("chuẩn-đoán-và-điều-trị-cúm-mùa.pdf")
+        tag_scores, domain_scores = count_tag_and_domain_matches(content, source)
+        assert tag_scores == _findall_counts(TAG_DEFINITIONS, content)
+        assert domain_scores == _findall_counts(
+            DOMAIN_DEFINITIONS, normalize_text(text + " " + "chuẩn-đoán-và-điều-trị-cúm-mùa.pdf"))
+
+
+# ===================== D) EXACT DUPLICATES =====================
+
+def _node(node_id: str, content: str) -> dict[str, Any]:
+    return {"id": node_id, "content": content}
+
+
+class TestRemoveExactDuplicates:
+    def test_longer_duplicate_kept(self):
+        nodes = [_node("a", "Bệnh cúm mùa."), _node("b", "x"), _node("c", "  bệnh CÚM   mùa!! ")]
+        assert [n["id"] for n in remove_exact_duplicates(nodes)] == ["b", "c"]
+
+    def test_shorter_duplicate_dropped(self):
+        nodes = [_node("a", "Bệnh  cúm mùa"), _node("b", "bệnh cúm mùa")]
+        assert [n["id"] for n in remove_exact_duplicates(nodes)] == ["a"]
+
+    def test_threshold_above_one_disables(self):
+        nodes = [_node("a", "cúm mùa"), _node("b", "cúm mùa")]
+        assert remove_exact_duplicates(nodes, threshold=1.01) == nodes
+        assert remove_duplicates(nodes, threshold=1.01) == nodes
+
+    def test_matches_pairwise_pass(self, monkeypatch: pytest.MonkeyPatch):
+        nodes = [_node(str(i), text) for i, text in enumerate(
+            ["cúm mùa", "virus cúm", "Cúm mùa.", "virus cúm gây bệnh", "VIRUS cúm", "cúm mùa"])]
+        with_bucket = remove_duplicates(nodes, threshold=1.0)
+        monkeypatch.setattr(audit_nodes, "remove_exact_duplicates", lambda nodes, threshold: nodes)
+        assert with_bucket == remove_duplicates(nodes, threshold=1.0)
+
+
+# ===================== E) SHORT-TEXT EARLY EXIT =====================
+
+def _fail_cache_key(*args: Any) -> str:
+    raise AssertionError("pipeline_cache_key must not be computed")
+
+
+@pytest.fixture
+def short_marker_output(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Step 1 returns fewer than MIN_USEFUL_CHARS chars (an image-only PDF)."""
+    monkeypatch.setattr(main_pipeline, "run_marker_step",
+                        lambda pdf_path, **kwargs: {"source_file": pdf_path.name, "content": "Trang 1"})
+
+
+@pytest.mark.usefixtures("short_marker_output")
+class TestShortTextExit:
+    def test_no_nodes(self, pipeline_dirs: Path):
+        (pipeline_dirs / "raw" / "doc.pdf").write_bytes(b"%PDF-1.4 scan")
+        result = main_pipeline.run_full_pipeline("doc.pdf", use_cache=False)
+        assert result["nodes"] == []
+
+    def test_stale_exports_removed(self, pipeline_dirs: Path):
+        (pipeline_dirs / "raw" / "doc.pdf").write_bytes(b"%PDF-1.4 scan")
+        stale = [
+            pipeline_dirs / "exported" / "doc_plain.txt",
+            pipeline_dirs / "processed" / "doc_node_0000.json",
+            pipeline_dirs / "processed" / "doc_node_0001.json",
+            pipeline_dirs / "cleaned_final" / "doc_doc_node_0000.json",
+            pipeline_dirs / "cleaned_final" / "doc_final.json",
+        ]
+        kept = [
+            pipeline_dirs / "processed" / "doc_node_notes.json",
+            pipeline_dirs / "processed" / "doc2_node_0000.json",
+        ]
+        for path in stale + kept:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("{}")
+
+        main_pipeline.run_full_pipeline("doc.pdf", use_cache=False)
+
+        assert not any(path.exists() for path in stale)
+        assert all(path.exists() for path in kept)
+
+    def test_no_cache_skips_cache_key(self, pipeline_dirs: Path, monkeypatch: pytest.MonkeyPatch):
+        (pipeline_dirs / "raw" / "doc.pdf").write_bytes(b"%PDF-1.4 scan")
+        monkeypatch.setattr(main_pipeline, "pipeline_cache_key", _fail_cache_key)
+        main_pipeline.run_full_pipeline("doc.pdf", use_cache=False)
+        assert not list((pipeline_dirs / "processed").glob("pipeline_cache/*"))
+
+    def test_empty_output_cached(self, pipeline_dirs: Path, monkeypatch: pytest.MonkeyPatch):
+        (pipeline_dirs / "raw" / "doc.pdf").write_bytes(b"%PDF-1.4 scan")
+        main_pipeline.run_full_pipeline("doc.pdf")
+        monkeypatch.setattr(main_pipeline, "run_marker_step", _fail_cache_key)
+        assert main_pipeline.run_full_pipeline("doc.pdf")["nodes"] == []
+
+    def test_auto_chunk_skips_cache_key(self, pipeline_dirs: Path, monkeypatch: pytest.MonkeyPatch):
+        (pipeline_dirs / "raw" / "doc.pdf").write_bytes(b"%PDF-1.4 long")
+        monkeypatch.setattr(main_pipeline, "pipeline_cache_key", _fail_cache_key)
+        monkeypatch.setattr("pipeline.export_standard.get_pdf_page_count", lambda pdf_path: 100)
+        # batch_process_chunks needs PyMuPDF at import time
+        chunked = {"nodes": [], "chunked": True}
+        monkeypatch.setitem(sys.modules, "batch_process_chunks", type(sys)("batch_process_chunks"))
+        monkeypatch.setattr(sys.modules["batch_process_chunks"], "process_pdf_chunks_internal",
+                            lambda **kwargs: chunked, raising=False)
+        assert main_pipeline.run_full_pipeline("doc.pdf", auto_chunk_pages=6) is chunked
+
+
+# ===================== F) EXPORT FILE =====================
+
+@pytest.fixture
+def lightrag_json(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A small *_lightrag.json, with EXPORT_DIR pointed into *tmp_path*."""
+    monkeypatch.setattr(export_text, "EXPORT_DIR", tmp_path / "exported")
+    json_path = tmp_path / "doc_lightrag.json"
+    json_path.write_text(json.dumps({
+        "doc_id": "doc",
+        "nodes": [
+            {"id": "doc_node_0000", "content": "Bệnh cúm mùa.", "section": "I. ĐẠI CƯƠNG",
+             "metadata": {"tags": ["cúm"]}},
+            {"id": "doc_node_0001", "content": "Điều trị bằng oseltamivir.", "section": "II. ĐIỀU TRỊ",
+             "metadata": {"tags": []}},
+        ],
+        "processing_info": {"source_file": "doc.pdf"},
+    }, ensure_ascii=False), encoding="utf-8")
+    return json_path
+
+
+def _set_mtime(path: Path, mtime_ns: int) -> None:
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class TestExportFile:
+    def test_comma_separated_formats(self, lightrag_json: Path, tmp_path: Path):
+        export_text.export_file(lightrag_json, "plain, markdown,jsonl")
+        exported = tmp_path / "exported"
+        assert sorted(p.name for p in exported.iterdir()) == [
+            "doc_plain.txt", "doc_review.md", "doc_training.jsonl"]
+
+    def test_same_output_as_single_format(self, lightrag_json: Path, tmp_path: Path):
+        exported = tmp_path / "exported"
+        export_text.export_file(lightrag_json, "plain,detailed")
+        together = {p.name: p.read_bytes() for p in exported.iterdir()}
+        for fmt in ("plain", "detailed"):
+            export_text.export_file(lightrag_json, fmt, force=True)
+        assert {p.name: p.read_bytes() for p in exported.iterdir()} == together
+
+    def test_unknown_format_reported(self, lightrag_json: Path):
+        status = export_text.export_file(lightrag_json, "plain,pdf")
+        assert status.splitlines()[1] == "Unknown format: pdf"
+
+    def test_up_to_date_skipped(self, lightrag_json: Path, tmp_path: Path):
+        export_text.export_file(lightrag_json, "plain")
+        output = tmp_path / "exported" / "doc_plain.txt"
+        output.write_text("kept")
+        _set_mtime(lightrag_json, output.stat().st_mtime_ns - 10**9)
+
+        status = export_text.export_file(lightrag_json, "plain")
+
+        assert status.startswith("- Up to date, skipped:")
+        assert output.read_text() == "kept"
+
+    def test_newer_source_rewritten(self, lightrag_json: Path, tmp_path: Path):
+        export_text.export_file(lightrag_json, "plain")
+        output = tmp_path / "exported" / "doc_plain.txt"
+        output.write_text("stale")
+        _set_mtime(lightrag_json, output.stat().st_mtime_ns + 10**9)
+
+        export_text.export_file(lightrag_json, "plain")
+
+        assert output.read_text() != "stale"
+
+    def test_force_rewrites(self, lightrag_json: Path, tmp_path: Path):
+        export_text.export_file(lightrag_json, "plain")
+        output = tmp_path / "exported" / "doc_plain.txt"
+        output.write_text("kept")
+        _set_mtime(lightrag_json, output.stat().st_mtime_ns - 10**9)
+
+        export_text.export_file(lightrag_json, "plain", force=True)
+
+        assert output.read_text() != "kept"
+
+
+# ===================== G) MARKER =====================
+
+class FakeMarker:
+    """Stands in for marker._run_marker_process: writes <stem>/<stem>.md per input."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, cmd: list[str], env: dict[str, str], timeout: int) -> tuple[int, str, str]:
+        self.calls += 1
+        source, output_dir = Path(cmd[1]), Path(cmd[cmd.index("--output_dir") + 1])
+        for pdf in (sorted(source.iterdir()) if source.is_dir() else [source]):
+            md_file = output_dir / pdf.stem / f"{pdf.stem}.md"
+            md_file.parent.mkdir(parents=True, exist_ok=True)
+            md_file.write_text(f"# {pdf.stem}\n\nNội dung.", encoding="utf-8")
+        return 0, "", ""
+
+
+@pytest.fixture
+def fake_marker(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> FakeMarker:
+    # Marker's temp output folder is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(marker, "MARKER_CACHE_DIR", tmp_path / "marker_cache")
+    fake = FakeMarker()
+    monkeypatch.setattr(marker, "_run_marker_process", fake)
+    return fake
+
+
+class TestMarkerCache:
+    def test_miss_then_hit(self, fake_marker: FakeMarker, tmp_path: Path):
+        pdf = tmp_path / "doc.pdf"
+        pdf.write_bytes(b"%PDF-1.4 doc")
+
+        first, stats = marker.run_marker_conversion(str(pdf))
+        assert stats["success"] and not stats["cache_hit"]
+        second, stats = marker.run_marker_conversion(str(pdf))
+        assert stats["success"] and stats["cache_hit"]
+
+        assert second == first
+        assert fake_marker.calls == 1
+
+    def test_hit_under_another_name(self, fake_marker: FakeMarker, tmp_path: Path):
+        (tmp_path / "doc.pdf").write_bytes(b"%PDF-1.4 doc")
+        (tmp_path / "copy.pdf").write_bytes(b"%PDF-1.4 doc")
+        marker.run_marker_conversion(str(tmp_path / "doc.pdf"))
+
+        output, stats = marker.run_marker_conversion(str(tmp_path / "copy.pdf"))
+
+        assert stats["cache_hit"]
+        assert output is not None and output["source_file"] == "copy.pdf"
+
+    def test_changed_bytes_miss(self, fake_marker: FakeMarker, tmp_path: Path):
+        pdf = tmp_path / "doc.pdf"
+        pdf.write_bytes(b"%PDF-1.4 doc")
+        marker.run_marker_conversion(str(pdf))
+        pdf.write_bytes(b"%PDF-1.4 doc, edited")
+
+        _, stats = marker.run_marker_conversion(str(pdf))
+
+        assert not stats["cache_hit"]
+        assert fake_marker.calls == 2
+
+    def test_no_cache(self, fake_marker: FakeMarker, tmp_path: Path):
+        pdf = tmp_path / "doc.pdf"
+        pdf.write_bytes(b"%PDF-1.4 doc")
+        marker.run_marker_conversion(str(pdf), use_cache=False)
+        marker.run_marker_conversion(str(pdf), use_cache=False)
+        assert fake_marker.calls == 2
+        assert not (tmp_path / "marker_cache").exists()
+
+
+class TestMarkerBatchToJson:
+    def test_one_json_per_pdf(self, fake_marker: FakeMarker, tmp_path: Path):
+        pdfs = []
+        for name in ("a.pdf", "b.pdf"):
+            (tmp_path / name).write_bytes(b"%PDF-1.4 " + name.encode())
+            pdfs.append(str(tmp_path / name))
+        processed = tmp_path / "processed"
+
+        stats = marker.run_marker_batch_to_json(pdfs, str(processed))
+
+        assert fake_marker.calls == 1
+        assert stats["success"] and stats["success_rate"] == 1.0
+        assert sorted(p.name for p in processed.iterdir()) == ["_batch_stats.json", "a.json", "b.json"]
+        a = json.loads((processed / "a.json").read_text(encoding="utf-8"))
+        assert a["source_file"] == "a.pdf" and a["content"].startswith("# a")
+
+    def test_missing_pdf_reported(self, fake_marker: FakeMarker, tmp_path: Path):
+        (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4 a")
+        missing = str(tmp_path / "missing.pdf")
+        processed = tmp_path / "processed"
+
+        stats = marker.run_marker_batch_to_json([str(tmp_path / "a.pdf"), missing], str(processed))
+
+        assert stats["failed"] == [missing]
+        assert not stats["success"] and stats["success_rate"] == 0.5
+        assert json.loads((processed / "_batch_stats.json").read_text())["failed"] == [missing]
+
+
+# ===================== H) ITER CHUNKS =====================
+
+def _chunk_document(data: dict[str, Any], min_tokens: int = 150, max_tokens: int = 400,
+                    tags: list[str] | None = None) -> list[dict[str, Any]]:
+    """Reference: chunk every section into one list, then serialize (pre-streaming path)."""
+    content = data["final_content"]
+    doc_id = re.sub(r'[^\w\-]', '_', data.get("source_file", "unknown").removesuffix(".pdf"))
+    all_nodes = []
+    current_index = 0
+    for section in extract_sections(content):
+        if not section["content"].strip():
+            continue
+        section_nodes, current_index = chunk_section(
+            section["content"], section["heading"], doc_id, current_index, min_tokens, max_tokens, tags)
+        all_nodes.extend(section_nodes)
+    if not all_nodes and content.strip():
+        all_nodes, _ = chunk_section(content, "", doc_id, 0, min_tokens, max_tokens, tags)
+    return [node.to_dict() for node in all_nodes]
+
+
+CHUNK_DOCUMENTS = [
+    "# I. ĐẠI CƯƠNG\n\n" + "Bệnh cúm mùa do virus cúm gây ra. " * 80
+    + "\n\n## 1. Dịch tễ\n\n" + "Cúm lây qua đường hô hấp. " * 30
+    + "\n\n# II. ĐIỀU TRỊ\n\n[TABLE_REMOVED: Bảng 1]\n\nDùng oseltamivir sớm.",
+    "Văn bản không có tiêu đề. " * 50,
+    "# Chỉ có tiêu đề\n\n# Tiêu đề khác\n",
+    "",
+]
+
+
+class TestIterChunks:
+    @pytest.mark.parametrize("content", CHUNK_DOCUMENTS)
+    def test_matches_chunk_document(self, content: str):
+        data = {"final_content": content, "source_file": "tài liệu (1).pdf"}
+        expected = _chunk_document(data, 50, 120, ["cúm"])
+        assert list(iter_chunks(data, 50, 120, ["cúm"])) == expected
+        assert chunk_to_nodes(data, 50, 120, ["cúm"])["nodes"] == expected
+
+    def test_missing_final_content(self):
+        with pytest.raises(ValueError):
+            next(iter_chunks({"cleaned_content": "x"}))